@@ -0,0 +1,118 @@
+# bench_async.py - Clients asyncio concurrents sur async_task_manager
+#
+# Usage : python benchmarks/bench_async.py [--tasks 10000] [--clients 50] [--operations 20]
+#
+# Chaque client enchaîne ajouts, mises à jour, consultations et recherches. On mesure
+# le débit, le nombre d'écritures disque (regroupées), la plus longue opération et le
+# plus long retard d'une coroutine témoin qui se réveille toutes les millisecondes.
+# Ce retard inclut l'attente derrière les autres clients (la boucle est saturée
+# quand ils sont nombreux) et le partage du GIL avec le thread d'écriture.
+# À comparer avec la même charge en appels synchrones (une sauvegarde par modification).
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from datagen import generate_tasks, generate_users
+
+
+def _setup(task_count: int):
+    # DATA_FILE / USER_FILE sont relatifs : on travaille dans un dossier jetable
+    os.chdir(tempfile.mkdtemp(prefix="bench-async-"))
+    from src import task_manager
+    users = generate_users(max(10, task_count // 100))
+    task_manager.user_list[:] = users
+    task_manager.task_list[:] = generate_tasks(task_count, users)
+    task_manager._save_tasks(task_manager.task_list)
+    task_manager._save_users(task_manager.user_list)
+    return task_manager
+
+
+def _operation(module, rng, ids):
+    """Une opération tirée au hasard : (fonction, args, kwargs)"""
+    roll = rng.random()
+    if roll < 0.25:
+        return module.add_task, (f"Tâche {rng.randrange(10**6)}",), {}
+    if roll < 0.5:
+        return module.update_task, (rng.choice(ids),), {"title": f"Titre {rng.randrange(10**6)}"}
+    if roll < 0.75:
+        return module.consult_task, (rng.choice(ids),), {}
+    return module.search_filter_sort_tasks, (), {"status": "TODO", "size": 10}
+
+
+async def _client(atm, ids, operations, seed, latencies):
+    rng = random.Random(seed)
+    for _ in range(operations):
+        function, args, kwargs = _operation(atm, rng, ids)
+        start = time.perf_counter()
+        await function(*args, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+
+
+async def _heartbeat(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run_async(atm, ids, clients, operations):
+    stop = asyncio.Event()
+    lags, latencies = [], []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(atm, ids, operations, seed, latencies) for seed in range(clients)))
+    await atm.flush()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat
+    return elapsed, max(lags, default=0.0), sorted(latencies)
+
+
+def run_sync(task_manager, ids, clients, operations):
+    start = time.perf_counter()
+    for seed in range(clients):
+        rng = random.Random(seed)
+        for _ in range(operations):
+            function, args, kwargs = _operation(task_manager, rng, ids)
+            function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clients asyncio concurrents sur async_task_manager")
+    parser.add_argument("--tasks", type=int, default=10_000, help="Taille du stockage initial")
+    parser.add_argument("--clients", type=int, default=50, help="Coroutines clientes")
+    parser.add_argument("--operations", type=int, default=20, help="Opérations par client")
+    parser.add_argument("--skip-sync", action="store_true", help="Ne pas mesurer la version synchrone")
+    args = parser.parse_args()
+
+    task_manager = _setup(args.tasks)
+    from src import async_task_manager
+    ids = [task["id"] for task in task_manager.task_list]
+    total = args.clients * args.operations
+
+    elapsed, lag, latencies = asyncio.run(run_async(async_task_manager, ids, args.clients, args.operations))
+    stats = async_task_manager.stats()
+    print(f"async : {total} opérations en {elapsed:.2f}s ({total / elapsed:.0f} op/s), "
+          f"{stats['mutations']} modifications -> {stats['saves']} écritures")
+    print(f"        latence p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max {latencies[-1] * 1000:.1f} ms, "
+          f"retard max du témoin {lag * 1000:.1f} ms")
+
+    if not args.skip_sync:
+        elapsed = run_sync(task_manager, ids, args.clients, args.operations)
+        print(f"sync  : {total} opérations en {elapsed:.2f}s ({total / elapsed:.0f} op/s), "
+              f"une sauvegarde complète par modification")
+
+
+if __name__ == '__main__':
+    main()
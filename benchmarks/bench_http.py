@@ -0,0 +1,123 @@
+# bench_http.py - Charge sur l'API HTTP (serve-http) depuis des clients locaux
+#
+# Usage : python benchmarks/bench_http.py [--tasks 10000] [--clients 8] [--requests 500] [--writes 0.1]
+#         python benchmarks/bench_http.py --url http://127.0.0.1:8080   (serveur déjà lancé)
+#
+# Sans --url, un serveur est démarré dans ce processus sur un stockage généré.
+# Chaque client garde une connexion persistante et enchaîne consultations (avec
+# If-None-Match sur l'ETag déjà reçu), recherches et modifications. On mesure le
+# débit, les latences p50 / p99 et la part de réponses 304 (résultat inchangé).
+# Une modification ne répond qu'une fois le stockage réécrit (en entier, sauf format
+# sharded) : avec --writes, le débit dépend surtout de la taille du stockage.
+# Clients et serveur partagent la machine (et le GIL sans --url) : le débit mesuré
+# est un minimum.
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from datagen import generate_tasks, generate_users
+
+
+def _start_server(task_count: int):
+    # DATA_FILE / USER_FILE sont relatifs : on travaille dans un dossier jetable
+    os.chdir(tempfile.mkdtemp(prefix="bench-http-"))
+    from src import http_api, task_manager
+    users = generate_users(max(10, task_count // 100))
+    task_manager.user_list[:] = users
+    task_manager.task_list[:] = generate_tasks(task_count, users)
+    task_manager._save_tasks(task_manager.task_list)
+    task_manager._save_users(task_manager.user_list)
+    server = http_api.TaskHTTPServer(("127.0.0.1", 0))
+    server.store.snapshot()  # première version construite avant la mesure
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "127.0.0.1", server.server_address[1]
+
+
+def _client(host, port, ids, requests, writes, seed, results):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    etags, latencies, statuses = {}, [], {}
+    headers = {"Accept-Encoding": "gzip", "Content-Type": "application/json"}
+    for _ in range(requests):
+        roll = rng.random()
+        task_id = rng.choice(ids)
+        if roll < writes:
+            path, method = f"/tasks/{task_id}", "PATCH"
+            body, request_headers = json.dumps({"priority": rng.choice(["LOW", "HIGH"])}), headers
+        elif roll < 0.8:
+            path, method, body = f"/tasks/{task_id}", "GET", None
+            request_headers = {**headers, **({"If-None-Match": etags[path]} if path in etags else {})}
+        else:
+            path, method, body = f"/tasks?status=TODO&sort_by=priority&page={rng.randint(1, 5)}", "GET", None
+            request_headers = headers
+        start = time.perf_counter()
+        connection.request(method, path, body=body, headers=request_headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if method == "GET" and response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    connection.close()
+    results.append((latencies, statuses))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit et latences de l'API HTTP en local")
+    parser.add_argument("--tasks", type=int, default=10_000, help="Taille du stockage généré (sans --url)")
+    parser.add_argument("--clients", type=int, default=8, help="Clients simultanés (une connexion chacun)")
+    parser.add_argument("--requests", type=int, default=500, help="Requêtes par client")
+    parser.add_argument("--writes", type=float, default=0.1, help="Part de modifications (PATCH), le reste en lectures")
+    parser.add_argument("--url", help="Serveur existant, par exemple http://127.0.0.1:8080")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        _, host, port = _start_server(args.tasks)
+
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request("GET", "/tasks?projection=ids&size=1000")
+    ids = json.loads(connection.getresponse().read())["ids"]
+    connection.close()
+    if not ids:
+        sys.exit("Aucune tâche sur le serveur")
+
+    results = []
+    threads = [threading.Thread(target=_client, args=(host, port, ids, args.requests, args.writes, seed, results))
+               for seed in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    statuses = {}
+    for _, client_statuses in results:
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+    total = len(latencies)
+    print(f"{total} requêtes, {args.clients} client(s) : {total / elapsed:.0f} req/s")
+    print(f"latence p50 {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p99 {latencies[int(total * 0.99) - 1] * 1000:.2f} ms, max {latencies[-1] * 1000:.1f} ms")
+    print("statuts : " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+    print(f"réponses 304 : {statuses.get(304, 0) / total:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# bench_parallel.py - Parcours parallèle de search_filter_sort_tasks selon le nombre de processus
+#
+# Usage : python benchmarks/bench_parallel.py [--tasks 1000000] [--workers 1,2,4,8] [--repeat 5]
+#
+# Pour chaque requête (recherche texte, tags + retard, tri complet), mesure la médiane
+# de --repeat exécutions avec 1 processus (séquentiel) puis avec chaque valeur de
+# --workers, et affiche l'accélération. Le premier appel de chaque configuration
+# (création du pool par fork) est exclu de la médiane et affiché à part.
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from datagen import generate_tasks, generate_users
+
+QUERIES = {
+    "texte": {"query": "rapport", "sort_by": "title"},
+    "tags+retard": {"tags": ["tag0"], "overdue": True, "sort_by": "created_at", "ascending": False},
+    "statut+tri": {"status": "TODO", "sort_by": "priority", "page": 5, "size": 50},
+}
+
+
+def _measure(task_manager, criteria, repeat):
+    start = time.perf_counter()
+    task_manager.search_filter_sort_tasks(**criteria)
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        task_manager.search_filter_sort_tasks(**criteria)
+        timings.append(time.perf_counter() - start)
+    return first, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accélération du parcours parallèle par nombre de processus")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Taille du stockage")
+    parser.add_argument("--workers", default="1,2,4,8", help="Nombres de processus, séparés par des virgules")
+    parser.add_argument("--repeat", type=int, default=5, help="Exécutions mesurées par configuration")
+    args = parser.parse_args()
+
+    # DATA_FILE / USER_FILE sont relatifs : on travaille dans un dossier jetable
+    os.chdir(tempfile.mkdtemp(prefix="bench-parallel-"))
+    from src import parallel_scan, task_manager
+    if not parallel_scan.available():
+        sys.exit("fork indisponible sur cette plateforme : pas de parcours parallèle")
+
+    users = generate_users(max(10, args.tasks // 1000))
+    task_manager.user_list[:] = users
+    task_manager.task_list[:] = generate_tasks(args.tasks, users)
+    task_manager.PARALLEL_THRESHOLD = 0
+    print(f"{args.tasks} tâches, {os.cpu_count()} cœur(s)")
+
+    for name, criteria in QUERIES.items():
+        task_manager.PARALLEL_WORKERS = 1
+        _, sequential = _measure(task_manager, criteria, args.repeat)
+        print(f"{name:12} séquentiel     {sequential * 1000:8.1f} ms")
+        for workers in (int(value) for value in args.workers.split(",")):
+            if workers < 2:
+                continue
+            task_manager.PARALLEL_WORKERS = workers
+            first, median = _measure(task_manager, criteria, args.repeat)
+            print(f"{name:12} {workers:2d} processus   {median * 1000:8.1f} ms  "
+                  f"x{sequential / median:4.2f}  (premier appel, fork compris : {first * 1000:.0f} ms)")
+        parallel_scan.shutdown()
+
+
+if __name__ == '__main__':
+    main()
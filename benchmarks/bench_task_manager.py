@@ -0,0 +1,153 @@
+# bench_task_manager.py - Benchmarks des chemins critiques de task_manager
+#
+# Usage :
+#   python benchmarks/run.py                         (1k, résultats JSON dans benchmarks/results/)
+#   BENCH_SCALES=1k,100k pytest benchmarks/bench_task_manager.py --benchmark-json=out.json
+#
+# Le fichier n'est pas nommé test_*.py : un simple `pytest` ne le collecte pas.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src import task_manager
+from datagen import generate_tasks, generate_users
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+ACTIVE_SCALES = [scale.strip() for scale in os.environ.get("BENCH_SCALES", "1k").split(",") if scale.strip()]
+
+SEARCH_FILTERS = {
+    "status": {"status": "ONGOING"},
+    "priority": {"priority": "HIGH"},
+    "tags": {"tags": ["tag3", "tag42"]},
+    "overdue": {"overdue": True},
+    "unassigned": {"user_id": "unassigned"},
+    "query_title": {"query": "serveur", "search_in": "title"},
+    "query_both": {"query": "fuite", "search_in": "both"},
+}
+SORT_FIELDS = ["id", "title", "status", "created_at", "priority"]
+
+
+@pytest.fixture(scope="module", params=ACTIVE_SCALES)
+def store(request, tmp_path_factory):
+    """Charge un jeu de données généré dans task_manager (une fois par échelle)"""
+    count = SCALES[request.param]
+    users = generate_users(max(10, count // 100))
+    tasks = generate_tasks(count, users)
+    directory = tmp_path_factory.mktemp(f"store-{request.param}")
+
+    saved = (task_manager.DATA_FILE, task_manager.USER_FILE, [*task_manager.task_list], [*task_manager.user_list])
+    task_manager.DATA_FILE = str(directory / "tasks.json")
+    task_manager.USER_FILE = str(directory / "users.json")
+    task_manager.task_list[:] = tasks
+    task_manager.user_list[:] = users
+    task_manager.build_indexes()
+    yield {"scale": request.param, "tasks": tasks, "users": users}
+    task_manager.DATA_FILE, task_manager.USER_FILE = saved[0], saved[1]
+    task_manager.task_list[:] = saved[2]
+    task_manager.user_list[:] = saved[3]
+
+
+@pytest.fixture
+def no_save(monkeypatch):
+    """Isole le coût en mémoire des mutations (la sauvegarde a son propre benchmark)"""
+    monkeypatch.setattr(task_manager, "_write_store", lambda *args, **kwargs: None)
+
+
+def _sample_task(store, position=0.5):
+    return store["tasks"][int(len(store["tasks"]) * position)]
+
+
+def test_consult_task(benchmark, store):
+    task_id = _sample_task(store, 0.75)["id"]
+    benchmark(task_manager.consult_task, task_id)
+
+
+def test_update_task(benchmark, store, no_save):
+    task_id = _sample_task(store, 0.6)["id"]
+    titles = iter(f"Titre {i}" for i in range(10_000_000))
+    benchmark(lambda: task_manager.update_task(task_id, title=next(titles)))
+
+
+def test_delete_task(benchmark, store, no_save):
+    task = _sample_task(store, 0.9)
+
+    def restore():
+        if task not in task_manager.task_list:
+            task_manager.task_list.append(task)
+
+    benchmark.pedantic(task_manager.delete_task, args=(task["id"],), setup=restore, rounds=20)
+    restore()
+
+
+@pytest.mark.parametrize("name", SEARCH_FILTERS)
+def test_search_filter(benchmark, store, name):
+    benchmark(task_manager.search_filter_sort_tasks, **SEARCH_FILTERS[name])
+
+
+@pytest.mark.parametrize("field", SORT_FIELDS)
+def test_search_sort(benchmark, store, field):
+    benchmark(task_manager.search_filter_sort_tasks, sort_by=field)
+
+
+def test_search_filter_user(benchmark, store):
+    user_id = store["users"][0]["id"]
+    benchmark(task_manager.search_filter_sort_tasks, user_id=user_id)
+
+
+def test_search_count(benchmark, store):
+    benchmark(task_manager.search_filter_sort_tasks, status="TODO", projection="count")
+
+
+def test_get_all_tags(benchmark, store):
+    benchmark(task_manager.get_all_tags)
+
+
+def test_get_task_history(benchmark, store):
+    # Tâche au plus long historique : le pire cas de la pagination
+    task = max(store["tasks"], key=lambda t: len(t["history"]))
+    benchmark(task_manager.get_task_history, task["id"])
+
+
+def test_list_users(benchmark, store):
+    benchmark(task_manager.list_users, page=2, size=20)
+
+
+def test_save_tasks(benchmark, store):
+    benchmark.pedantic(task_manager._save_tasks, args=(task_manager.task_list,), rounds=3)
+
+
+def test_load_tasks(benchmark, store):
+    task_manager._save_tasks(task_manager.task_list)
+    benchmark.pedantic(task_manager._load_tasks, rounds=3)
+
+
+@pytest.fixture
+def snapshot_format(monkeypatch):
+    monkeypatch.setattr(task_manager, "STORE_FORMAT", "snapshot")
+
+
+def test_save_tasks_snapshot(benchmark, store, snapshot_format):
+    benchmark.pedantic(task_manager._save_tasks, args=(task_manager.task_list,), rounds=3)
+
+
+def test_load_tasks_snapshot(benchmark, store, snapshot_format):
+    task_manager._save_tasks(task_manager.task_list)
+    benchmark.pedantic(task_manager._load_tasks, rounds=3)
+
+
+def _unexpected_full_load():
+    raise AssertionError("chargement complet inattendu")
+
+
+def test_consult_task_indexed_cold(benchmark, store, tmp_path, monkeypatch):
+    # Stockage indexé jamais chargé : seule la consultation par l'index est mesurée
+    from src import record_store
+    path = str(tmp_path / "tasks.rec")
+    record_store.write(path, store["tasks"])
+    monkeypatch.setattr(task_manager, "DATA_FILE", path)
+    monkeypatch.setattr(task_manager, "task_list", task_manager._LazyTrackedList(_unexpected_full_load))
+    benchmark(task_manager.consult_task, _sample_task(store, 0.75)["id"])
@@ -0,0 +1,42 @@
+# bench_user_import.py - Mesure de l'import en masse d'utilisateurs
+#
+# Usage : python benchmarks/bench_user_import.py [nombre_utilisateurs]
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def main(count: int = 100_000):
+    # DATA_FILE / USER_FILE sont relatifs : on travaille dans un dossier jetable
+    os.chdir(tempfile.mkdtemp(prefix="bench-users-"))
+    from src import task_manager
+
+    users = [{"name": f"Utilisateur {i}", "email": f"user{i}@example.com"} for i in range(count)]
+
+    task_manager.user_list.clear()
+    start = time.perf_counter()
+    task_manager.create_users(users)
+    bulk = time.perf_counter() - start
+    size = os.path.getsize(task_manager.USER_FILE)
+    print(f"create_users({count}) + 1 sauvegarde : {bulk:.3f}s ({size / 1e6:.1f} Mo)")
+
+    # Boucle create_user sans sauvegarde : isole le coût du contrôle d'unicité
+    task_manager.user_list.clear()
+    save_users = task_manager._save_users
+    task_manager._save_users = lambda users_to_save: None
+    try:
+        start = time.perf_counter()
+        for user in users:
+            task_manager.create_user(user["name"], user["email"])
+        loop = time.perf_counter() - start
+    finally:
+        task_manager._save_users = save_users
+    print(f"{count} x create_user (sans sauvegarde) : {loop:.3f}s")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,119 @@
+# compare.py - Compare des résultats de benchmarks à la baseline enregistrée
+#
+# Usage : python benchmarks/compare.py resultats.json [--baseline benchmarks/baseline.json]
+import argparse
+import fnmatch
+import json
+import os
+import sys
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, "thresholds.json")
+
+
+def load_medians(path: str) -> Dict[str, float]:
+    """Médianes (en secondes) par benchmark, depuis un JSON pytest-benchmark ou une baseline"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "medians" in data:
+        return dict(data["medians"])
+    return {bench["name"]: bench["stats"]["median"] for bench in data["benchmarks"]}
+
+
+def write_baseline(results_path: str, baseline_path: str = BASELINE_FILE) -> None:
+    """Enregistre les médianes d'un run comme nouvelle baseline"""
+    with open(results_path, "r", encoding="utf-8") as f:
+        machine = json.load(f).get("machine_info", {})
+    baseline = {
+        "machine": {key: machine.get(key) for key in ("node", "processor", "python_version")},
+        "medians": dict(sorted(load_medians(results_path).items())),
+    }
+    with open(baseline_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def load_thresholds(path: str = THRESHOLDS_FILE) -> Dict:
+    """Seuils de régression : {"default": 0.2, "overrides": {motif_fnmatch: seuil}}"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def threshold_for(name: str, thresholds: Dict) -> float:
+    # Le motif le plus long (le plus spécifique) l'emporte
+    matches = [pattern for pattern in thresholds.get("overrides", {}) if fnmatch.fnmatch(name, pattern)]
+    if matches:
+        return thresholds["overrides"][max(matches, key=len)]
+    return thresholds.get("default", 0.2)
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], thresholds: Dict) -> List[Dict]:
+    """Une ligne par benchmark : statut "ok", "regression", "faster", "new" ou "missing" """
+    rows = []
+    for name in sorted(set(current) | set(baseline)):
+        row = {"name": name, "baseline": baseline.get(name), "current": current.get(name)}
+        if name not in baseline:
+            row["status"] = "new"
+        elif name not in current:
+            row["status"] = "missing"
+        else:
+            row["threshold"] = threshold_for(name, thresholds)
+            row["change"] = current[name] / baseline[name] - 1
+            if row["change"] > row["threshold"]:
+                row["status"] = "regression"
+            elif row["change"] < -row["threshold"]:
+                row["status"] = "faster"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def _format_time(seconds) -> str:
+    if seconds is None:
+        return "-"
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def format_report(rows: List[Dict]) -> str:
+    width = max([len(row["name"]) for row in rows] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline':>10}  {'actuel':>10}  {'écart':>8}  {'seuil':>6}  statut"]
+    for row in rows:
+        change = f"{row['change']:+.1%}" if "change" in row else "-"
+        threshold = f"{row['threshold']:.0%}" if "threshold" in row else "-"
+        lines.append(f"{row['name']:<{width}}  {_format_time(row['baseline']):>10}  "
+                     f"{_format_time(row['current']):>10}  {change:>8}  {threshold:>6}  {row['status']}")
+    regressions = [row for row in rows if row["status"] == "regression"]
+    lines.append("")
+    if regressions:
+        lines.append(f"{len(regressions)} régression(s) au-delà du seuil :")
+        lines.extend(f"  - {row['name']} : {row['change']:+.1%} (seuil {row['threshold']:.0%})"
+                     for row in regressions)
+    else:
+        lines.append("Aucune régression au-delà des seuils.")
+    return "\n".join(lines)
+
+
+def gate(results_path: str, baseline_path: str = BASELINE_FILE, thresholds_path: str = THRESHOLDS_FILE) -> int:
+    """Affiche le rapport et renvoie le code de sortie (1 en cas de régression)"""
+    rows = compare(load_medians(results_path), load_medians(baseline_path), load_thresholds(thresholds_path))
+    print(format_report(rows))
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare un run de benchmarks à la baseline")
+    parser.add_argument("results", help="Fichier JSON produit par benchmarks/run.py")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    args = parser.parse_args()
+    sys.exit(gate(args.results, args.baseline, args.thresholds))
+
+
+if __name__ == "__main__":
+    main()
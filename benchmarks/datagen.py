@@ -0,0 +1,149 @@
+# datagen.py - Générateur de données synthétiques pour les benchmarks
+#
+# Usage : python benchmarks/datagen.py --tasks 100000 --users 1000 --out /tmp/store
+import argparse
+import itertools
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+STATUS_WEIGHTS = {"TODO": 40, "ONGOING": 25, "DONE": 35}
+PRIORITY_WEIGHTS = {"NORMAL": 55, "LOW": 20, "HIGH": 18, "CRITICAL": 7}
+TAG_POOL_SIZE = 200
+WORDS = (
+    "réparer installer vérifier appeler acheter nettoyer préparer envoyer mettre à jour "
+    "serveur imprimante garage facture client rapport réunion sauvegarde réseau vélo "
+    "toit fuite projet urgent budget contrat livraison audit migration base données"
+).split()
+HISTORY_EVENTS = ["title_updated", "description_updated", "status_updated", "priority_updated",
+                  "due_date_updated", "tag_added", "tag_removed", "user_assigned"]
+# Date de référence fixe : mêmes données quel que soit le jour d'exécution
+REFERENCE_DATE = datetime(2025, 7, 1, 12, 0, 0)
+
+
+def _rng(seed: int) -> random.Random:
+    return random.Random(seed)
+
+
+def _cumulative(weights: List[float]) -> List[float]:
+    return list(itertools.accumulate(weights))
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_users(count: int, seed: int = 42) -> List[Dict]:
+    """Génère count utilisateurs au format de users.json"""
+    rng = _rng(seed)
+    first_names = ["Alice", "Bob", "Charlie", "Diane", "Éric", "Fatou", "Gaspard", "Hélène", "Inès", "Jules"]
+    last_names = ["Martin", "Dupont", "Brown", "Bernard", "Petit", "Durand", "Leroy", "Moreau", "Simon", "Laurent"]
+    users = []
+    for i in range(count):
+        created = REFERENCE_DATE - timedelta(days=rng.randint(0, 900), seconds=rng.randint(0, 86399))
+        users.append({
+            "id": _uuid(rng),
+            "name": f"{rng.choice(first_names)} {rng.choice(last_names)} {i}",
+            "email": f"user{i}@example.com",
+            "created_at": created.replace(tzinfo=timezone.utc).isoformat(),
+        })
+    return users
+
+
+def generate_tasks(count: int, users: List[Dict], seed: int = 42) -> List[Dict]:
+    """Génère count tâches au format de tasks.json.
+
+    Répartitions : statuts et priorités pondérés, tags tirés d'un vocabulaire
+    de TAG_POOL_SIZE tags selon une loi de Zipf (0 à 4 par tâche), 60 % de
+    tâches avec échéance, 70 % assignées (quelques utilisateurs très chargés)
+    et un historique de longueur géométrique avec une longue traîne.
+    """
+    rng = _rng(seed)
+    statuses, status_weights = list(STATUS_WEIGHTS), _cumulative(list(STATUS_WEIGHTS.values()))
+    priorities, priority_weights = list(PRIORITY_WEIGHTS), _cumulative(list(PRIORITY_WEIGHTS.values()))
+    tags = [f"tag{i}" for i in range(TAG_POOL_SIZE)]
+    tag_weights = _cumulative([1 / (rank + 1) for rank in range(TAG_POOL_SIZE)])
+    user_ids = [u["id"] for u in users]
+    user_weights = _cumulative([1 / (rank + 1) ** 0.8 for rank in range(len(user_ids))])
+
+    tasks = []
+    for _ in range(count):
+        created = REFERENCE_DATE - timedelta(days=rng.randint(0, 730), seconds=rng.randint(0, 86399),
+                                             microseconds=rng.randint(0, 999999))
+        title = _sentence(rng, 2, 7).capitalize()[:100]
+        description = _sentence(rng, 0, 30)[:500]
+        priority = rng.choices(priorities, cum_weights=priority_weights)[0]
+        task = {
+            "id": _uuid(rng),
+            "title": title,
+            "description": description,
+            "status": rng.choices(statuses, cum_weights=status_weights)[0],
+            "created_at": created.isoformat(),
+            "priority": priority,
+            "history": [],
+            "assigned_user": rng.choices(user_ids, cum_weights=user_weights)[0]
+            if user_ids and rng.random() < 0.7 else None,
+        }
+        if rng.random() < 0.6:
+            due = REFERENCE_DATE + timedelta(days=rng.randint(-60, 90))
+            task["due_date"] = due.replace(hour=0, minute=0, second=0).isoformat()
+        task_tags = set(rng.choices(tags, cum_weights=tag_weights, k=rng.randint(0, 4)))
+        if task_tags:
+            task["tags"] = sorted(task_tags)
+
+        timestamp = created
+        task["history"].append({
+            "event": "creation",
+            "timestamp": timestamp.isoformat(),
+            "details": {"title": title, "description": description,
+                        "priority": priority, "due_date": task.get("due_date")},
+        })
+        # Géométrique de moyenne ~4, plus quelques tâches très anciennes et bavardes
+        events = int(rng.expovariate(1 / 4))
+        if rng.random() < 0.002:
+            events += rng.randint(100, 1000)
+        for _ in range(events):
+            timestamp += timedelta(minutes=rng.randint(1, 60 * 24 * 3), microseconds=rng.randint(0, 999999))
+            event = rng.choice(HISTORY_EVENTS)
+            if event in ("tag_added", "tag_removed"):
+                details = {"tag": rng.choice(tags)}
+            elif event == "user_assigned":
+                details = {"user_id": rng.choice(user_ids) if user_ids else None}
+            else:
+                details = {"old": _sentence(rng, 1, 4), "new": _sentence(rng, 1, 4)}
+            task["history"].append({"timestamp": timestamp.isoformat(), "event": event, "details": details})
+        tasks.append(task)
+    return tasks
+
+
+def write_store(directory: str, tasks: List[Dict], users: List[Dict]) -> None:
+    """Écrit tasks.json et users.json dans directory, au format du gestionnaire"""
+    os.makedirs(directory, exist_ok=True)
+    for name, data in (("tasks.json", tasks), ("users.json", users)):
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un jeu de données synthétique reproductible")
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=".")
+    args = parser.parse_args()
+
+    users = generate_users(args.users, seed=args.seed)
+    tasks = generate_tasks(args.tasks, users, seed=args.seed)
+    write_store(args.out, tasks, users)
+    print(f"{len(tasks)} tâches et {len(users)} utilisateurs écrits dans {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# run.py - Lance la suite de benchmarks et enregistre les résultats en JSON
+#
+# Usage : python benchmarks/run.py [--scales 1k,100k,1m] [--output fichier.json] [-- options pytest]
+#         python benchmarks/run.py --check             (échoue si un benchmark régresse)
+#         python benchmarks/run.py --update-baseline   (enregistre ce run comme référence)
+import argparse
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import compare
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+SUITE = os.path.join(BENCH_DIR, "bench_task_manager.py")
+
+
+def run_suite(scales: str, output: str, extra_args=()) -> int:
+    """Exécute la suite pytest-benchmark ; les résultats bruts sont écrits dans output"""
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    env = dict(os.environ, BENCH_SCALES=scales)
+    command = [sys.executable, "-m", "pytest", SUITE, "-q", "-p", "no:cacheprovider",
+               f"--benchmark-json={output}", *extra_args]
+    return subprocess.call(command, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins critiques de task_manager")
+    parser.add_argument("--scales", default="1k", help="Échelles séparées par des virgules : 1k, 100k, 1m")
+    parser.add_argument("--output", help="Fichier JSON de résultats (défaut : benchmarks/results/<date>.json)")
+    parser.add_argument("--check", action="store_true",
+                        help="Comparer les médianes à la baseline et échouer en cas de régression")
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistrer ce run comme baseline")
+    parser.add_argument("--baseline", default=compare.BASELINE_FILE)
+    parser.add_argument("--thresholds", default=compare.THRESHOLDS_FILE)
+    parser.add_argument("pytest_args", nargs="*", help="Options passées telles quelles à pytest (après --)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    code = run_suite(args.scales, output, args.pytest_args)
+    if not os.path.exists(output):
+        sys.exit(code or 1)
+    print(f"Résultats enregistrés dans {output}")
+
+    if code == 0 and args.update_baseline:
+        compare.write_baseline(output, args.baseline)
+        print(f"Baseline mise à jour : {args.baseline}")
+    elif code == 0 and args.check:
+        code = compare.gate(output, args.baseline, args.thresholds)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
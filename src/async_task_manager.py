@@ -0,0 +1,153 @@
+# async_task_manager.py - Façade asyncio de task_manager
+#
+# Les opérations s'exécutent sur la boucle (elles ne touchent que la mémoire) ;
+# seules les écritures disque partent dans un executor. Une modification ne
+# sauvegarde pas elle-même : elle signale ce qui est à écrire et une tâche de fond
+# unique écrit les fichiers. Les modifications arrivées pendant une écriture sont
+# regroupées dans la suivante : au plus une écriture en cours et une en attente.
+#
+# L'écriture travaille sur une copie prise sur la boucle avec marshal (en C, bien
+# plus rapide que json.dump), tâche par tâche et par paquets : la boucle reste
+# disponible entre deux paquets, les lectures continuent et les modifications
+# attendent la fin de la copie. Le thread d'écriture ne lit jamais les objets
+# vivants, et il décode tâche par tâche : aucun long appel C ne garde le GIL.
+#
+#   from src import async_task_manager as tasks
+#   task = await tasks.add_task("Titre")
+#   page = await tasks.search_filter_sort_tasks(status="TODO")
+#   await tasks.flush()   # attendre que tout soit sur disque
+
+import asyncio
+import marshal
+from functools import wraps
+
+from src import task_manager
+
+# Nombre de tâches copiées entre deux passages de main à la boucle
+SNAPSHOT_CHUNK = 2000
+
+# Écriture en attente, tâches de fond en cours et compteurs (voir stats())
+_pending = {"tasks": False, "users": False, "changed": [], "entries": []}
+_state = {"saver": None, "loading": None, "snapshot": None}
+_stats = {"mutations": 0, "saves": 0}
+
+def stats() -> dict:
+    """{"mutations": modifications, "saves": écritures effectuées} depuis le dernier reset_stats()"""
+    return dict(_stats)
+
+def reset_stats() -> None:
+    _stats.update(mutations=0, saves=0)
+
+async def _ensure_loaded() -> None:
+    # Stockage indexé ou partitionné : le chargement complet part dans l'executor,
+    # une seule fois même si plusieurs coroutines arrivent en même temps
+    if type(task_manager.task_list) is not task_manager._LazyTrackedList:
+        return
+    if _state["loading"] is None:
+        loop = asyncio.get_running_loop()
+        _state["loading"] = loop.run_in_executor(None, task_manager.task_list.load)
+    try:
+        await _state["loading"]
+    finally:
+        _state["loading"] = None
+
+async def _copy(records) -> list:
+    """Copie marshal de chaque élément, SNAPSHOT_CHUNK par SNAPSHOT_CHUNK"""
+    records = list(records)
+    blobs = []
+    for start in range(0, len(records), SNAPSHOT_CHUNK):
+        if start:
+            await asyncio.sleep(0)
+        blobs.extend(map(marshal.dumps, records[start:start + SNAPSHOT_CHUNK]))
+    return blobs
+
+async def _snapshot():
+    # Les modifications attendent la fin de la copie (voir _writer) : elle est cohérente
+    done = asyncio.get_running_loop().create_future()
+    _state["snapshot"] = done
+    try:
+        tasks = await _copy(task_manager.task_list) if _pending["tasks"] else None
+        users = await _copy(task_manager.user_list) if _pending["users"] else None
+        changed, entries = _pending["changed"], _pending["entries"]
+        _pending.update(tasks=False, users=False, changed=[], entries=[])
+        return tasks, users, changed, entries
+    finally:
+        _state["snapshot"] = None
+        done.set_result(None)
+
+def _write(tasks, users, changed, entries) -> None:
+    """Exécuté dans l'executor : écrit les copies prises sur la boucle, puis leurs entrées du journal"""
+    if tasks is not None:
+        task_manager._write_store(task_manager.DATA_FILE, [marshal.loads(blob) for blob in tasks], changed, entries)
+    if users is not None:
+        task_manager._write_store(task_manager.USER_FILE, [marshal.loads(blob) for blob in users])
+
+async def _save_loop() -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while _pending["tasks"] or _pending["users"]:
+            await loop.run_in_executor(None, _write, *await _snapshot())
+            _stats["saves"] += 1
+    finally:
+        _state["saver"] = None
+
+def _schedule_save(tasks: bool, users: bool, changed, entries=()) -> None:
+    if not (tasks or users):
+        return
+    _pending["tasks"] |= tasks
+    _pending["users"] |= users
+    _pending["entries"].extend(entries)
+    if changed is None or _pending["changed"] is None:
+        _pending["changed"] = None
+    elif tasks:
+        _pending["changed"].extend(changed)
+    if _state["saver"] is None:
+        _state["saver"] = asyncio.get_running_loop().create_task(_save_loop())
+
+async def flush() -> None:
+    """Attend que toutes les modifications faites jusqu'ici soient écrites"""
+    while _state["saver"] is not None:
+        await asyncio.shield(_state["saver"])
+
+def _reader(function):
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        await _ensure_loaded()
+        return function(*args, **kwargs)
+    return wrapper
+
+def _writer(function):
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        await _ensure_loaded()
+        while _state["snapshot"] is not None:
+            await _state["snapshot"]
+        _stats["mutations"] += 1
+        with task_manager.deferred_saves():
+            try:
+                return function(*args, **kwargs)
+            finally:
+                # Récupérées avant la sortie du bloc : deferred_saves n'écrit donc rien ici
+                _schedule_save(*task_manager.take_pending_saves(), task_manager.take_pending_changes())
+    return wrapper
+
+add_task = _writer(task_manager.add_task)
+update_task = _writer(task_manager.update_task)
+delete_task = _writer(task_manager.delete_task)
+assign_task = _writer(task_manager.assign_task)
+compact_history = _writer(task_manager.compact_history)
+undo_changes = _writer(task_manager.undo_changes)
+restore_at = _writer(task_manager.restore_at)
+create_user = _writer(task_manager.create_user)
+create_users = _writer(task_manager.create_users)
+
+consult_task = _reader(task_manager.consult_task)
+consult_task_if_changed = _reader(task_manager.consult_task_if_changed)
+get_task_history = _reader(task_manager.get_task_history)
+search_filter_sort_tasks = _reader(task_manager.search_filter_sort_tasks)
+get_all_tags = _reader(task_manager.get_all_tags)
+get_tasks_assigned_to_user = _reader(task_manager.get_tasks_assigned_to_user)
+get_unassigned_tasks = _reader(task_manager.get_unassigned_tasks)
+list_users = _reader(task_manager.list_users)
+search_users = _reader(task_manager.search_users)
+get_user_by_id = _reader(task_manager.get_user_by_id)
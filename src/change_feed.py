@@ -0,0 +1,205 @@
+# change_feed.py - Journal des modifications de tâches (NDJSON en ajout seul)
+#
+# Une ligne par modification, numérotée par une séquence strictement croissante :
+#   {"seq": 42, "timestamp": "...", "type": "created" | "updated" | "deleted",
+#    "task_id": "...", "events": [événements d'historique], "task": {...}}
+# "task" est l'état de la tâche après la modification (absent pour "deleted"), sans
+# son historique : "events" porte les événements ajoutés par la modification, et
+# l'entrée reste de taille constante quelle que soit la longueur de l'historique. Un
+# consommateur applique les entrées sans relire le stockage. Une suppression porte à
+# la place "previous", la tâche supprimée avec son historique. Avec les valeurs "old" des événements,
+# chaque entrée permet de retrouver l'état d'avant (voir undo_changes dans task_manager).
+#
+# L'ajout se fait sous verrou de fichier (flock) : la séquence et timestamp (UTC, à
+# la microseconde, pris à l'écriture) restent croissants même avec plusieurs
+# processus qui écrivent. Les lectures cherchent une séquence ou une date par
+# dichotomie dans le fichier, sans le lire en entier.
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows : pas de verrou entre processus
+    fcntl = None
+
+# Taille lue à la fois en remontant depuis la fin du fichier
+_TAIL_BLOCK = 64 * 1024
+
+def journal_path(data_file: str) -> str:
+    return data_file + ".changes"
+
+def format_timestamp(moment: datetime) -> str:
+    """Format des timestamps du journal (comparables comme chaînes) ; date naïve : UTC"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+def _last_line(f) -> Optional[bytes]:
+    """Dernière ligne complète du fichier ouvert en binaire (None s'il est vide)"""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    block = _TAIL_BLOCK
+    while True:
+        start = max(0, size - block)
+        f.seek(start)
+        content = f.read(size - start)
+        # Une écriture interrompue peut laisser une ligne sans fin : on l'ignore
+        content = content[:content.rfind(b"\n") + 1]
+        lines = content.rstrip(b"\n")
+        position = lines.rfind(b"\n")
+        if position >= 0 or start == 0:
+            return lines[position + 1:] or None
+        block *= 2
+
+def last_sequence(path: str) -> int:
+    try:
+        with open(path, 'rb') as f:
+            line = _last_line(f)
+    except FileNotFoundError:
+        return 0
+    return json.loads(line)["seq"] if line else 0
+
+def append(path: str, entries: List[Dict]) -> int:
+    """Ajoute les entrées en leur donnant les séquences suivantes ; renvoie la dernière.
+
+    Une entrée peut porter "task_json" / "previous_json" : la tâche déjà encodée en JSON,
+    écrite telle quelle sous "task" / "previous".
+    """
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            line = _last_line(f)
+            sequence = json.loads(line)["seq"] if line else 0
+            timestamp = format_timestamp(datetime.now(timezone.utc))
+            lines = []
+            for entry in entries:
+                sequence += 1
+                entry = dict(entry)
+                encoded = [(key[:-len("_json")], entry.pop(key)) for key in ("task_json", "previous_json")
+                           if key in entry]
+                text = json.dumps({"seq": sequence, "timestamp": timestamp, **entry}, ensure_ascii=False)
+                for key, value in encoded:
+                    text = f'{text[:-1]}, "{key}": {value}}}'
+                lines.append(text.encode('utf-8') + b"\n")
+            f.seek(0, os.SEEK_END)
+            f.write(b"".join(lines))
+            f.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    return sequence
+
+def _field_at(f, offset: int, field: str):
+    """(valeur de field, position) de la première ligne complète commençant à offset ou après"""
+    f.seek(offset)
+    if offset:
+        f.readline()  # fin de la ligne en cours
+    position = f.tell()
+    line = f.readline()
+    if not line.endswith(b"\n"):
+        return None, position
+    return json.loads(line)[field], position
+
+def offset_after(f, since, field: str = "seq") -> int:
+    """Position de la première entrée dont field ("seq" ou "timestamp") est > since.
+
+    Dichotomie sur les octets : les deux champs croissent avec la position.
+    """
+    f.seek(0, os.SEEK_END)
+    low, high = 0, f.tell()
+    while low < high:
+        middle = (low + high) // 2
+        value, position = _field_at(f, middle, field)
+        if value is None or value > since:
+            high = middle
+        else:
+            low = middle + 1
+    _, position = _field_at(f, low, field)
+    return position
+
+def iterate(path: str, since=0, field: str = "seq") -> Iterator[Dict]:
+    """Entrées dont field est > since, dans l'ordre, jusqu'à la fin actuelle du journal"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset_after(f, since, field))
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield json.loads(line)
+
+def iterate_backwards(path: str) -> Iterator[Dict]:
+    """Entrées de la plus récente à la plus ancienne (lecture par blocs depuis la fin)"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        pending = b""
+        complete = False
+        while position > 0:
+            start = max(0, position - _TAIL_BLOCK)
+            f.seek(start)
+            pending = f.read(position - start) + pending
+            position = start
+            if not complete:
+                # Une écriture interrompue peut laisser une ligne sans fin : on l'ignore
+                cut = pending.rfind(b"\n")
+                if cut < 0 and start > 0:
+                    continue
+                pending = pending[:cut + 1]
+                complete = True
+            lines = pending.split(b"\n")
+            # Début de bloc : peut-être la fin d'une ligne commencée plus haut
+            pending = lines.pop(0) if start > 0 else b""
+            for line in reversed(lines):
+                if line:
+                    yield json.loads(line)
+
+def read(path: str, since: int = 0, limit: Optional[int] = None) -> List[Dict]:
+    """Entrées de séquence > since, dans l'ordre (au plus limit)"""
+    entries = []
+    for entry in iterate(path, since):
+        if limit is not None and len(entries) >= limit:
+            break
+        entries.append(entry)
+    return entries
+
+def follow(path: str, since: int = 0, interval: float = 1.0, once: bool = False) -> Iterator[Dict]:
+    """Entrées de séquence > since, puis les suivantes au fil de l'eau (comme tail -f).
+
+    once : s'arrête dès qu'il n'y a plus d'entrée disponible.
+    """
+    f = None
+    try:
+        while f is None:
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                if once:
+                    return
+                time.sleep(interval)
+        f.seek(offset_after(f, since))
+        while True:
+            position = f.tell()
+            line = f.readline()
+            if line.endswith(b"\n"):
+                yield json.loads(line)
+                continue
+            # Rien de neuf, ou une ligne en cours d'écriture : on la relira entière
+            f.seek(position)
+            if once:
+                return
+            time.sleep(interval)
+    finally:
+        if f is not None:
+            f.close()
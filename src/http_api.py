@@ -0,0 +1,324 @@
+# http_api.py - API HTTP JSON locale sur task_manager (bibliothèque standard seulement)
+#
+# Un serveur à threads (connexions persistantes HTTP/1.1) : tous les accès passent
+# par un TaskStore (voir task_store.py), les lectures en parallèle et les
+# modifications une à la fois.
+#
+#   GET    /tasks?status=TODO&tags=a,b&sort_by=title&page=2   recherche
+#   GET    /tasks/<id>                  consultation
+#   GET    /tasks/<id>/history?page=1   historique (+ since / until : dates ISO)
+#   POST   /tasks                       création {"title", "description", "due_date", "priority"}
+#   PATCH  /tasks/<id>                  modification (arguments de update_task)
+#   DELETE /tasks/<id>                  suppression
+#   PUT    /tasks/<id>/assignee         assignation {"user_id": ... | null}
+#                                       (+ "expected_version" : 409 si la tâche a changé)
+#   GET    /users?prefix=al | ?cursor=  utilisateurs ; GET /users/<id>
+#   POST   /users                       création {"name", "email"}
+#   POST   /batch                       {"requests": [{"method", "path", "body"}, ...]}
+#
+# /batch exécute les requêtes dans l'ordre, sous un seul TaskStore.batch() (une
+# sauvegarde pour tout le lot). Ce n'est pas une transaction : chaque requête a son
+# propre statut, et une erreur n'annule pas les précédentes.
+#
+# Lectures conditionnelles : chaque GET porte un ETag faible, tiré de la version
+# publiée du stockage (Snapshot), du jour UTC et d'un jeton propre au serveur ; pour
+# GET /tasks/<id>, de la version de la tâche seule. Avec If-None-Match, le serveur
+# répond 304 sans construire la réponse tant que rien n'a changé. Les réponses de plus de GZIP_MIN_BYTES sont compressées si le client
+# accepte gzip.
+
+import gzip
+import json
+import re
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from src import task_manager
+from src.task_manager import VersionConflictError
+from src.task_store import TaskStore
+
+GZIP_MIN_BYTES = 1024
+MAX_BATCH = 1000
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+SEARCH_INTS = {"page", "size"}
+SEARCH_BOOLS = {"ascending", "overdue"}
+SEARCH_LISTS = {"tags", "fields"}
+SEARCH_PARAMS = {"query", "search_in", "status", "user_id", "priority", "sort_by", "projection",
+                 "created_from", "created_to"} | SEARCH_INTS | SEARCH_BOOLS | SEARCH_LISTS
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _params(query: dict, allowed: set) -> dict:
+    """Paramètres de la chaîne de requête, convertis selon leur type"""
+    params = {}
+    for name, values in query.items():
+        if name not in allowed:
+            raise HTTPError(400, f"Unknown parameter: {name}")
+        value = values[-1]
+        if name in SEARCH_INTS:
+            try:
+                value = int(value)
+            except ValueError:
+                raise HTTPError(400, f"Invalid parameter: {name}")
+        elif name in SEARCH_BOOLS:
+            if value not in ("true", "false"):
+                raise HTTPError(400, f"Invalid parameter: {name}")
+            value = value == "true"
+        elif name in SEARCH_LISTS:
+            value = [item for item in value.split(",") if item]
+        params[name] = value
+    return params
+
+# Types des champs des corps JSON : vérifiés avant tout appel au stockage
+def _is_text(value) -> bool:
+    return isinstance(value, str)
+
+def _is_optional_text(value) -> bool:
+    return value is None or isinstance(value, str)
+
+def _is_text_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def _is_version(value) -> bool:
+    return value is None or (isinstance(value, int) and not isinstance(value, bool))
+
+def _body(body, fields: dict) -> dict:
+    """Corps JSON d'une requête ; fields associe chaque champ accepté à son contrôle de type"""
+    if not isinstance(body, dict):
+        raise HTTPError(400, "JSON object expected")
+    unknown = set(body) - set(fields)
+    if unknown:
+        raise HTTPError(400, f"Unknown field: {sorted(unknown)[0]}")
+    for name, value in body.items():
+        if not fields[name](value):
+            raise HTTPError(400, f"Invalid field: {name}")
+    return body
+
+
+# Routes : (méthode, motif du chemin, fonction(store, snapshot, groupes, query, body) -> (statut, réponse))
+
+def _search(store, snapshot, groups, query, body):
+    return 200, snapshot.search_filter_sort_tasks(**_params(query, SEARCH_PARAMS))
+
+def _consult(store, snapshot, groups, query, body):
+    return 200, snapshot.consult_task(groups[0])
+
+def _history(store, snapshot, groups, query, body):
+    return 200, store.get_task_history(groups[0], **_params(query, {"page", "size", "since", "until"}))
+
+def _create_task(store, snapshot, groups, query, body):
+    fields = {"title": _is_text, "description": _is_text, "due_date": _is_optional_text, "priority": _is_text}
+    return 201, store.add_task(**_body(body, fields))
+
+def _update_task(store, snapshot, groups, query, body):
+    fields = {"title": _is_optional_text, "description": _is_optional_text, "status": _is_optional_text,
+              "priority": _is_optional_text, "due_date": _is_optional_text,
+              "add_tags": lambda value: value is None or _is_text_list(value),
+              "remove_tags": lambda value: value is None or _is_text_list(value),
+              "expected_version": _is_version}
+    return 200, store.update_task(groups[0], **_body(body, fields))
+
+def _delete_task(store, snapshot, groups, query, body):
+    store.delete_task(groups[0])
+    return 204, None
+
+def _assign(store, snapshot, groups, query, body):
+    body = _body(body, {"user_id": _is_optional_text, "expected_version": _is_version})
+    return 200, store.assign_task(groups[0], body.get("user_id"), body.get("expected_version"))
+
+def _users(store, snapshot, groups, query, body):
+    params = _params(query, {"prefix", "page", "size", "cursor"})
+    if "prefix" in params:
+        return 200, {"users": store.search_users(params["prefix"], limit=params.get("size", 10))}
+    return 200, store.list_users(**params)
+
+def _user(store, snapshot, groups, query, body):
+    user = store.get_user_by_id(groups[0])
+    if user is None:
+        raise ValueError("User not found")
+    return 200, user
+
+def _create_user(store, snapshot, groups, query, body):
+    body = _body(body, {"name": _is_text, "email": _is_text})
+    return 201, store.create_user(body.get("name", ""), body.get("email", ""))
+
+ROUTES = [
+    ("GET", r"/tasks", _search),
+    ("POST", r"/tasks", _create_task),
+    ("GET", r"/tasks/([^/]+)", _consult),
+    ("PATCH", r"/tasks/([^/]+)", _update_task),
+    ("DELETE", r"/tasks/([^/]+)", _delete_task),
+    ("GET", r"/tasks/([^/]+)/history", _history),
+    ("PUT", r"/tasks/([^/]+)/assignee", _assign),
+    ("GET", r"/users", _users),
+    ("POST", r"/users", _create_user),
+    ("GET", r"/users/([^/]+)", _user),
+]
+_ROUTES = [(method, re.compile(pattern + r"/?"), function) for method, pattern, function in ROUTES]
+_TASK_PATH = re.compile(r"/tasks/([^/]+)/?")
+
+
+def dispatch(store: TaskStore, method: str, target: str, body=None, snapshot=None):
+    """Exécute une requête de l'API : (statut, réponse JSON ou None).
+
+    snapshot : source des consultations et recherches (dernière version publiée par défaut)
+    """
+    url = urlsplit(target)
+    path = unquote(url.path)
+    query = parse_qs(url.query)
+    allowed = False
+    for route_method, pattern, function in _ROUTES:
+        match = pattern.fullmatch(path)
+        if not match:
+            continue
+        allowed = True
+        if route_method != method:
+            continue
+        try:
+            if snapshot is None:
+                snapshot = store.snapshot()
+            return function(store, snapshot, match.groups(), query, body)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except TypeError as e:
+            # Champ obligatoire absent du corps (titre, ...)
+            return 400, {"error": f"Invalid arguments: {e}"}
+        except VersionConflictError as e:
+            return 409, {"error": str(e), "current_version": e.current}
+        except ValueError as e:
+            return (404 if str(e).endswith("not found") else 400), {"error": str(e)}
+        except Exception as e:
+            # Dernier recours : une réponse d'erreur plutôt qu'une connexion coupée
+            # (et, dans /batch, les requêtes suivantes s'exécutent quand même)
+            return 500, {"error": f"Internal error: {type(e).__name__}"}
+    if allowed:
+        return 405, {"error": "Method not allowed"}
+    return 404, {"error": "Not found"}
+
+def run_batch(store: TaskStore, requests) -> list:
+    """Requêtes de /batch, dans l'ordre et avec une seule sauvegarde"""
+    if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+        raise HTTPError(400, f"requests must be a list of at most {MAX_BATCH} requests")
+    responses = []
+    with store.batch():
+        for request in requests:
+            if not isinstance(request, dict) or not isinstance(request.get("path"), str):
+                responses.append({"status": 400, "body": {"error": "Invalid request"}})
+                continue
+            # Lectures sur l'état courant du lot (store), pas sur la dernière version publiée
+            status, payload = dispatch(store, str(request.get("method", "GET")).upper(),
+                                       request["path"], request.get("body"), snapshot=store)
+            responses.append({"status": status, "body": payload})
+    return responses
+
+
+class TaskRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "TaskManagerHTTP/1.0"
+    # En-têtes et corps partent en deux écritures : sans TCP_NODELAY, chaque réponse
+    # d'une connexion persistante attendrait l'accusé de réception retardé (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        if not length:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            raise HTTPError(400, "Invalid JSON")
+
+    def _send(self, status: int, payload=None, etag: Optional[str] = None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        body = b""
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Vary", "Accept-Encoding")
+            if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=5)
+                self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        store = self.server.store
+        try:
+            body = self._read_body()
+            if method == "POST" and urlsplit(self.path).path.rstrip("/") == "/batch":
+                requests = body.get("requests") if isinstance(body, dict) else None
+                self._send(200, {"responses": run_batch(store, requests)})
+                return
+            if method != "GET":
+                self._send(*dispatch(store, method, self.path, body))
+                return
+            # Version fixée avant la lecture : la réponse et son ETag vont ensemble
+            snapshot = store.snapshot()
+            etag = self._etag(snapshot)
+            if etag in self.headers.get("If-None-Match", ""):
+                self._send(304, etag=etag)
+                return
+            status, payload = dispatch(store, method, self.path, snapshot=snapshot)
+            self._send(status, payload, etag if status == 200 else None)
+        except HTTPError as e:
+            self._send(e.status, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"Internal error: {type(e).__name__}"})
+
+    def _etag(self, snapshot) -> str:
+        match = _TASK_PATH.fullmatch(unquote(urlsplit(self.path).path))
+        task = snapshot.get_task(match.group(1)) if match else None
+        if task is not None:
+            # Consultation : les modifications des autres tâches ne l'invalident pas
+            version = f"t{task.get('version', 0)}"
+        else:
+            version = f"v{snapshot.version}"
+        # Avec le jour UTC (voir store_generation) : overdue change à minuit
+        return f'W/"{self.server.token}-{task_manager._generation(version)}"'
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class TaskHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8080), store: Optional[TaskStore] = None, verbose: bool = False):
+        self.store = store or TaskStore()
+        self.verbose = verbose
+        # Les versions repartent de 0 à chaque démarrage : le jeton distingue les ETag
+        self.token = uuid.uuid4().hex[:8]
+        super().__init__(address, TaskRequestHandler)
@@ -1,18 +1,64 @@
 #!/usr/bin/env python3
 
-import click, sys, os
+import click, sys, os, shlex, json, inspect, builtins
 from rich.console import Console
+from click.core import ParameterSource
 from rich.table import Table
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.task_manager import *
+from src.timings import span, format_timings
+from src import metrics
 
 console = Console()
 
+PROFILE_TOP = 30
+
 @click.group()
-def cli():
+@click.option('--profile', is_flag=True, help='Profiler la commande (cProfile) et afficher les fonctions les plus coûteuses')
+@click.option('--profile-output', type=click.Path(dir_okay=False, writable=True),
+              help='Écrire les statistiques cProfile dans ce fichier (format pstats)')
+@click.option('--timings', is_flag=True, help='Afficher le temps passé en chargement, requête, rendu et sauvegarde')
+@click.option('--metrics', 'collect_metrics', is_flag=True, help='Activer la collecte des métriques (voir la commande metrics)')
+@click.option('--metrics-file', type=click.Path(dir_okay=False, writable=True),
+              help='Écrire les métriques au format Prometheus dans ce fichier en fin de commande')
+@click.pass_context
+def cli(ctx, profile, profile_output, timings, collect_metrics, metrics_file):
     """Gestionnaire de Tâches - Version CLI Python"""
-    pass
+    if collect_metrics or metrics_file:
+        metrics.enable()
+    if metrics_file:
+        ctx.call_on_close(lambda: _write_metrics(metrics_file))
+    if profile or profile_output:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        ctx.call_on_close(lambda: _report_profile(profiler, profile_output))
+    if timings:
+        # Le chargement a eu lieu à l'import : son span est déjà enregistré
+        ctx.call_on_close(lambda: click.echo(format_timings(), err=True))
+
+def _report_profile(profiler, output):
+    import pstats
+    profiler.disable()
+    if output:
+        profiler.dump_stats(output)
+        click.echo(f"Profil enregistré dans {output} (python -m pstats {output})", err=True)
+    else:
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+        sys.stderr.flush()
+
+def _write_metrics(path):
+    # Écriture atomique : le collecteur textfile de node_exporter ne lit jamais un fichier partiel
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(metrics.render_prometheus())
+    os.replace(temporary, path)
+
+def _print_table(table):
+    with span("render"):
+        console.print(table)
 
 @cli.command()
 def list():
@@ -44,7 +90,7 @@ def list():
             assigned_user or "(non assigné)"
         )
     
-    console.print(table)
+    _print_table(table)
 
 @cli.command()
 def create():
@@ -92,13 +138,19 @@ def consult(task_id):
 
 @cli.command()
 @click.argument('task_id')
-def update(task_id):
-    """Mettre à jour une tâche par ID"""
-    title = click.prompt("Nouveau titre de la tâche (laisser vide pour ne pas changer)", type=str, default="")
-    description = click.prompt("Nouvelle description (laisser vide pour ne pas changer)", type=str, default="")
+@click.option('--add-tag', 'add_tags', multiple=True, help='Ajouter ce tag (répétable)')
+@click.option('--remove-tag', 'remove_tags', multiple=True, help='Retirer ce tag (répétable)')
+def update(task_id, add_tags, remove_tags):
+    """Mettre à jour une tâche par ID (titre et description demandés sauf avec --add-tag / --remove-tag)"""
+    tags = {key: [*value] for key, value in (("add_tags", add_tags), ("remove_tags", remove_tags)) if value}
+    if tags:
+        title = description = ""
+    else:
+        title = click.prompt("Nouveau titre de la tâche (laisser vide pour ne pas changer)", type=str, default="")
+        description = click.prompt("Nouvelle description (laisser vide pour ne pas changer)", type=str, default="")
     
     try:
-        task = update_task(task_id, title=title or None, description=description or None)
+        task = update_task(task_id, title=title or None, description=description or None, **tags)
         console.print(f"Tâche mise à jour avec succès: [bold]{task['title']}[/bold]", style="green")
     except ValueError as e:
         console.print(f"Erreur lors de la mise à jour de la tâche: {e}", style="red")
@@ -135,9 +187,29 @@ def assign(task_id, user_id):
         console.print(f"Erreur : {str(e)}", style="red")
 
 @cli.command()
-def users():
+@click.option('--prefix', help='Rechercher les utilisateurs dont le nom commence par ce préfixe')
+@click.option('--page', default=1, type=click.IntRange(min=1), help='Numéro de page, tri par nom (défaut: 1)')
+@click.option('--size', default=20, type=click.IntRange(min=1), help='Taille de page (défaut: 20)')
+@click.option('--cursor', help='Reprendre après le curseur affiché par la page précédente')
+@click.pass_context
+def users(ctx, prefix, page, size, cursor):
     """Lister les utilisateurs"""
-    users = get_users()
+    next_cursor = None
+    # Sans --page, --size ni --cursor : tous les utilisateurs
+    paged = cursor is not None or any(ctx.get_parameter_source(name) is not ParameterSource.DEFAULT
+                                      for name in ("page", "size"))
+    if prefix is not None:
+        users = search_users(prefix, limit=size)
+    elif paged:
+        try:
+            result = list_users(page=page, size=size, cursor=cursor)
+        except ValueError as e:
+            console.print(f"Erreur : {str(e)}", style="red")
+            return
+        users = result["users"]
+        next_cursor = result["next_cursor"]
+    else:
+        users = get_users()
     
     if not users:
         console.print("Aucun utilisateur trouvé.", style="yellow")
@@ -151,7 +223,10 @@ def users():
     for user in users:
         table.add_row(user["id"], user["name"], user["email"])
     
-    console.print(table)
+    _print_table(table)
+
+    if next_cursor:
+        console.print(f"\nPage suivante : --cursor {next_cursor}", style="dim", soft_wrap=True)
 
 @cli.command()
 @click.argument('user_id')
@@ -193,15 +268,43 @@ def unassigned():
 @click.option('--search', help='Rechercher dans titre/description')
 @click.option('--page', default=1, help='Numéro de page (défaut: 1)')
 @click.option('--size', default=20, help='Taille de page (défaut: 20)')
-def filter(status, user, search, page, size):
+@click.option('--count', 'count_only', is_flag=True, help='Afficher uniquement le nombre de tâches trouvées')
+@click.option('--ids-only', is_flag=True, help='Afficher uniquement les IDs (un par ligne)')
+@click.option('--created-from', help='Créées à partir de cette date (AAAA-MM-JJ)')
+@click.option('--created-to', help="Créées jusqu'à cette date incluse (AAAA-MM-JJ)")
+@click.option('--tag', 'tags', multiple=True, help='Avec ce tag (répétable : au moins un des tags demandés)')
+def filter(status, user, search, page, size, count_only, ids_only, created_from, created_to, tags):
     """Filtrer les tâches avec plusieurs critères"""
+    # Transmis seulement s'ils sont fournis
+    optional = {key: value for key, value in (("created_from", created_from), ("created_to", created_to)) if value}
+    if tags:
+        optional["tags"] = [*tags]
     try:
+        if count_only or ids_only:
+            result = search_filter_sort_tasks(
+                status=status,
+                user_id=user,
+                query=search,
+                page=page,
+                size=size,
+                projection="count" if count_only else "ids",
+                **optional
+            )
+            # Sortie brute pour les scripts (pas de mise en forme rich)
+            if count_only:
+                click.echo(result["total_items"])
+            else:
+                for task_id in result["ids"]:
+                    click.echo(task_id)
+            return
+
         result = search_filter_sort_tasks(
             status=status,
             user_id=user,
             query=search,
             page=page,
-            size=size
+            size=size,
+            **optional
         )
         
         if not result["tasks"]:
@@ -221,6 +324,10 @@ def filter(status, user, search, page, size):
                 filters.append(f"assigné à: {user_name}")
         if search:
             filters.append(f"recherche: '{search}'")
+        if created_from or created_to:
+            filters.append(f"créées: {created_from or '…'} → {created_to or '…'}")
+        if tags:
+            filters.append(f"tags: {', '.join(tags)}")
         
         title = "Tâches filtrées"
         if filters:
@@ -247,7 +354,7 @@ def filter(status, user, search, page, size):
                 assigned_user or "(non assigné)"
             )
         
-        console.print(table)
+        _print_table(table)
         
         # Afficher les informations de pagination
         if result["total_pages"] > 1:
@@ -296,7 +403,7 @@ def user_filter(user_id, page, size):
                 task["description"]
             )
         
-        console.print(table)
+        _print_table(table)
         
         # Afficher les informations de pagination
         if result["total_pages"] > 1:
@@ -305,6 +412,418 @@ def user_filter(user_id, page, size):
     except ValueError as e:
         console.print(f"Erreur : {str(e)}", style="red")
 
+# Opérations acceptées par batch : fonction, arguments positionnels, options
+# (une option au pluriel, ex. add_tags, se répète sous la forme --add-tag)
+BATCH_OPERATIONS = {
+    "create": (add_task, ("title", "description"), {"due_date", "priority"}),
+    "update": (update_task, ("task_id",),
+               {"title", "description", "status", "priority", "due_date", "add_tags", "remove_tags"}),
+    "delete": (delete_task, ("task_id",), set()),
+    "assign": (assign_task, ("task_id", "user_id"), set()),
+    "create-user": (create_user, ("name", "email"), set()),
+}
+# Options qui prennent une liste (--add-tag a --add-tag b, --add-tags a, ou une liste JSON)
+BATCH_LIST_OPTIONS = {"add_tags", "remove_tags"}
+
+def _check_batch_values(kwargs):
+    """Normalise les options de liste et vérifie les types (valeurs JSON notamment)"""
+    for name, value in kwargs.items():
+        if name in BATCH_LIST_OPTIONS:
+            if isinstance(value, str):
+                value = kwargs[name] = [value]
+            # list est ici la commande click du même nom
+            if not isinstance(value, builtins.list) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"Invalid value for {name}: list of strings expected")
+        elif value is not None and not isinstance(value, str):
+            raise ValueError(f"Invalid value for {name}: string expected")
+
+def parse_batch_line(line):
+    """Transforme une ligne (sous-commande ou objet JSON) en (fonction, kwargs)"""
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e.msg}")
+        if not isinstance(data, dict):
+            raise ValueError("Invalid JSON: object expected")
+        op = data.pop("op", None)
+        positional, kwargs = [], data
+    else:
+        tokens = shlex.split(line)
+        op, positional, kwargs = tokens[0], [], {}
+        tokens = tokens[1:]
+        while tokens:
+            token = tokens.pop(0)
+            if not token.startswith("--"):
+                positional.append(token)
+                continue
+            if not tokens:
+                raise ValueError(f"Missing value for {token}")
+            name = token[2:].replace("-", "_")
+            if f"{name}s" in BATCH_LIST_OPTIONS:
+                name = f"{name}s"
+            if name in BATCH_LIST_OPTIONS:
+                kwargs.setdefault(name, []).append(tokens.pop(0))
+            else:
+                kwargs[name] = tokens.pop(0)
+
+    if op not in BATCH_OPERATIONS:
+        raise ValueError(f"Unknown operation: {op}")
+    function, positional_names, options = BATCH_OPERATIONS[op]
+    if len(positional) > len(positional_names):
+        raise ValueError("Too many arguments")
+    kwargs.update(zip(positional_names, positional))
+    unknown = set(kwargs) - set(positional_names) - options
+    if unknown:
+        raise ValueError(f"Unknown argument: {', '.join(sorted(unknown))}")
+    _check_batch_values(kwargs)
+    parameters = inspect.signature(function).parameters
+    missing = [name for name in positional_names
+               if name not in kwargs and parameters[name].default is inspect.Parameter.empty]
+    if missing:
+        raise ValueError(f"Missing argument: {', '.join(missing)}")
+    return function, kwargs
+
+@cli.command()
+@click.argument('script', type=click.File('r', encoding='utf-8'), default='-')
+@click.option('--checkpoint', type=click.IntRange(min=1), help='Sauvegarder toutes les N opérations réussies')
+@click.option('--stop-on-error', is_flag=True, help="S'arrêter à la première erreur")
+def batch(script, checkpoint, stop_on_error):
+    """Exécuter un fichier de commandes (ou stdin) en une seule sauvegarde"""
+    succeeded = failed = 0
+    with deferred_saves():
+        for line_number, line in enumerate(script, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                function, kwargs = parse_batch_line(line)
+                result = function(**kwargs)
+            except Exception as e:
+                # Toute erreur reste celle de sa ligne : les lignes suivantes s'exécutent
+                failed += 1
+                message = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+                click.echo(f"{line_number}\terror\t{message}")
+                if stop_on_error:
+                    break
+                continue
+            succeeded += 1
+            click.echo(f"{line_number}\tok\t{result['id'] if isinstance(result, dict) else ''}".rstrip("\t"))
+            if checkpoint and succeeded % checkpoint == 0:
+                flush_saves()
+
+    click.echo(f"{succeeded} opération(s) réussie(s), {failed} erreur(s)", err=True)
+    if failed:
+        click.get_current_context().exit(1)
+
+SHELL_HISTORY_FILE = os.path.expanduser("~/.task_manager_history")
+SHELL_EXIT_WORDS = {"exit", "quit"}
+# Arguments positionnels attendus par commande, pour la complétion
+SHELL_POSITIONAL_KINDS = {
+    "consult": ["task"],
+    "update": ["task"],
+    "delete": ["task"],
+    "assign": ["task", "user"],
+    "user-tasks": ["user"],
+    "user-filter": ["user"],
+}
+SHELL_OPTION_KINDS = {"--user": "user", "--tag": "tag", "--add-tag": "tag", "--remove-tag": "tag"}
+
+def _shell_candidates(kind):
+    if kind == "task":
+        return [str(task["id"]) for task in get_tasks()]
+    if kind == "user":
+        return [str(user["id"]) for user in get_users()] + ["unassigned"]
+    if kind == "tag":
+        return sorted(get_all_tags())
+    return []
+
+def shell_complete(line, text):
+    """Propositions de complétion pour le mot text dans la ligne line"""
+    words = line.split()
+    if line and not line[-1].isspace():
+        words = words[:-1]
+    if not words:
+        return sorted(name for name in [*cli.commands, *SHELL_EXIT_WORDS, "help"]
+                      if name.startswith(text) and name != "shell")
+
+    command = cli.commands.get(words[0])
+    if command is None:
+        return []
+    if text.startswith("-"):
+        options = [opt for param in command.params for opt in param.opts if opt.startswith("--")]
+        return sorted(opt for opt in options if opt.startswith(text))
+
+    previous = words[-1]
+    if previous in SHELL_OPTION_KINDS:
+        kind = SHELL_OPTION_KINDS[previous]
+    else:
+        positional = [w for i, w in enumerate(words[1:], 1)
+                      if not w.startswith("-") and words[i - 1] not in SHELL_OPTION_KINDS]
+        kinds = SHELL_POSITIONAL_KINDS.get(words[0], [])
+        kind = kinds[len(positional)] if len(positional) < len(kinds) else None
+    return [candidate for candidate in _shell_candidates(kind) if candidate.startswith(text)]
+
+def _setup_readline():
+    """Active historique et complétion si readline est disponible"""
+    try:
+        import readline
+    except ImportError:
+        return None
+
+    def completer(text, state):
+        matches = shell_complete(readline.get_line_buffer()[:readline.get_endidx()], text)
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(completer)
+    readline.set_completer_delims(" \t\n")
+    readline.parse_and_bind("tab: complete")
+    try:
+        readline.read_history_file(SHELL_HISTORY_FILE)
+    except OSError:
+        pass
+    return readline
+
+def run_shell_line(line):
+    """Exécute une ligne du shell ; renvoie False pour quitter"""
+    try:
+        args = shlex.split(line)
+    except ValueError as e:
+        console.print(f"Erreur : {e}", style="red")
+        return True
+    if not args:
+        return True
+    if args[0] in SHELL_EXIT_WORDS:
+        return False
+    if args[0] == "help":
+        if len(args) == 1:
+            console.print("Commandes disponibles :", style="bold")
+            for name in sorted(cli.commands):
+                if name != "shell":
+                    console.print(f"  {name:<12} {cli.commands[name].get_short_help_str(60)}")
+            console.print("  help <commande> pour le détail, exit pour quitter", style="dim")
+            return True
+        args = [args[1], "--help"]
+    command = cli.commands.get(args[0])
+    if command is None or args[0] == "shell":
+        console.print(f"Commande inconnue : {args[0]} (tapez 'help')", style="red")
+        return True
+    try:
+        command.main(args=args[1:], prog_name=args[0], standalone_mode=False)
+    except click.exceptions.Abort:
+        console.print("Annulé.", style="yellow")
+    except click.exceptions.ClickException as e:
+        e.show()
+    except Exception as e:
+        # Comme pour batch : l'erreur reste celle de sa ligne, le shell continue
+        message = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+        console.print(f"Erreur : {message}", style="red")
+    return True
+
+@cli.command()
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'store_format', type=click.Choice(STORE_FORMATS), default='json',
+              help='Format du fichier exporté (défaut: json)')
+@click.option('--users', is_flag=True, help='Exporter les utilisateurs au lieu des tâches')
+def export(output, store_format, users):
+    """Exporter les tâches (ou les utilisateurs) en JSON ou en snapshot binaire"""
+    try:
+        count = export_store(output, store_format, users=users)
+        console.print(f"{count} élément(s) exporté(s) dans {output} ({store_format})", style="green")
+    except (ValueError, OSError) as e:
+        console.print(f"Erreur lors de l'export : {e}", style="red")
+
+# Nombre d'erreurs affichées à l'écran par import (toutes vont dans --report)
+IMPORT_ERRORS_SHOWN = 20
+
+@cli.command(name='import')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', type=click.IntRange(min=1),
+              help='Processus de décodage et de validation (défaut : nombre de cœurs)')
+@click.option('--report', type=click.Path(dir_okay=False, writable=True),
+              help='Écrire les lignes rejetées dans ce fichier (NDJSON : line, error)')
+def import_command(source, workers, report):
+    """Importer des tâches depuis un fichier NDJSON (un objet JSON par ligne)"""
+    try:
+        result = import_tasks(source, workers=workers)
+    except (ValueError, OSError) as e:
+        console.print(f"Erreur lors de l'import : {e}", style="red")
+        return
+
+    errors = result["errors"]
+    console.print(f"{result['imported']} tâche(s) importée(s), {len(errors)} ligne(s) rejetée(s)",
+                  style="yellow" if errors else "green")
+    if report:
+        with open(report, 'w', encoding='utf-8') as f:
+            for line, message in errors:
+                f.write(json.dumps({"line": line, "error": message}, ensure_ascii=False) + "\n")
+        console.print(f"Rapport d'erreurs écrit dans {report}")
+    elif errors:
+        table = Table(title="Lignes rejetées")
+        table.add_column("Ligne", style="cyan", justify="right")
+        table.add_column("Erreur", style="red")
+        for line, message in errors[:IMPORT_ERRORS_SHOWN]:
+            table.add_row(str(line), message)
+        _print_table(table)
+        if len(errors) > IMPORT_ERRORS_SHOWN:
+            console.print(f"... {len(errors) - IMPORT_ERRORS_SHOWN} autre(s) : utiliser --report", style="dim")
+
+def _describe_change(change):
+    events = ", ".join(event["event"] for event in change["events"])
+    title = (change.get("task") or change.get("previous") or {}).get("title", "")
+    return f"#{change['seq']} {change['timestamp']} {change['type']:8} {change['task_id']} {title}" + \
+        (f" ({events})" if events else "")
+
+@cli.command()
+@click.option('--since', type=click.IntRange(min=0), default=0,
+              help='Afficher les modifications après cette séquence (défaut: depuis le début)')
+@click.option('--interval', type=click.FloatRange(min=0.05), default=1.0,
+              help='Intervalle de lecture du journal en secondes (défaut: 1)')
+@click.option('--once', is_flag=True, help="S'arrêter à la fin du journal au lieu d'attendre la suite")
+@click.option('--json', 'as_json', is_flag=True, help='Une entrée JSON par ligne (pour un autre programme)')
+def watch(since, interval, once, as_json):
+    """Suivre le journal des modifications de tâches (Ctrl+C pour arrêter)"""
+    try:
+        for change in watch_changes(since, interval=interval, once=once):
+            if as_json:
+                click.echo(json.dumps(change, ensure_ascii=False))
+            else:
+                console.print(_describe_change(change), markup=False, highlight=False)
+    except KeyboardInterrupt:
+        pass
+
+@cli.command(name='serve-http')
+@click.option('--host', default='127.0.0.1', help="Adresse d'écoute (défaut: 127.0.0.1)")
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=8080, help="Port d'écoute (défaut: 8080)")
+@click.option('--verbose', is_flag=True, help='Journaliser chaque requête sur la sortie d\'erreur')
+def serve_http(host, port, verbose):
+    """Servir l'API HTTP JSON (consultation, recherche, modifications, lots) ; Ctrl+C pour arrêter"""
+    from src.http_api import TaskHTTPServer
+    server = TaskHTTPServer((host, port), verbose=verbose)
+    console.print(f"API HTTP sur http://{host}:{server.server_address[1]}", style="green")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+@cli.command(name='serve-changes')
+@click.option('--host', default='127.0.0.1', help="Adresse d'écoute (défaut: 127.0.0.1)")
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=8765, help="Port d'écoute (défaut: 8765)")
+def serve_changes(host, port):
+    """Diffuser le stockage et son journal aux répliques en lecture seule (Ctrl+C pour arrêter)"""
+    from src.replica import FeedServer
+    server = FeedServer((host, port))
+    console.print(f"Journal diffusé sur {host}:{server.server_address[1]}", style="green")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stopping.set()
+        server.server_close()
+
+@cli.command(name='export-changes')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--since', type=click.IntRange(min=0), default=None,
+              help='Séquence du journal à partir de laquelle exporter')
+@click.option('--since-time', help='Date ISO 8601 à partir de laquelle exporter (heure locale si sans fuseau)')
+@click.option('--state', type=click.Path(dir_okay=False),
+              help="Fichier de reprise : lu pour le point de départ, mis à jour après l'export")
+def export_changes_command(output, since, since_time, state):
+    """Exporter en NDJSON les tâches créées, modifiées ou supprimées depuis un point"""
+    if since is None and since_time is None and state and os.path.exists(state):
+        with open(state, encoding='utf-8') as f:
+            since = json.load(f)["last_seq"]
+    try:
+        result = export_changes(output, since=since or 0, since_time=since_time)
+    except (ValueError, OSError) as e:
+        console.print(f"Erreur lors de l'export : {e}", style="red")
+        return
+    if state:
+        with open(state, 'w', encoding='utf-8') as f:
+            json.dump({"last_seq": result["last_seq"]}, f)
+    console.print(f"{result['exported']} tâche(s) modifiée(s), {result['deleted']} supprimée(s) "
+                  f"exportée(s) dans {output} (séquence {result['last_seq']})", style="green")
+
+@cli.command(name='compact-history')
+@click.option('--task', 'task_id', help='Compacter seulement cette tâche (défaut: toutes)')
+@click.option('--keep', type=click.IntRange(min=0), default=HISTORY_KEEP_RECENT,
+              help=f'Événements récents conservés tels quels (défaut: {HISTORY_KEEP_RECENT})')
+def compact_history_command(task_id, keep):
+    """Regrouper les anciennes modifications de champ de l'historique (par type et par jour)"""
+    try:
+        removed = compact_history(task_id, keep_recent=keep)
+    except ValueError as e:
+        console.print(f"Erreur : {e}", style="red")
+        return
+    console.print(f"{removed} événement(s) d'historique regroupé(s)", style="green")
+
+def _describe_revert(result):
+    return (f"{len(result['updated'])} tâche(s) rétablie(s), {len(result['created'])} recréée(s), "
+            f"{len(result['deleted'])} supprimée(s)")
+
+@cli.command()
+@click.argument('count', type=click.IntRange(min=1), default=1)
+def undo(count):
+    """Annuler les COUNT dernières opérations enregistrées (défaut: 1)"""
+    try:
+        result = undo_changes(count)
+    except ValueError as e:
+        console.print(f"Erreur : {e}", style="red")
+        return
+    console.print(f"Annulé jusqu'à la séquence {result['to_seq']} : {_describe_revert(result)}", style="green")
+
+@cli.command()
+@click.option('--at', 'at', required=True, help='Date ISO 8601 à laquelle revenir (heure locale si sans fuseau)')
+def restore(at):
+    """Ramener les tâches à leur état à une date, d'après le journal des modifications"""
+    try:
+        result = restore_at(at)
+    except ValueError as e:
+        console.print(f"Erreur : {e}", style="red")
+        return
+    console.print(f"Tâches ramenées au {at} : {_describe_revert(result)}", style="green")
+
+@cli.command(name='metrics')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True),
+              help='Écrire les métriques dans ce fichier au lieu de la sortie standard')
+def metrics_command(output):
+    """Afficher les métriques au format texte Prometheus"""
+    if not metrics.is_enabled():
+        click.echo("Collecte désactivée : utiliser --metrics ou TASK_MANAGER_METRICS=1", err=True)
+    if output:
+        _write_metrics(output)
+        console.print(f"Métriques écrites dans {output}", style="green")
+    else:
+        click.echo(metrics.render_prometheus(), nl=False)
+
+@cli.command()
+def shell():
+    """Shell interactif : les données restent chargées entre les commandes"""
+    build_indexes()
+    readline = _setup_readline()
+    console.print("Shell du gestionnaire de tâches - 'help' pour l'aide, 'exit' pour quitter", style="bold blue")
+
+    try:
+        while True:
+            try:
+                line = input("tâches> ")
+            except EOFError:
+                break
+            except KeyboardInterrupt:
+                console.print()
+                continue
+            if not run_shell_line(line):
+                break
+    finally:
+        if readline is not None:
+            try:
+                readline.write_history_file(SHELL_HISTORY_FILE)
+            except OSError:
+                pass
+
 if __name__ == '__main__':
     console.print("Gestionnaire de Tâches - Version CLI Python\n", style="bold blue")
     cli()
\ No newline at end of file
@@ -0,0 +1,131 @@
+# metrics.py - Compteurs, histogrammes et jauges au format texte Prometheus
+#
+# La collecte est désactivée par défaut : chaque opération instrumentée ne coûte
+# alors qu'un test de booléen. Activation par enable() ou TASK_MANAGER_METRICS=1.
+
+import os
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Tuple
+
+PREFIX = "task_manager"
+DURATION_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_state = {"enabled": os.environ.get("TASK_MANAGER_METRICS", "") not in ("", "0")}
+
+# (nom, labels triés) -> valeur
+_counters: Dict[Tuple[str, Tuple], float] = {}
+# (nom, labels triés) -> [compte par bucket..., somme, total]
+_histograms: Dict[Tuple[str, Tuple], List[float]] = {}
+# nom -> fonction renvoyant [(labels, valeur)], évaluée à l'export
+_gauges: Dict[str, Callable[[], List[Tuple[Dict, float]]]] = {}
+_help: Dict[str, Tuple[str, str]] = {}
+
+def enable() -> None:
+    _state["enabled"] = True
+
+def disable() -> None:
+    _state["enabled"] = False
+
+def is_enabled() -> bool:
+    return _state["enabled"]
+
+def reset() -> None:
+    """Remet compteurs et histogrammes à zéro (les jauges sont recalculées à l'export)"""
+    _counters.clear()
+    _histograms.clear()
+
+def describe(name: str, kind: str, help_text: str) -> None:
+    _help[name] = (kind, help_text)
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    if not _state["enabled"]:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name: str, value: float, **labels) -> None:
+    if not _state["enabled"]:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    values = _histograms.get(key)
+    if values is None:
+        values = _histograms[key] = [0] * (len(DURATION_BUCKETS) + 2)
+    for i, bound in enumerate(DURATION_BUCKETS):
+        if value <= bound:
+            values[i] += 1
+    values[-2] += value
+    values[-1] += 1
+
+def register_gauge(name: str, help_text: str, collect: Callable[[], List[Tuple[Dict, float]]]) -> None:
+    """Déclare une jauge dont les valeurs sont lues à l'export"""
+    describe(name, "gauge", help_text)
+    _gauges[name] = collect
+
+describe(f"{PREFIX}_operations_total", "counter", "Appels des opérations publiques par résultat")
+describe(f"{PREFIX}_operation_duration_seconds", "histogram", "Durée des opérations publiques")
+
+def instrumented(operation: str):
+    """Décorateur : compte les appels (ok/error) et mesure leur durée"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state["enabled"]:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = function(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                inc(f"{PREFIX}_operations_total", operation=operation, outcome=outcome)
+                observe(f"{PREFIX}_operation_duration_seconds", time.perf_counter() - start, operation=operation)
+        return wrapper
+    return decorator
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def render_prometheus() -> str:
+    """Exporte toutes les métriques au format texte Prometheus 0.0.4"""
+    lines = []
+
+    def header(name):
+        kind, help_text = _help.get(name, ("untyped", ""))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for name in sorted({name for name, _ in _counters}):
+        header(name)
+        for (metric, labels), value in sorted(_counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for name in sorted({name for name, _ in _histograms}):
+        header(name)
+        for (metric, labels), values in sorted(_histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(DURATION_BUCKETS, values):
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+
+    for name in sorted(_gauges):
+        header(name)
+        for labels, value in _gauges[name]():
+            lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
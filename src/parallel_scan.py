@@ -0,0 +1,61 @@
+# parallel_scan.py - Parcours d'une liste en parallèle par des processus forkés
+#
+# Les processus sont créés par fork au premier parcours : chacun hérite de la liste
+# en mémoire (copie à l'écriture du système), sans sérialisation ni transfert. Ils
+# sont gardés pour les parcours suivants tant que la clé fournie par l'appelant (sa
+# version des données) ne change pas ; sinon le pool est recréé sur l'état courant.
+# Seuls les résultats partiels reviennent au parent.
+#
+# Nécessite fork (Linux) : available() est faux ailleurs et l'appelant reste en séquentiel.
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+_pool = {"executor": None, "key": None}
+# Liste parcourue, héritée par les processus au moment du fork
+_items = {"list": None}
+
+def available() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+def shutdown() -> None:
+    executor = _pool["executor"]
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    _pool.update(executor=None, key=None)
+    _items["list"] = None
+
+def _run(start: int, end: int, function: Callable, args: tuple):
+    return function(_items["list"][start:end], *args)
+
+def partitions(count: int, workers: int) -> List[tuple]:
+    """Bornes (début, fin) de workers partitions contiguës et équilibrées"""
+    step, extra = divmod(count, workers)
+    bounds, start = [], 0
+    for index in range(workers):
+        end = start + step + (index < extra)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+def map_partitions(items: list, key, workers: int, function: Callable, *args) -> Optional[list]:
+    """[function(partition, *args) pour chaque partition de items], calculés en parallèle.
+
+    function doit être une fonction de module (envoyée par nom aux processus).
+    Renvoie None si un processus a disparu : l'appelant refait le calcul lui-même.
+    """
+    if _pool["key"] != (key, workers) or _items["list"] is not items:
+        shutdown()
+        _items["list"] = items
+        _pool["executor"] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+        _pool["key"] = (key, workers)
+    executor = _pool["executor"]
+    try:
+        futures = [executor.submit(_run, start, end, function, args)
+                   for start, end in partitions(len(items), workers)]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        shutdown()
+        return None
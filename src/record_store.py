@@ -0,0 +1,150 @@
+# record_store.py - Fichier d'enregistrements indexé, lu par mmap
+#
+# Fichier de données (entiers little-endian) :
+#   en-tête        : magic "TMRECS", version, jeton du fichier (16 octets)
+#   enregistrement : taille du contenu (uint32), CRC32 du contenu, contenu (dict marshal)
+# Index associé (<fichier>.idx) :
+#   en-tête        : magic "TMRIDX", version, jeton du fichier de données, nombre d'entrées
+#   entrées        : (hash de l'id sur 64 bits, position, taille) triées par hash
+#
+# Une consultation fait une recherche dichotomique dans l'index puis lit un seul
+# enregistrement : son coût ne dépend pas de la taille du stockage. Le jeton relie
+# l'index au fichier de données qu'il décrit ; s'ils ne correspondent pas (écriture
+# interrompue entre les deux), lookup() lève RecordStoreError et l'appelant se
+# rabat sur un chargement complet.
+
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from typing import Dict, List, Optional
+
+MAGIC = b"TMRECS"
+INDEX_MAGIC = b"TMRIDX"
+VERSION = 1
+MARSHAL_VERSION = 4
+
+_HEADER = struct.Struct("<6sH16s")
+_INDEX_HEADER = struct.Struct("<6sH16sI")
+_RECORD = struct.Struct("<II")
+_ENTRY = struct.Struct("<QQI")
+
+class RecordStoreError(ValueError):
+    """Fichier d'enregistrements ou index illisible, corrompu ou périmé"""
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+def is_record_file(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def _key(record_id) -> int:
+    digest = hashlib.blake2b(str(record_id).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def dumps(records: List[Dict]):
+    """(contenu du fichier de données, contenu de l'index) pour records"""
+    token = uuid.uuid4().bytes
+    parts = [_HEADER.pack(MAGIC, VERSION, token)]
+    entries = []
+    offset = _HEADER.size
+    for record in records:
+        payload = marshal.dumps(record, MARSHAL_VERSION)
+        parts.append(_RECORD.pack(len(payload), zlib.crc32(payload)))
+        parts.append(payload)
+        entries.append((_key(record.get("id")), offset, len(payload)))
+        offset += _RECORD.size + len(payload)
+    entries.sort()
+    index = [_INDEX_HEADER.pack(INDEX_MAGIC, VERSION, token, len(entries))]
+    index.extend(_ENTRY.pack(*entry) for entry in entries)
+    return b"".join(parts), b"".join(index)
+
+def _replace(path: str, content: bytes) -> None:
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+def write(path: str, records: List[Dict]) -> None:
+    """Écrit le fichier de données puis son index, chacun remplacé atomiquement"""
+    data, index = dumps(records)
+    _replace(path, data)
+    _replace(index_path(path), index)
+
+def _read_record(buffer, offset: int, length: int) -> Dict:
+    stored_length, checksum = _RECORD.unpack_from(buffer, offset)
+    start = offset + _RECORD.size
+    if stored_length != length or start + length > len(buffer):
+        raise RecordStoreError("Record offset mismatch")
+    with memoryview(buffer)[start:start + length] as payload:
+        if zlib.crc32(payload) != checksum:
+            raise RecordStoreError("Record checksum mismatch")
+        return marshal.loads(payload)
+
+def _check_header(buffer) -> bytes:
+    if len(buffer) < _HEADER.size:
+        raise RecordStoreError("Invalid record file header")
+    magic, version, token = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise RecordStoreError("Invalid record file header")
+    if version != VERSION:
+        raise RecordStoreError(f"Unsupported record file version: {version}")
+    return token
+
+def loads(data: bytes) -> List[Dict]:
+    """Tous les enregistrements, dans l'ordre du fichier"""
+    _check_header(data)
+    records = []
+    offset = _HEADER.size
+    while offset < len(data):
+        if offset + _RECORD.size > len(data):
+            raise RecordStoreError("Truncated record file")
+        (length, _) = _RECORD.unpack_from(data, offset)
+        records.append(_read_record(data, offset, length))
+        offset += _RECORD.size + length
+    return records
+
+def lookup(path: str, record_id) -> Optional[Dict]:
+    """L'enregistrement d'id record_id (None s'il n'existe pas), sans lire le reste du fichier"""
+    key = _key(record_id)
+    try:
+        with open(path, 'rb') as data_file, open(index_path(path), 'rb') as index_file:
+            with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+                 mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                token = _check_header(data)
+                if len(index) < _INDEX_HEADER.size:
+                    raise RecordStoreError("Invalid index header")
+                magic, version, index_token, count = _INDEX_HEADER.unpack_from(index)
+                if magic != INDEX_MAGIC or version != VERSION:
+                    raise RecordStoreError("Invalid index header")
+                if index_token != token or len(index) != _INDEX_HEADER.size + count * _ENTRY.size:
+                    raise RecordStoreError("Stale index")
+
+                # Première entrée dont le hash est >= key
+                low, high = 0, count
+                while low < high:
+                    middle = (low + high) // 2
+                    if _ENTRY.unpack_from(index, _INDEX_HEADER.size + middle * _ENTRY.size)[0] < key:
+                        low = middle + 1
+                    else:
+                        high = middle
+                # Plusieurs ids peuvent partager un hash : on vérifie l'id de chaque candidat
+                for position in range(low, count):
+                    entry_key, offset, length = _ENTRY.unpack_from(index, _INDEX_HEADER.size + position * _ENTRY.size)
+                    if entry_key != key:
+                        break
+                    record = _read_record(data, offset, length)
+                    if str(record.get("id")) == str(record_id):
+                        return record
+                return None
+    except (OSError, ValueError, EOFError, struct.error) as e:
+        if isinstance(e, RecordStoreError):
+            raise
+        raise RecordStoreError(f"Unreadable record store: {e}") from e
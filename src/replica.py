@@ -0,0 +1,308 @@
+# replica.py - Réplique en lecture seule qui suit le journal des modifications
+#
+# Un autre processus (tableaux de bord, exports) sert les lectures lourdes sans
+# partager le verrou ni la mémoire du processus qui écrit. La réplique charge une
+# fois le fichier de données du primaire, puis applique les entrées du journal
+# (voir change_feed.py) de séquence supérieure à la dernière appliquée : on peut
+# reprendre à une séquence déjà vue. Chaque entrée porte l'état de la tâche sans son
+# historique : celui de la réplique est prolongé des événements de l'entrée, et borné
+# comme celui du primaire (HISTORY_LIMIT). Une entrée dont la tâche chargée a déjà la
+# version est sautée : ses événements y sont déjà. Les lectures passent par des
+# Snapshot (voir task_store.py). Chaque lot d'entrées appliqué publie une nouvelle
+# version, et les lecteurs ne sont jamais bloqués.
+#
+# Source : chemin du journal (même machine), ou "hôte:port" d'un FeedServer lancé à
+# côté du primaire (commande serve-changes). Les utilisateurs ne sont pas journalisés :
+# ceux du primaire sont lus au démarrage seulement (fichier d'utilisateurs à côté de
+# son fichier de données, ou envoyés par le FeedServer). Les lectures, dont la
+# validation de user_id dans les recherches, n'utilisent que ces utilisateurs.
+#
+#   replica = Replica("tasks.json.changes").start()
+#   replica.search_filter_sort_tasks(status="TODO")
+#   replica.lag()          # {"entries": ..., "seconds": ...}
+#   replica.stop()
+#
+# Protocole du FeedServer (une requête, puis des lignes JSON jusqu'à la déconnexion) :
+#   "snapshot\n" -> {"task": ...} et {"user": ...} pour tout le stockage, puis le flux
+#   "since N\n"  -> le flux des entrées de séquence > N
+# Flux : les entrées du journal, et {"head": séquence} après chaque lecture du
+# journal (fin d'un lot, et signe de vie quand rien ne change).
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src import change_feed, metrics, task_manager
+from src.task_store import Snapshot
+
+# Entrées appliquées au plus par version publiée (fraîcheur pendant un rattrapage)
+APPLY_BATCH = 1000
+# Tentatives de lecture du fichier de données pendant qu'il est réécrit
+READ_ATTEMPTS = 50
+
+# Répliques démarrées, pour les jauges de retard
+_replicas = []
+
+def _read_records(path: Optional[str]) -> list:
+    """Contenu d'un fichier de données du primaire ([] s'il n'existe pas encore)"""
+    for _ in range(READ_ATTEMPTS):
+        if not path or not os.path.exists(path):
+            return []
+        try:
+            return task_manager._read_store(path)
+        except (ValueError, IOError):
+            # Lu pendant une réécriture (json.dump n'est pas atomique) : on recommence
+            time.sleep(0.05)
+    return task_manager._read_store(path)
+
+def _initial_snapshot(tasks: list, users: list) -> Snapshot:
+    # Enregistrements tout juste décodés, que personne d'autre ne tient : pas de copie
+    base = {str(task["id"]): task for task in tasks}
+    return Snapshot(0, base, {}, len(base), tuple(users))
+
+
+class Replica:
+    """Copie en lecture seule du stockage d'un primaire, tenue à jour par son journal"""
+
+    def __init__(self, source: str, data_file: Optional[str] = None, user_file: Optional[str] = None,
+                 interval: float = 0.2):
+        self.source = source
+        self.interval = interval
+        self._address = None
+        if not os.path.exists(source) and source.rpartition(":")[2].isdigit():
+            host, _, port = source.rpartition(":")
+            self._address = (host or "127.0.0.1", int(port))
+        elif data_file is None:
+            if not source.endswith(".changes"):
+                raise ValueError("Invalid replica source")
+            data_file = source[:-len(".changes")]
+        self._data_file = data_file
+        if user_file is None and data_file is not None:
+            # Utilisateurs du primaire, pas ceux du dossier courant de ce processus
+            user_file = os.path.join(os.path.dirname(data_file), os.path.basename(task_manager.USER_FILE))
+        self._user_file = user_file
+        self._current = None
+        self.applied = 0
+        self.head = 0
+        self._behind_since = None
+        self._condition = threading.Condition()
+        self._stopping = threading.Event()
+        self._socket = None
+        self._stream = None
+        self._thread = None
+
+    def start(self) -> "Replica":
+        """Charge l'état initial puis suit la source dans un thread"""
+        if self._address is None:
+            # Séquence lue avant les données : elles contiennent au moins tout jusqu'à elle,
+            # parfois plus (voir _apply)
+            head = change_feed.last_sequence(self.source)
+            self._publish(_initial_snapshot(_read_records(self._data_file), _read_records(self._user_file)), head)
+            target = self._follow_file
+        else:
+            self._connect("snapshot")
+            tasks, users = [], []
+            for message in self._messages():
+                if "task" in message:
+                    tasks.append(message["task"])
+                elif "user" in message:
+                    users.append(message["user"])
+                elif "head" in message:
+                    self._publish(_initial_snapshot(tasks, users), message["head"])
+                    break
+            else:
+                raise ConnectionError("Feed closed before the snapshot was complete")
+            target = self._follow_socket
+        self._thread = threading.Thread(target=target, name="replica", daemon=True)
+        self._thread.start()
+        _replicas.append(self)
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+        if self in _replicas:
+            _replicas.remove(self)
+
+    # Application des entrées
+
+    def _publish(self, snapshot: Snapshot, sequence: int) -> None:
+        with self._condition:
+            self._current = snapshot
+            self.applied = max(self.applied, sequence)
+            self._set_head(sequence)
+            self._condition.notify_all()
+
+    def _set_head(self, head: int) -> None:
+        self.head = max(self.head, head)
+        if self.applied >= self.head:
+            self._behind_since = None
+        elif self._behind_since is None:
+            self._behind_since = time.monotonic()
+
+    def _apply(self, entries: List[Dict]) -> None:
+        entries = [entry for entry in entries if entry["seq"] > self.applied]
+        if not entries:
+            return
+        current = self._current
+        updates = {}
+        for entry in entries:
+            task_id = entry["task_id"]
+            if entry["type"] == "deleted":
+                updates[task_id] = None
+                continue
+            previous = updates[task_id] if task_id in updates else current.get_task(task_id)
+            if previous is not None and previous.get("version", 0) >= entry["task"].get("version", 0):
+                # Déjà dans les données chargées (lues après la séquence de départ) : ses
+                # événements sont déjà dans l'historique
+                continue
+            # Nouvelle liste : le Snapshot courant reste figé
+            history = [*(previous or {}).get("history", []), *entry["events"]]
+            if len(history) > task_manager.HISTORY_LIMIT:
+                task_manager._cap_history(history)
+            updates[task_id] = {**entry["task"], "history": history}
+        self._publish(current.derive(updates, current.users), entries[-1]["seq"])
+
+    def _follow_file(self) -> None:
+        while not self._stopping.is_set():
+            self._set_head(change_feed.last_sequence(self.source))
+            batch = []
+            for entry in change_feed.iterate(self.source, self.applied):
+                batch.append(entry)
+                if len(batch) >= APPLY_BATCH:
+                    self._apply(batch)
+                    batch = []
+            self._apply(batch)
+            self._stopping.wait(self.interval)
+
+    def _connect(self, request: str) -> None:
+        self._socket = socket.create_connection(self._address)
+        self._socket.sendall(request.encode() + b"\n")
+        # Un seul lecteur par connexion : il garde les octets déjà reçus d'un appel à l'autre
+        self._stream = self._socket.makefile('rb')
+
+    def _messages(self):
+        for line in self._stream:
+            yield json.loads(line)
+
+    def _follow_socket(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self._socket is None:
+                    self._connect(f"since {self.applied}")
+                batch = []
+                for message in self._messages():
+                    if "head" in message:
+                        self._apply(batch)
+                        batch = []
+                        with self._condition:
+                            self._set_head(message["head"])
+                    else:
+                        batch.append(message)
+                        if len(batch) >= APPLY_BATCH:
+                            self._apply(batch)
+                            batch = []
+            except (OSError, ValueError):
+                pass
+            # Déconnecté : on reprend à la dernière séquence appliquée
+            if self._socket is not None:
+                self._stream.close()
+                self._socket.close()
+                self._socket = self._stream = None
+            self._stopping.wait(self.interval)
+
+    # Lectures
+
+    def snapshot(self) -> Snapshot:
+        """Dernière version appliquée (figée, utilisable sans verrou)"""
+        return self._current
+
+    def wait_for(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """Attend que la séquence soit appliquée (lire ses propres écritures) ; faux après timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.applied >= sequence, timeout)
+
+    def lag(self) -> Dict:
+        """Retard sur le primaire : entrées connues non appliquées, secondes depuis le dernier rattrapage"""
+        behind_since = self._behind_since
+        return {"entries": max(0, self.head - self.applied),
+                "seconds": time.monotonic() - behind_since if behind_since is not None else 0.0}
+
+    def get_task(self, task_id) -> Optional[Dict]:
+        return self._current.get_task(task_id)
+
+    def consult_task(self, task_id: str) -> Dict:
+        return self._current.consult_task(task_id)
+
+    def search_filter_sort_tasks(self, *args, **kwargs) -> Dict:
+        return self._current.search_filter_sort_tasks(*args, **kwargs)
+
+
+class _FeedHandler(socketserver.StreamRequestHandler):
+
+    def _send(self, message) -> None:
+        self.wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def handle(self):
+        server = self.server
+        request = self.rfile.readline().decode('utf-8', 'replace').split()
+        try:
+            if request == ["snapshot"]:
+                since = change_feed.last_sequence(server.journal)
+                for task in _read_records(server.data_file):
+                    self._send({"task": task})
+                for user in _read_records(server.user_file):
+                    self._send({"user": user})
+            elif len(request) == 2 and request[0] == "since" and request[1].isdigit():
+                since = int(request[1])
+            else:
+                self._send({"error": "Invalid request"})
+                return
+            while not server.stopping.is_set():
+                for entry in change_feed.iterate(server.journal, since):
+                    self._send(entry)
+                    since = entry["seq"]
+                self._send({"head": since})
+                self.wfile.flush()
+                server.stopping.wait(server.interval)
+        except OSError:
+            pass  # client parti
+
+
+class FeedServer(socketserver.ThreadingTCPServer):
+    """Diffuse le journal du stockage data_file aux répliques (un thread par réplique)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), data_file: Optional[str] = None,
+                 user_file: Optional[str] = None, interval: float = 0.2):
+        self.data_file = data_file or task_manager.DATA_FILE
+        self.user_file = user_file or task_manager.USER_FILE
+        self.journal = change_feed.journal_path(self.data_file)
+        self.interval = interval
+        self.stopping = threading.Event()
+        super().__init__(address, _FeedHandler)
+
+    def shutdown(self):
+        self.stopping.set()
+        super().shutdown()
+
+
+def _lag_gauge(key):
+    return lambda: [({"source": replica.source}, replica.lag()[key]) for replica in _replicas]
+
+metrics.register_gauge("task_manager_replica_lag_entries", "Entrées du journal connues mais pas encore appliquées par la réplique",
+                       _lag_gauge("entries"))
+metrics.register_gauge("task_manager_replica_lag_seconds", "Secondes depuis que la réplique a rattrapé le primaire (0 si à jour)",
+                       _lag_gauge("seconds"))
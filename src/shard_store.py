@@ -0,0 +1,168 @@
+# shard_store.py - Stockage des tâches partitionné en fichiers (shards) avec un manifeste
+#
+# Le fichier de données (tasks.json) devient un manifeste JSON :
+#   {"format": "task-shards", "version": 1, "key": "assigned_user", "generation": 3,
+#    "shards": {"<clé>": {"file": "<fichier>", "count": 12}, ...}}
+# et les shards sont des listes JSON de tâches dans le répertoire <fichier>.shards/.
+#
+# Clés de partition : "assigned_user" (un shard par utilisateur, plus "unassigned")
+# ou "created_month" (AAAA-MM de created_at, plus "undated").
+#
+# Une sauvegarde ne réécrit que les shards des tâches modifiées, sous un nouveau nom
+# de fichier ; le remplacement atomique du manifeste valide l'ensemble (un déplacement
+# de tâche entre deux shards est donc atomique), puis les anciens fichiers sont supprimés.
+
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+FORMAT = "task-shards"
+VERSION = 1
+SHARD_KEYS = ("assigned_user", "created_month")
+
+# Répartition connue de chaque stockage après lecture complète ou écriture :
+# chemin du manifeste -> {"manifest": ..., "members": {id: clé de shard}}
+_state: Dict[str, Dict] = {}
+
+def shard_directory(path: str) -> str:
+    return path + ".shards"
+
+def shard_key(task: Dict, key: str) -> str:
+    if key == "assigned_user":
+        return str(task.get("assigned_user") or "unassigned")
+    created_at = task.get("created_at") or ""
+    return created_at[:7] if re.match(r"\d{4}-\d{2}", created_at) else "undated"
+
+def is_manifest(path: str) -> bool:
+    return read_manifest(path) is not None
+
+def read_manifest(path: str) -> Optional[Dict]:
+    """Le manifeste, ou None si path n'en est pas un (une liste JSON par exemple)"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(1) != b"{":
+                return None
+            f.seek(0)
+            manifest = json.loads(f.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != FORMAT:
+        return None
+    if manifest.get("version") != VERSION:
+        raise ValueError(f"Unsupported shard manifest version: {manifest.get('version')}")
+    return manifest
+
+def _file_name(key: str, generation: int) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]", "_", key)[:40]
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=4).hexdigest()
+    return f"{slug}-{digest}.{generation}.json"
+
+def _replace(path: str, write) -> None:
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        write(f)
+    os.replace(temporary, path)
+
+def _read_shard(directory: str, entry: Dict) -> List[Dict]:
+    with open(os.path.join(directory, entry["file"]), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load(path: str, keys: Optional[Iterable[str]] = None, manifest: Optional[Dict] = None) -> List[Dict]:
+    """Tâches des shards demandés (tous si keys est None), par clé puis dans l'ordre du shard"""
+    for attempt in (1, 2):
+        manifest = manifest or read_manifest(path)
+        if manifest is None:
+            raise ValueError("Invalid shard manifest")
+        shards = manifest["shards"]
+        selected = sorted(shards) if keys is None else sorted(set(keys) & set(shards))
+        try:
+            tasks = []
+            for key in selected:
+                tasks.extend(_read_shard(shard_directory(path), shards[key]))
+            break
+        except FileNotFoundError:
+            # Un écrivain a remplacé le manifeste et supprimé des shards entre-temps
+            if attempt == 2:
+                raise
+            manifest = None
+    if keys is None:
+        _state[path] = {"manifest": manifest,
+                        "members": {str(task["id"]): shard_key(task, manifest["key"]) for task in tasks}}
+    return tasks
+
+def select_shards(path: str, user_id: Optional[str] = None,
+                  created_from: Optional[str] = None, created_to: Optional[str] = None) -> Optional[List[str]]:
+    """Clés des seuls shards pouvant contenir les tâches du filtre, ou None s'il faut tout lire.
+
+    created_from / created_to : dates au format AAAA-MM-JJ (déjà normalisées).
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        return None
+    shards = manifest["shards"]
+    if manifest["key"] == "assigned_user" and user_id is not None:
+        return [user_id] if user_id in shards else []
+    if manifest["key"] == "created_month" and (created_from or created_to):
+        low, high = (created_from or "")[:7], (created_to or "9999-12")[:7]
+        return [key for key in shards if key != "undated" and low <= key <= high]
+    return None
+
+def write(path: str, tasks: List[Dict], key: str, changed: Optional[List[Dict]] = None) -> int:
+    """Sauvegarde tasks ; seuls les shards de changed sont réécrits (tous si changed est None).
+
+    Renvoie le nombre de shards écrits.
+    """
+    if key not in SHARD_KEYS:
+        raise ValueError("Invalid shard key")
+    directory = shard_directory(path)
+    os.makedirs(directory, exist_ok=True)
+
+    state = _state.get(path)
+    previous = state["manifest"] if state else read_manifest(path)
+    incremental = changed is not None and state is not None and previous is not None and previous["key"] == key
+
+    groups = defaultdict(list)
+    members = {}
+    for task in tasks:
+        shard = shard_key(task, key)
+        groups[shard].append(task)
+        members[str(task["id"])] = shard
+
+    if incremental:
+        dirty = set()
+        for task in changed:
+            task_id = str(task["id"])
+            # Ancien et nouveau shard : une réassignation réécrit les deux
+            dirty.update(shard for shard in (state["members"].get(task_id), members.get(task_id)) if shard)
+        shards = dict(previous["shards"])
+    else:
+        dirty = set(groups) | set(previous["shards"] if previous else ())
+        shards = {}
+
+    generation = (previous["generation"] + 1) if previous else 1
+    for shard in sorted(dirty):
+        if groups.get(shard):
+            entry = {"file": _file_name(shard, generation), "count": len(groups[shard])}
+            _replace(os.path.join(directory, entry["file"]),
+                     lambda f: json.dump(groups[shard], f, ensure_ascii=False, indent=2))
+            shards[shard] = entry
+        else:
+            shards.pop(shard, None)
+
+    manifest = {"format": FORMAT, "version": VERSION, "key": key, "generation": generation,
+                "shards": dict(sorted(shards.items()))}
+    _replace(path, lambda f: json.dump(manifest, f, ensure_ascii=False, indent=2))
+    _state[path] = {"manifest": manifest, "members": members}
+
+    # Le nouveau manifeste est en place : les fichiers qu'il ne référence plus peuvent partir
+    referenced = {entry["file"] for entry in shards.values()}
+    for name in os.listdir(directory):
+        if name not in referenced and name.endswith(".json"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return len([shard for shard in dirty if groups.get(shard)])
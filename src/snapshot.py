@@ -0,0 +1,265 @@
+# snapshot.py - Format binaire compact pour le stockage des tâches et utilisateurs
+#
+# Disposition du fichier (entiers little-endian) :
+#   en-tête : magic "TMSNAP", version, nombre d'enregistrements, CRC32 du corps,
+#             taille des tables
+#   corps   : tables (chaînes, horodatages, formes), puis les enregistrements,
+#             chacun préfixé par sa taille (uint32)
+#
+# Chaque enregistrement est un dict encodé en tuple (forme, valeurs...) puis sérialisé
+# avec marshal, décodé en C. La forme donne les clés et le type de chaque valeur :
+#   s  chaîne           -> indice dans la table des chaînes (statuts, tags, ids stockés une fois)
+#   t  horodatage ISO   -> indice dans la table des horodatages, stockés en entiers
+#                          (microsecondes depuis 1970, plus le décalage UTC s'il y en a un)
+#   d  dict             -> tuple (forme, valeurs...)
+#   S  liste de chaînes -> liste d'indices
+#   D  liste de dicts   -> liste de tuples
+#   v  None, booléen, entier, flottant : tel quel
+#   g  autre valeur (listes mixtes, vides...) -> encodage générique étiqueté
+# Un horodatage n'est stocké en entier que si sa réécriture redonne exactement la
+# chaîne d'origine : la conversion est sans perte.
+
+import gc
+import marshal
+import struct
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+MAGIC = b"TMSNAP"
+VERSION = 1
+MARSHAL_VERSION = 4
+
+_HEADER = struct.Struct("<6sHIII")
+_LENGTH = struct.Struct("<I")
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MICROS_PER_DAY = 86_400_000_000
+
+class SnapshotError(ValueError):
+    """Fichier snapshot illisible (en-tête, version, somme de contrôle ou contenu)"""
+
+def is_snapshot(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+# --- Horodatages -------------------------------------------------------------
+
+# Les préfixes "AAAA-MM-JJT" et "HH:MM:SS" se répètent beaucoup : on les met en cache
+_days: Dict[int, str] = {}
+_clock: Dict[int, str] = {}
+
+def _day(days: int) -> str:
+    text = _days.get(days)
+    if text is None:
+        text = _days[days] = date.fromordinal(_EPOCH_ORDINAL + days).isoformat() + "T"
+    return text
+
+def _time_of_day(seconds: int) -> str:
+    text = _clock.get(seconds)
+    if text is None:
+        text = _clock[seconds] = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return text
+
+def _offset(seconds: int) -> str:
+    sign = "-" if seconds < 0 else "+"
+    minutes, rest = divmod(abs(seconds), 60)
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}" + (f":{rest:02d}" if rest else "")
+
+def _format_timestamp(stamp) -> str:
+    """Même sortie que datetime.isoformat(), sans construire de datetime"""
+    if type(stamp) is int:
+        micros, offset = stamp, None
+    else:
+        micros, offset = stamp
+    days, rest = divmod(micros, _MICROS_PER_DAY)
+    seconds, fraction = divmod(rest, 1_000_000)
+    text = _day(days) + _time_of_day(seconds)
+    if fraction:
+        text += f".{fraction:06d}"
+    if offset is not None:
+        text += _offset(offset)
+    return text
+
+def _parse_timestamp(text: str):
+    """Entier (ou couple avec le décalage) si text est réversible à l'identique, sinon None"""
+    # Filtre bon marché avant fromisoformat : "AAAA-MM-JJTHH:MM:SS..."
+    if len(text) < 19 or text[10] != "T" or text[4] != "-":
+        return None
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    stamp = (moment.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1)
+    offset = moment.utcoffset()
+    if offset is not None:
+        if offset % timedelta(seconds=1):
+            return None
+        stamp = (stamp, offset // timedelta(seconds=1))
+    return stamp if _format_timestamp(stamp) == text else None
+
+# --- Encodage ----------------------------------------------------------------
+
+class _Encoder:
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.stamps: List = []
+        self.stamp_ids: Dict[str, int] = {}
+        self.shapes: List[tuple] = []
+        self.shape_ids: Dict[tuple, int] = {}
+
+    def string(self, text: str) -> int:
+        index = self.string_ids.get(text)
+        if index is None:
+            index = self.string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def text(self, text: str):
+        """("t", indice) pour un horodatage, ("s", indice) pour toute autre chaîne"""
+        index = self.stamp_ids.get(text)
+        if index is not None:
+            return "t", index
+        if text not in self.string_ids:
+            stamp = _parse_timestamp(text)
+            if stamp is not None:
+                index = self.stamp_ids[text] = len(self.stamps)
+                self.stamps.append(stamp)
+                return "t", index
+        return "s", self.string(text)
+
+    def value(self, value):
+        """(type, valeur encodée) d'une valeur JSON"""
+        kind = type(value)
+        if kind is str:
+            return self.text(value)
+        if kind is dict:
+            return "d", self.dict(value)
+        if kind is list:
+            if value and all(type(item) is str for item in value):
+                return "S", [self.string(item) for item in value]
+            if value and all(type(item) is dict for item in value):
+                return "D", [self.dict(item) for item in value]
+            return "g", ("l", [self.generic(item) for item in value])
+        if value is None or kind is bool or kind is int or kind is float:
+            return "v", value
+        raise TypeError(f"Unsupported value in snapshot: {kind.__name__}")
+
+    def generic(self, value):
+        kind, encoded = self.value(value)
+        return encoded if kind == "g" else (kind, encoded)
+
+    def dict(self, record: Dict) -> tuple:
+        kinds, values = [], []
+        for item in record.values():
+            kind, encoded = self.value(item)
+            kinds.append(kind)
+            values.append(encoded)
+        shape = (tuple(record), "".join(kinds))
+        index = self.shape_ids.get(shape)
+        if index is None:
+            index = self.shape_ids[shape] = len(self.shapes)
+            self.shapes.append(shape)
+        return (index, *values)
+
+def dumps(records: List[Dict]) -> bytes:
+    """Encode une liste de dicts JSON-compatibles en snapshot"""
+    encoder = _Encoder()
+    parts = []
+    for record in records:
+        payload = marshal.dumps(encoder.dict(record), MARSHAL_VERSION)
+        parts.append(_LENGTH.pack(len(payload)))
+        parts.append(payload)
+    shapes = [([encoder.string(key) for key in keys], kinds) for keys, kinds in encoder.shapes]
+    tables = marshal.dumps((encoder.strings, encoder.stamps, shapes), MARSHAL_VERSION)
+    body = tables + b"".join(parts)
+    return _HEADER.pack(MAGIC, VERSION, len(records), zlib.crc32(body), len(tables)) + body
+
+# --- Décodage ----------------------------------------------------------------
+
+# Expression Python qui décode une valeur de chaque type ({0} : la valeur encodée)
+_EXPRESSIONS = {
+    "s": "S[{0}]",
+    "t": "T[{0}]",
+    "d": "F[{0}[0]]({0})",
+    "S": "[S[i] for i in {0}]",
+    "D": "[F[i[0]](i) for i in {0}]",
+    "v": "{0}",
+    "g": "G({0})",
+}
+
+def _compile_shape(keys: List[str], kinds: str, scope: Dict) -> Callable:
+    # Une fonction par forme, qui construit le dict en une seule expression : c'est
+    # ce qui rend le décodage plus rapide que json.load. Les clés passent par repr(),
+    # les données du fichier ne sont jamais évaluées comme du code.
+    items = ", ".join(f"{key!r}: {_EXPRESSIONS[kind].format(f'v[{position}]')}"
+                      for position, (key, kind) in enumerate(zip(keys, kinds), start=1))
+    return eval(f"lambda v: {{{items}}}", scope)
+
+def _decoders(strings: List[str], stamps: List, shapes: List) -> List[Callable]:
+    decoders = []
+    scope = {"__builtins__": {}, "S": strings, "T": [_format_timestamp(stamp) for stamp in stamps], "F": decoders}
+    generic = {kind: eval(f"lambda x: {expression.format('x')}", scope) for kind, expression in _EXPRESSIONS.items()}
+
+    def decode_generic(value):
+        kind, encoded = value
+        if kind == "l":
+            return [decode_generic(item) for item in encoded]
+        return generic[kind](encoded)
+
+    scope["G"] = decode_generic
+    for keys, kinds in shapes:
+        if len(keys) != len(kinds) or set(kinds) - set(_EXPRESSIONS):
+            raise SnapshotError("Invalid snapshot shape")
+        decoders.append(_compile_shape([strings[key] for key in keys], kinds, scope))
+    return decoders
+
+def loads(data: bytes) -> List[Dict]:
+    """Décode un snapshot produit par dumps()"""
+    if len(data) < _HEADER.size:
+        raise SnapshotError("Invalid snapshot header")
+    magic, version, count, checksum, tables_size = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("Invalid snapshot header")
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {version}")
+    body = memoryview(data)[_HEADER.size:]
+    if zlib.crc32(body) != checksum:
+        raise SnapshotError("Snapshot checksum mismatch")
+
+    # Des millions de petits conteneurs, tous vivants : le GC n'a rien à collecter
+    # pendant la construction, ses passes ne feraient que ralentir le chargement
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        decoders = _decoders(*marshal.loads(body[:tables_size]))
+        records = []
+        append = records.append
+        unpack_length = _LENGTH.unpack_from
+        offset = tables_size
+        for _ in range(count):
+            (length,) = unpack_length(body, offset)
+            offset += _LENGTH.size
+            encoded = marshal.loads(body[offset:offset + length])
+            append(decoders[encoded[0]](encoded))
+            offset += length
+    except (IndexError, TypeError, ValueError, EOFError, struct.error) as e:
+        raise SnapshotError(f"Corrupted snapshot: {e}") from e
+    finally:
+        if enabled:
+            gc.enable()
+    return records
+
+def write(path: str, records: List[Dict]) -> None:
+    with open(path, 'wb') as f:
+        f.write(dumps(records))
+
+def read(path: str) -> List[Dict]:
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -1,14 +1,35 @@
 # task_manager.py - Logique métier du gestionnaire de tâches
 
+import base64
+import bisect
+import gc
+import heapq
 import json
+import marshal
+import multiprocessing
 import os
 import re
 from typing import List, Dict, Optional
 from datetime import datetime, timezone
 import uuid
+from contextlib import contextmanager
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from src import change_feed, metrics, parallel_scan, record_store, shard_store, snapshot
+from src.metrics import instrumented
+from src.timings import timed
 DATA_FILE = "tasks.json"
 USER_FILE = "users.json"
 
+# Format d'écriture des fichiers : "json" (indenté, lisible), "snapshot" (binaire
+# compact, voir snapshot.py), "indexed" (enregistrements + index lus par mmap, voir
+# record_store.py) ou "sharded" (tâches partitionnées selon SHARD_KEY, voir
+# shard_store.py ; les utilisateurs restent en JSON). La lecture reconnaît tous les formats.
+STORE_FORMATS = ("json", "snapshot", "indexed", "sharded")
+STORE_FORMAT = os.environ.get("TASK_MANAGER_STORE_FORMAT", "json")
+SHARD_KEY = os.environ.get("TASK_MANAGER_SHARD_KEY", "assigned_user")
+
 ## Default data until task creation is ok
 ## TODO: remove
 DEFAULT_TASKS = [
@@ -33,18 +54,170 @@ DEFAULT_USERS = [
     {"id": "user-3", "name": "Charlie Brown", "email": "charlie@example.com"}
 ]
 
-EMAIL_REGEX = r"^[\w\.-]+@[\w\.-]+\.\w+$"
+EMAIL_REGEX = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
 
 ALLOWED_PRIORITIES = {"LOW", "NORMAL", "HIGH", "CRITICAL"}
 PRIORITY_ORDER = {"CRITICAL": 0, "HIGH": 1, "NORMAL": 2, "LOW": 3}
 MAX_TAG_LENGTH = 20
 
+
+class BatchValidationError(ValueError):
+    """Erreur levée quand un lot est rejeté ; errors contient les couples (index, message)"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        summary = "; ".join(f"#{index}: {message}" for index, message in errors[:10])
+        if len(errors) > 10:
+            summary += f"; ... ({len(errors)} errors)"
+        super().__init__(f"Invalid batch: {summary}")
+
+
+class VersionConflictError(ValueError):
+    """Erreur levée quand la tâche a changé depuis la version lue par l'appelant"""
+
+    def __init__(self, task_id, expected: int, current: int):
+        self.task_id = task_id
+        self.expected = expected
+        self.current = current
+        super().__init__(f"Version conflict: expected {expected}, current {current}")
+
+
+class _TrackedList(list):
+    """Liste dont le compteur generation change à chaque modification structurelle.
+
+    Les index dérivés s'en servent pour détecter les modifications faites
+    directement sur la liste, hors des fonctions de ce module.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.generation = 0
+
+    def _touch(self):
+        self.generation += 1
+
+
+def _tracked(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args):
+        self._touch()
+        return method(self, *args)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ("append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse",
+              "__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(_TrackedList, _name, _tracked(_name))
+del _name
+
+
+class _LazyTrackedList(_TrackedList):
+    """_TrackedList chargée au premier accès, puis transformée en _TrackedList ordinaire.
+
+    Utilisée quand le stockage est indexé : une commande qui ne consulte qu'une
+    tâche ne charge jamais le reste du fichier.
+    """
+
+    def __init__(self, loader):
+        super().__init__()
+        self._loader = loader
+
+    def load(self):
+        items = self._loader()
+        del self._loader
+        self.__class__ = _TrackedList
+        list.extend(self, items)
+
+
+def _loading(name):
+    def wrapper(self, *args):
+        self.load()
+        return getattr(self, name)(*args)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ("append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse",
+              "__setitem__", "__delitem__", "__iadd__", "__imul__",
+              "__len__", "__iter__", "__reversed__", "__getitem__", "__contains__", "__repr__",
+              "__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__", "__add__", "__mul__", "__rmul__",
+              "copy", "count", "index"):
+    setattr(_LazyTrackedList, _name, _loading(_name))
+del _name
+
+
+# Tous les index dérivés, pour build_indexes() et les métriques
+_INDEXES = []
+
+class _Index:
+    """Index dérivé d'une _TrackedList, reconstruit à la demande s'il est périmé"""
+
+    def __init__(self, name, source, build, size=len):
+        self.name = name
+        self.source = source
+        self.build = build
+        self.size = size
+        self.data = None
+        self.generation = None
+        self.hits = 0
+        self.rebuilds = 0
+        _INDEXES.append(self)
+
+    def get(self):
+        if self.generation != self.source.generation:
+            self.data = self.build(self.source)
+            self.generation = self.source.generation
+            self.rebuilds += 1
+        else:
+            self.hits += 1
+        return self.data
+
+    def mark_synced(self):
+        """À appeler après une mise à jour incrémentale faite en même temps que la liste"""
+        self.generation = self.source.generation
+
+def _record_io(operation, path, start):
+    """Métriques d'E/S fichier (octets et durée) pour load / save"""
+    if not metrics.is_enabled():
+        return
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    file_name = os.path.basename(path)
+    metrics.inc("task_manager_file_io_bytes_total", size, operation=operation, file=file_name)
+    metrics.inc("task_manager_file_io_seconds_total", time.perf_counter() - start, operation=operation, file=file_name)
+    metrics.inc("task_manager_file_io_operations_total", operation=operation, file=file_name)
+
+metrics.describe("task_manager_file_io_bytes_total", "counter", "Octets lus ou écrits dans les fichiers de données")
+metrics.describe("task_manager_file_io_seconds_total", "counter", "Temps passé à lire ou écrire les fichiers de données")
+metrics.describe("task_manager_file_io_operations_total", "counter", "Lectures et écritures complètes des fichiers de données")
+
+def _read_store(path):
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        content = f.read()
+    if content.startswith(snapshot.MAGIC):
+        data = snapshot.loads(content)
+    elif content.startswith(record_store.MAGIC):
+        data = record_store.loads(content)
+    else:
+        data = json.loads(content.decode('utf-8'))
+        if isinstance(data, dict) and data.get("format") == shard_store.FORMAT:
+            data = shard_store.load(path)
+    _record_io("load", path, start)
+    return data
+
+@timed("load")
 def _load_tasks():
-    """Charge les tâches depuis le fichier JSON"""
+    """Charge les tâches depuis le fichier (JSON ou snapshot)"""
     if os.path.exists(DATA_FILE):
         try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _read_store(DATA_FILE)
         except (json.JSONDecodeError, IOError):
             _save_tasks(DEFAULT_TASKS)
             return DEFAULT_TASKS.copy()
@@ -52,22 +225,139 @@ def _load_tasks():
         _save_tasks(DEFAULT_TASKS)
         return DEFAULT_TASKS.copy()
 
-def _save_tasks(tasks_to_save):
-    """Sauvegarde les tâches dans le fichier JSON"""
+# Sauvegardes reportées pendant un bloc deferred_saves()
+# changed : tâches modifiées pendant le bloc (None dès qu'une sauvegarde complète est demandée)
+_deferred = {"depth": 0, "tasks": False, "users": False, "changed": []}
+
+# Sauvegardes de tâches demandées : les processus du parcours parallèle d'une
+# version antérieure ont un état périmé
+_task_changes = {"count": 0}
+
+# Journal des modifications (voir change_feed.py) : événements d'historique par id de
+# tâche en attente de leur sauvegarde, puis entrées prêtes, écrites avec les tâches
+_feed = {"events": {}, "pending": deque()}
+
+# Modifications en place de tâches (les ajouts et suppressions changent task_list.generation)
+_mutations = {"count": 0}
+
+# Les compteurs repartent de 0 à chaque processus : le jeton distingue leurs
+# générations (comme l'ETag de http_api.py)
+_LOAD_TOKEN = uuid.uuid4().hex[:8]
+
+def _generation(counter) -> str:
+    """Génération opaque : jeton du processus, jour UTC (overdue en dépend) et compteur"""
+    return f"{_LOAD_TOKEN}-{_today_utc().isoformat()}-{counter}"
+
+def store_generation() -> str:
+    """Génération des tâches : inchangée, aucun résultat n'a changé (même processus, même jour)"""
+    return _generation(_mutations["count"] + task_list.generation)
+
+def _touch_task(task: Dict) -> None:
+    """Nouvelle version d'une tâche modifiée en place (voir consult_task_if_changed)"""
+    task["version"] = task.get("version", 0) + 1
+    _mutations["count"] += 1
+
+def _check_version(task: Dict, expected_version: Optional[int]) -> None:
+    """Contrôle optimiste : lève VersionConflictError si la tâche n'est plus à expected_version"""
+    if expected_version is None:
+        return
+    if isinstance(expected_version, bool) or not isinstance(expected_version, int) or expected_version < 0:
+        raise ValueError("Invalid version")
+    current = task.get("version", 0)
+    if current != expected_version:
+        raise VersionConflictError(task.get("id"), expected_version, current)
+
+def _dump(path, data, store_format, changed=None):
+    if store_format == "snapshot":
+        snapshot.write(path, data)
+    elif store_format == "indexed":
+        record_store.write(path, data)
+    elif store_format == "sharded":
+        shard_store.write(path, data, SHARD_KEY, changed)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+@timed("save")
+def _write_store(path, data, changed=None, entries=None):
+    """changed : tâches modifiées, pour ne réécrire que leurs shards (None : tout).
+
+    entries : entrées du journal que data contient (voir take_pending_changes),
+    ajoutées au journal après l'écriture. None : toutes les entrées en attente.
+    """
+    start = time.perf_counter()
+    store_format = STORE_FORMAT
+    if store_format == "sharded" and path != DATA_FILE:
+        store_format = "json"
     try:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(tasks_to_save, f, ensure_ascii=False, indent=2)
+        _dump(path, data, store_format, changed)
     except IOError:
-        pass
+        if entries:
+            # Reprises par l'écriture suivante, qui contiendra aussi leurs tâches
+            _feed["pending"].extendleft(reversed(entries))
+        return
+    _record_io("save", path, start)
+    if path == DATA_FILE:
+        _flush_changes(entries)
+
+def _record_changes(changed, change):
+    """Prépare les entrées du journal des tâches changed (copiées tout de suite, en JSON)"""
+    events = _feed["events"]
+    for task in changed:
+        task_id = str(task["id"])
+        entry = {"type": change, "task_id": task_id,
+                 "events": events.pop(task_id, [])}
+        if change == "deleted":
+            # Tâche supprimée gardée dans "previous", historique compris : de quoi la recréer
+            # (voir undo_changes)
+            entry["previous_json"] = json.dumps(task, ensure_ascii=False)
+        else:
+            # Sans history : les événements de l'entrée portent déjà ce qui a changé
+            entry["task_json"] = json.dumps({key: value for key, value in task.items() if key != "history"},
+                                            ensure_ascii=False)
+        _feed["pending"].append(entry)
+
+def _flush_changes(entries=None):
+    # Après l'écriture des tâches : le journal ne devance jamais le fichier de données
+    if entries is None:
+        entries = take_pending_changes()
+    if entries:
+        try:
+            change_feed.append(change_feed.journal_path(DATA_FILE), entries)
+        except IOError:
+            _feed["pending"].extendleft(reversed(entries))
+
+def _save_tasks(tasks_to_save, changed=None, change="updated"):
+    """Sauvegarde les tâches au format STORE_FORMAT (reportée dans un bloc deferred_saves).
+
+    changed liste les tâches ajoutées, modifiées ou supprimées : le stockage
+    partitionné ne réécrit que leurs shards. None : tout est considéré modifié.
+    change ("created", "updated" ou "deleted") : type des entrées du journal pour changed.
+    """
+    _task_changes["count"] += 1
+    if changed is not None:
+        _record_changes(changed, change)
+    if _deferred["depth"] and tasks_to_save is task_list:
+        _deferred["tasks"] = True
+        if changed is None or _deferred["changed"] is None:
+            _deferred["changed"] = None
+        else:
+            _deferred["changed"].extend(changed)
+        return
+    _write_store(DATA_FILE, tasks_to_save, changed)
 
-task_list = _load_tasks()
+# Stockage indexé ou partitionné : chargement complet différé au premier accès à task_list
+if record_store.is_record_file(DATA_FILE) or shard_store.is_manifest(DATA_FILE):
+    task_list = _LazyTrackedList(_load_tasks)
+else:
+    task_list = _TrackedList(_load_tasks())
 
+@timed("load")
 def _load_users():
-    """Charge les utilisateurs depuis le fichier JSON"""
+    """Charge les utilisateurs depuis le fichier (JSON ou snapshot)"""
     if os.path.exists(USER_FILE):
         try:
-            with open(USER_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _read_store(USER_FILE)
         except (json.JSONDecodeError, IOError):
             _save_users(DEFAULT_USERS)
             return DEFAULT_USERS.copy()
@@ -76,14 +366,103 @@ def _load_users():
         return DEFAULT_USERS.copy()
 
 def _save_users(users_to_save):
-    """Sauvegarde les utilisateurs dans le fichier JSON"""
+    """Sauvegarde les utilisateurs au format STORE_FORMAT (reportée dans un bloc deferred_saves)"""
+    if _deferred["depth"] and users_to_save is user_list:
+        _deferred["users"] = True
+        return
+    _write_store(USER_FILE, users_to_save)
+
+def export_store(path: str, store_format: str = "json", users: bool = False) -> int:
+    """Écrit toutes les tâches (ou les utilisateurs) dans path ; renvoie le nombre d'éléments"""
+    if store_format not in STORE_FORMATS:
+        raise ValueError("Invalid store format")
+    records = user_list if users else task_list
+    count = len(records)  # charge aussi un stockage indexé avant json.dump
+    _dump(path, records, store_format)
+    return count
+
+def flush_saves() -> None:
+    """Écrit immédiatement les fichiers modifiés depuis le début du bloc deferred_saves"""
+    if _deferred["tasks"]:
+        changed, _deferred["changed"] = _deferred["changed"], []
+        _deferred["tasks"] = False
+        _write_store(DATA_FILE, task_list, changed)
+    if _deferred["users"]:
+        _deferred["users"] = False
+        _write_store(USER_FILE, user_list)
+
+def take_pending_saves():
+    """Retire les sauvegardes reportées sans les écrire : (tâches, utilisateurs, changed).
+
+    Pour un appelant qui les écrit lui-même, hors du bloc deferred_saves
+    (par exemple dans un thread, voir async_task_manager.py).
+    """
+    pending = (_deferred["tasks"], _deferred["users"], _deferred["changed"])
+    _deferred.update(tasks=False, users=False, changed=[])
+    return pending
+
+def take_pending_changes() -> list:
+    """Retire les entrées du journal en attente.
+
+    À prendre avec take_pending_saves, sous le même verrou : l'appelant les passe à
+    _write_store avec la copie des tâches qui les contient, pour que le journal
+    ne décrive jamais une modification absente du fichier de données. popleft est
+    sûr entre threads.
+    """
+    pending, entries = _feed["pending"], []
+    while pending:
+        entries.append(pending.popleft())
+    return entries
+
+@contextmanager
+def deferred_saves():
+    """Regroupe les sauvegardes du bloc : chaque fichier est écrit une seule fois à la sortie"""
+    _deferred["depth"] += 1
     try:
-        with open(USER_FILE, 'w', encoding='utf-8') as f:
-            json.dump(users_to_save, f, ensure_ascii=False, indent=2)
-    except IOError:
-        pass
-
-user_list = _load_users()
+        yield
+    finally:
+        _deferred["depth"] -= 1
+        if not _deferred["depth"]:
+            flush_saves()
+
+user_list = _TrackedList(_load_users())
+
+# Index email -> utilisateur, tenu à jour par create_user / create_users
+_email_index = _Index("user_email", user_list, lambda users: {u["email"]: u for u in users})
+
+def _user_sort_key(user: Dict):
+    return (user["name"].casefold(), str(user["id"]))
+
+def _build_user_sort_index(users):
+    ordered = sorted(users, key=_user_sort_key)
+    return {"keys": [_user_sort_key(u) for u in ordered], "users": ordered}
+
+# Index id -> utilisateur, tenu à jour par create_user / create_users
+_user_id_index = _Index("user_id", user_list, lambda users: {str(u["id"]): u for u in users})
+
+# Utilisateurs triés par (nom casefold, id) pour la pagination et la recherche par préfixe
+_user_sort_index = _Index("user_name_sorted", user_list, _build_user_sort_index,
+                          size=lambda index: len(index["keys"]))
+
+def _index_users_sorted(new_users: List[Dict]) -> None:
+    """Insère de nouveaux utilisateurs dans l'index trié.
+
+    L'appelant a obtenu l'index (get) avant d'ajouter les utilisateurs à
+    user_list et appelle mark_synced ensuite.
+    """
+    index = _user_sort_index.data
+    if len(new_users) == 1:
+        key = _user_sort_key(new_users[0])
+        position = bisect.bisect_right(index["keys"], key)
+        index["keys"].insert(position, key)
+        index["users"].insert(position, new_users[0])
+    else:
+        # Deux séquences triées concaténées : Timsort les fusionne en temps linéaire
+        pairs = list(zip(index["keys"], index["users"]))
+        pairs.extend(sorted(((_user_sort_key(u), u) for u in new_users), key=lambda p: p[0]))
+        pairs.sort(key=lambda p: p[0])
+        index["keys"] = [key for key, _ in pairs]
+        index["users"] = [user for _, user in pairs]
 
 def _validate_title(title: str):
     if not title or not title.strip():
@@ -103,18 +482,53 @@ def _validate_tag(tag: str) -> str:
         raise ValueError("Invalid tag validation")
     return tag
 
-def consult_task(task_id: str) -> Dict:
+def _check_task_id(task_id: str) -> None:
     try:
         uuid.UUID(task_id)
     except ValueError:
         raise ValueError("Invalid ID format")
+
+def _find_task(task_id: str) -> Dict:
+    """Retourne la tâche stockée (l'objet lui-même) ou lève ValueError"""
+    _check_task_id(task_id)
     for task in task_list:
         if str(task["id"]) == str(task_id):
-            task["overdue"] = is_task_overdue(task)
             return task
 
     raise ValueError("Task not found")
 
+def _read_task(task_id: str) -> Dict:
+    """Comme _find_task, pour une lecture seule : tant qu'un stockage indexé n'est pas
+    chargé, seul l'enregistrement demandé est lu (une copie, pas l'objet de task_list)"""
+    if type(task_list) is _LazyTrackedList:
+        _check_task_id(task_id)
+        try:
+            task = record_store.lookup(DATA_FILE, task_id)
+        except record_store.RecordStoreError:
+            return _find_task(task_id)
+        if task is None:
+            raise ValueError("Task not found")
+        return task
+    return _find_task(task_id)
+
+@instrumented("consult_task")
+def consult_task(task_id: str) -> Dict:
+    """La tâche avec son champ calculé overdue (une copie : la tâche stockée n'est pas modifiée)"""
+    task = _read_task(task_id)
+    return {**task, "overdue": is_task_overdue(task)}
+
+@instrumented("consult_task_if_changed")
+def consult_task_if_changed(task_id: str, version: int) -> Optional[Dict]:
+    """Comme consult_task, ou None si la tâche est toujours à cette version (sans copie).
+
+    version : champ "version" d'une réponse précédente (0 pour une tâche qui n'en a pas).
+    """
+    task = _read_task(task_id)
+    if task.get("version", 0) == version:
+        return None
+    return {**task, "overdue": is_task_overdue(task)}
+
+@instrumented("update_task")
 def update_task(
     task_id: str,
     title: Optional[str] = None,
@@ -123,104 +537,113 @@ def update_task(
     priority: Optional[str] = None,
     due_date: Optional[str] = None,
     add_tags: Optional[list[str]] = None,
-    remove_tags: Optional[list[str]] = None
+    remove_tags: Optional[list[str]] = None,
+    expected_version: Optional[int] = None
 ) -> dict:
+    """Modifie les champs fournis d'une tâche.
+
+    expected_version : version lue par l'appelant ; si la tâche a changé depuis,
+    VersionConflictError est levée et rien n'est modifié (0 pour une tâche sans version).
+    """
     allowed_statuses = {"TODO", "ONGOING", "DONE"}
     allowed_priorities = {"LOW", "NORMAL", "HIGH", "CRITICAL"}
 
-    task = consult_task(task_id)
+    task = _find_task(task_id)
+    _check_version(task, expected_version)
+
+    # Validation de tous les arguments avant la moindre modification : une erreur
+    # laisse la tâche (et sa version) intacte
+    new_title = _validate_title(title) if title is not None else None
+    new_desc = _validate_description(description) if description is not None else None
+    if status is not None and status not in allowed_statuses:
+        raise ValueError("Invalid status. Allowed values: TODO, ONGOING, DONE")
+    if priority is not None and priority not in allowed_priorities:
+        raise ValueError(f"Invalid priority. Allowed values: {', '.join(allowed_priorities)}")
+    new_due_date = None
+    if due_date:
+        try:
+            new_due_date = datetime.fromisoformat(due_date).isoformat()
+        except ValueError:
+            raise ValueError("Invalid date format")
+    tags_to_add = [_validate_tag(tag) for tag in add_tags or []]
+    tags_to_remove = [_validate_tag(tag) for tag in remove_tags or []]
 
     changed = False
 
     # Titre
-    if title is not None:
-        new_title = _validate_title(title)
-        if task["title"] != new_title:
-            old_title = task["title"]
-            task["title"] = new_title
-            add_history_event(task, "title_updated", {"old": old_title, "new": new_title})
-            changed = True
+    if new_title is not None and task["title"] != new_title:
+        old_title = task["title"]
+        task["title"] = new_title
+        add_history_event(task, "title_updated", {"old": old_title, "new": new_title})
+        changed = True
 
     # Description
-    if description is not None:
-        new_desc = _validate_description(description)
-        if task.get("description", "") != new_desc:
-            old_desc = task.get("description", "")
-            task["description"] = new_desc
-            add_history_event(task, "description_updated", {"old": old_desc, "new": new_desc})
-            changed = True
+    if new_desc is not None and task.get("description", "") != new_desc:
+        old_desc = task.get("description", "")
+        task["description"] = new_desc
+        add_history_event(task, "description_updated", {"old": old_desc, "new": new_desc})
+        changed = True
 
     # Statut
-    if status is not None:
-        if status not in allowed_statuses:
-            raise ValueError("Invalid status. Allowed values: TODO, ONGOING, DONE")
-        if task.get("status") != status:
-            old_status = task.get("status")
-            task["status"] = status
-            add_history_event(task, "status_updated", {"old": old_status, "new": status})
-            changed = True
+    if status is not None and task.get("status") != status:
+        old_status = task.get("status")
+        task["status"] = status
+        add_history_event(task, "status_updated", {"old": old_status, "new": status})
+        changed = True
 
     # Priorité
-    if priority is not None:
-        if priority not in allowed_priorities:
-            raise ValueError(f"Invalid priority. Allowed values: {', '.join(allowed_priorities)}")
-        if task.get("priority") != priority:
-            old_priority = task.get("priority")
-            task["priority"] = priority
-            add_history_event(task, "priority_updated", {"old": old_priority, "new": priority})
-            changed = True
+    if priority is not None and task.get("priority") != priority:
+        old_priority = task.get("priority")
+        task["priority"] = priority
+        add_history_event(task, "priority_updated", {"old": old_priority, "new": priority})
+        changed = True
 
-    # Date d’échéance
+    # Date d’échéance ("" : la retire)
     if due_date is not None:
         old_due_date = task.get("due_date")
-        if due_date == "":
+        if new_due_date is None:
             task.pop("due_date", None)
-            new_due_date = None
         else:
-            try:
-                parsed_date = datetime.fromisoformat(due_date)
-                new_due_date = parsed_date.isoformat()
-                task["due_date"] = new_due_date
-            except ValueError:
-                raise ValueError("Invalid date format")
+            task["due_date"] = new_due_date
         if old_due_date != new_due_date:
             add_history_event(task, "due_date_updated", {"old_due_date": old_due_date, "new_due_date": new_due_date})
             changed = True
 
     # Ajout de tags
-    if add_tags:
+    if tags_to_add:
         task.setdefault("tags", [])
-        for tag in add_tags:
-            tag = _validate_tag(tag)
+        for tag in tags_to_add:
             if tag not in task["tags"]:
                 task["tags"].append(tag)
                 add_history_event(task, "tag_added", {"tag": tag})
                 changed = True
 
     # Suppression de tags
-    if remove_tags:
-        for tag in remove_tags:
-            tag = _validate_tag(tag)
-            if tag in task.get("tags", []):
-                task["tags"].remove(tag)
-                add_history_event(task, "tag_removed", {"tag": tag})
-                changed = True
+    for tag in tags_to_remove:
+        if tag in task.get("tags", []):
+            task["tags"].remove(tag)
+            add_history_event(task, "tag_removed", {"tag": tag})
+            changed = True
 
     if changed:
-        _save_tasks(task_list)
+        _touch_task(task)
+        _save_tasks(task_list, changed=[task])
 
     return task
 
+@instrumented("delete_task")
 def delete_task(task_id: str):
     """Supprime une tâche par son ID"""
-    global task_list
-    original_length = len(task_list)
-    task_list[:] = [task for task in task_list if str(task["id"]) != str(task_id)]
-
-    if len(task_list) == original_length:
+    key = str(task_id)
+    # Un seul parcours ; del décale la fin de la liste sans en construire une nouvelle
+    positions = [index for index, task in enumerate(task_list) if str(task["id"]) == key]
+    if not positions:
         raise ValueError("Task not found")
+    removed = [task_list[index] for index in positions]
+    for index in reversed(positions):
+        del task_list[index]
 
-    _save_tasks(task_list)
+    _save_tasks(task_list, changed=removed, change="deleted")
 
 def validate_pagination_params(page: int, size: int) -> None:
     if page <= 0:
@@ -234,91 +657,115 @@ def paginate(items: List[Dict], page: int, size: int) -> List[Dict]:
     return items[start:end]
 
 
-def search_filter_sort_tasks(
-    query: Optional[str] = None,
-    search_in: str = "both",
-    status: Optional[str] = None,
-    user_id: Optional[str] = None,
-    priority: Optional[str] = None,
-    tags: Optional[List[str]] = None,
-    overdue: Optional[bool] = None,
-    sort_by: str = "created_at",
-    ascending: bool = True,
-    page: int = 1,
-    size: int = 20,
-    tasks: Optional[List[Dict]] = None
-) -> Dict:
-    """Recherche, filtre, trie et retourne une liste paginée de tâches."""
+PROJECTIONS = {"full", "count", "ids"}
 
-    filtered = task_list
-    validate_pagination_params(page, size)
+# Parcours parallèle (voir parallel_scan.py) : search_filter_sort_tasks répartit les
+# tâches entre PARALLEL_WORKERS processus dès que task_list en compte au moins
+# PARALLEL_THRESHOLD. 0 ou 1 processus : désactivé.
+PARALLEL_WORKERS = int(os.environ.get("TASK_MANAGER_PARALLEL_WORKERS", "0"))
+PARALLEL_THRESHOLD = int(os.environ.get("TASK_MANAGER_PARALLEL_THRESHOLD", "100000"))
+
+def _filter_spec(query, search_in, status, user_id, priority, tags, overdue, created_from, created_to,
+                 user_ids=None) -> Dict:
+    """Valide les critères de recherche et les normalise en dict sérialisable.
+
+    _predicates en reconstruit les filtres, dans ce processus comme dans ceux du
+    parcours parallèle. user_ids : ids des utilisateurs connus (ceux du stockage par défaut).
+    """
+    spec = {"today": _today_utc(), "user_id": user_id, "overdue": overdue}
 
     # -- Statut --
     if status is not None:
         allowed_statuses = {"TODO", "ONGOING", "DONE"}
         if status not in allowed_statuses:
             raise ValueError("Invalid filter status")
-        filtered = [t for t in filtered if t.get("status") == status]
+        spec["status"] = status
 
     # -- Utilisateur assigné --
     if user_id is not None and user_id != "unassigned":
-        if not user_exists(user_id.strip()):
+        known = user_exists(user_id.strip()) if user_ids is None else user_id.strip() in user_ids
+        if not known:
             raise ValueError("User not found")
-        filtered = [t for t in filtered if t.get("assigned_user") == user_id]
-    elif user_id == "unassigned":
-        filtered = [t for t in filtered if not t.get("assigned_user")]
 
     # -- Priorité --
     if priority is not None:
         if priority not in ALLOWED_PRIORITIES:
             raise ValueError(f"Invalid priority. Allowed values: {', '.join(ALLOWED_PRIORITIES)}")
-        filtered = [t for t in filtered if t.get("priority", "NORMAL") == priority]
+        spec["priority"] = priority
 
     # -- Tags --
     if tags:
-        tags = [_validate_tag(tag) for tag in tags]
-        filtered = [t for t in filtered if set(t.get("tags", [])) & set(tags)]
+        spec["tags"] = {_validate_tag(tag) for tag in tags}
 
-    # -- Retard --
-    if overdue is not None:
-        filtered = [t for t in filtered if is_task_overdue(t) == overdue]
+    # -- Date de création --
+    if created_from or created_to:
+        try:
+            low = datetime.fromisoformat(created_from).date().isoformat() if created_from else ""
+            high = datetime.fromisoformat(created_to).date().isoformat() if created_to else "9999-12-31"
+        except ValueError:
+            raise ValueError("Invalid date format")
+        spec["created"] = (low, high)
 
     # -- Recherche texte --
     if query and query.strip():
-        query = query.lower()
-        search_filtered = []
-        seen_ids = set()
-        for task in filtered:
+        spec["query"] = query.lower()
+        spec["search_in"] = search_in
+    return spec
+
+def _predicates(spec: Dict) -> list:
+    predicates = []
+    if "status" in spec:
+        status = spec["status"]
+        predicates.append(lambda t: t.get("status") == status)
+
+    user_id = spec["user_id"]
+    if user_id is not None and user_id != "unassigned":
+        predicates.append(lambda t: t.get("assigned_user") == user_id)
+    elif user_id == "unassigned":
+        predicates.append(lambda t: not t.get("assigned_user"))
+
+    if "priority" in spec:
+        priority = spec["priority"]
+        predicates.append(lambda t: t.get("priority", "NORMAL") == priority)
+
+    if "tags" in spec:
+        wanted_tags = spec["tags"]
+        predicates.append(lambda t: not wanted_tags.isdisjoint(t.get("tags", [])))
+
+    overdue, today = spec["overdue"], spec["today"]
+    if overdue is not None:
+        predicates.append(lambda t: _is_overdue(t, today) == overdue)
+
+    if "created" in spec:
+        low, high = spec["created"]
+        predicates.append(lambda t: bool(t.get("created_at")) and low <= t["created_at"][:10] <= high)
+
+    if "query" in spec:
+        query, search_in = spec["query"], spec["search_in"]
+
+        def matches_query(task):
             title = task.get("title", "").lower()
             description = (task.get("description") or "").lower()
-            match = (
+            return (
                 (search_in == "title" and query in title) or
                 (search_in == "description" and query in description) or
                 (search_in == "both" and (query in title or query in description)) or
                 (search_in not in {"title", "description", "both"} and (query in title and query in description))
             )
-            if match and task["id"] not in seen_ids:
-                search_filtered.append(task)
-                seen_ids.add(task["id"])
-        filtered = search_filtered
 
-    # -- Tri --
-    if tasks is None:
-        tasks = task_list
+        predicates.append(matches_query)
+    return predicates
 
-    allowed_fields = {"id", "title", "status", "created_at", "priority","custom"}
-    if sort_by not in allowed_fields:
-        raise ValueError("Invalid sort criteria")
-
-    def parse_date_safe(date_str):
-        try:
-            return datetime.fromisoformat(date_str)
-        except Exception:
-            return datetime.min
+def _parse_date_safe(date_str):
+    try:
+        return datetime.fromisoformat(date_str)
+    except Exception:
+        return datetime.min
 
+def _sort_key(sort_by: str):
     def sort_key(task):
         if sort_by == "created_at":
-            return parse_date_safe(task.get("created_at", ""))
+            return _parse_date_safe(task.get("created_at", ""))
         elif sort_by == "title":
             return task.get("title", "").lower()
         elif sort_by == "status":
@@ -327,26 +774,166 @@ def search_filter_sort_tasks(
             return {"CRITICAL": 0, "HIGH": 1, "NORMAL": 2, "LOW": 3}.get(task.get("priority", "NORMAL"), 99)
         else:
             return task.get(sort_by)
+    return sort_key
+
+def _top(items: List[Dict], limit: int, sort_key, ascending: bool) -> List[Dict]:
+    """Les limit premières tâches dans l'ordre du tri (stable : à égalité, l'ordre de items)"""
+    if limit < len(items):
+        pick = heapq.nsmallest if ascending else heapq.nlargest
+        return pick(limit, items, key=sort_key)
+    return sorted(items, key=sort_key, reverse=not ascending)
+
+def _scan(source, spec: Dict, sort_by: str, ascending: bool, limit: int, count_only: bool):
+    """(nombre de tâches retenues, limit premières tâches triées, leurs ids si recherche texte)
+
+    Sélection en une seule passe ; en recherche texte, les doublons d'ID sont ignorés.
+    """
+    predicates = _predicates(spec)
+    text_search = "query" in spec
+    if count_only and not text_search:
+        return sum(1 for task in source if all(predicate(task) for predicate in predicates)), [], None
+    seen_ids = set()
+    selected = []
+    for task in source:
+        if all(predicate(task) for predicate in predicates):
+            if text_search:
+                if task["id"] in seen_ids:
+                    continue
+                seen_ids.add(task["id"])
+            selected.append(task)
+    ids = [task["id"] for task in selected] if text_search else None
+    if count_only:
+        return len(selected), [], ids
+    return len(selected), _top(selected, limit, _sort_key(sort_by), ascending), ids
+
+def _parallel_scan(source, spec, sort_by, ascending, limit, count_only):
+    """Comme _scan, réparti entre les processus de parallel_scan ; None si non applicable"""
+    if (source is not task_list or PARALLEL_WORKERS < 2 or len(task_list) < PARALLEL_THRESHOLD
+            or not parallel_scan.available()):
+        return None
+    # store_generation compte aussi les modifications en place sans sauvegarde (assign_user...)
+    version = (store_generation(), _task_changes["count"])
+    partials = parallel_scan.map_partitions(task_list, version, PARALLEL_WORKERS, _scan,
+                                            spec, sort_by, ascending, limit, count_only)
+    if partials is None:
+        return None
+    total_items = sum(total for total, _, _ in partials)
+    if "query" in spec:
+        # Un même ID dans deux partitions : seul le parcours séquentiel sait l'ignorer
+        distinct = set()
+        for _, _, ids in partials:
+            distinct.update(ids)
+        if len(distinct) != total_items:
+            return None
+    # Partitions dans l'ordre de task_list : le tri stable de _top départage comme en séquentiel
+    candidates = [task for _, top, _ in partials for task in top]
+    return total_items, candidates
+
+@instrumented("search_filter_sort_tasks")
+@timed("query")
+def search_filter_sort_tasks(
+    query: Optional[str] = None,
+    search_in: str = "both",
+    status: Optional[str] = None,
+    user_id: Optional[str] = None,
+    priority: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    overdue: Optional[bool] = None,
+    sort_by: str = "created_at",
+    ascending: bool = True,
+    page: int = 1,
+    size: int = 20,
+    tasks: Optional[List[Dict]] = None,
+    projection: str = "full",
+    fields: Optional[List[str]] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    if_generation: Optional[str] = None,
+    user_ids: Optional[set] = None
+) -> Dict:
+    """Recherche, filtre, trie et retourne une liste paginée de tâches.
 
-    filtered = sorted(filtered, key=sort_key, reverse=not ascending)
+    tasks limite la recherche à cette liste (toutes les tâches par défaut).
+    projection="count" ne renvoie que les totaux (ni tri ni matérialisation),
+    projection="ids" renvoie les IDs ordonnés de la page, et fields=[...]
+    limite chaque tâche renvoyée aux champs demandés. created_from / created_to
+    (dates ISO, incluses) filtrent sur la date de création. user_ids : ids des
+    utilisateurs contre lesquels valider user_id, pour une recherche sur une copie
+    (Snapshot) sans lire les utilisateurs partagés.
 
-    # -- Pagination --
-    items = paginate(filtered, page, size)
-    total_items = len(filtered)
-    total_pages = (total_items + size - 1) // size
+    Sans tasks, le résultat porte generation, valeur opaque (voir store_generation). Avec
+    if_generation égal à la génération courante, la recherche n'est pas faite :
+    {"not_modified": True, "generation": ...} (à n'utiliser qu'avec les mêmes critères).
+    """
 
-    for task in items:
-        task["overdue"] = is_task_overdue(task)
+    validate_pagination_params(page, size)
+    if projection not in PROJECTIONS:
+        raise ValueError("Invalid projection")
+    generation = store_generation() if tasks is None else None
+    if if_generation is not None and if_generation == generation:
+        return {"not_modified": True, "generation": generation}
 
-    return {
-        "tasks": items,
+    spec = _filter_spec(query, search_in, status, user_id, priority, tags, overdue, created_from, created_to,
+                        user_ids)
+    today = spec["today"]
+
+    allowed_fields = {"id", "title", "status", "created_at", "priority","custom"}
+    if sort_by not in allowed_fields:
+        raise ValueError("Invalid sort criteria")
+
+    source = task_list if tasks is None else tasks
+    if tasks is None and type(task_list) is _LazyTrackedList and shard_store.is_manifest(DATA_FILE):
+        # Stockage partitionné pas encore chargé : seuls les shards utiles sont lus
+        # Dates normalisées par _filter_spec (AAAA-MM-JJ) : created_from peut être "20240101"
+        shards = shard_store.select_shards(DATA_FILE, user_id, *spec.get("created", (None, None)))
+        if shards is not None:
+            source = shard_store.load(DATA_FILE, shards)
+
+    # Seules les page * size premières tâches sont utiles : tri partiel.
+    limit = page * size
+    count_only = projection == "count"
+    scanned = _parallel_scan(source, spec, sort_by, ascending, limit, count_only)
+    if scanned is None:
+        total_items, ordered, _ = _scan(source, spec, sort_by, ascending, limit, count_only)
+    else:
+        total_items, candidates = scanned
+        ordered = _top(candidates, limit, _sort_key(sort_by), ascending)
+    total_pages = (total_items + size - 1) // size
+
+    result = {
         "page": page,
         "page_size": size,
         "total_items": total_items,
         "total_pages": total_pages
     }
+    if generation is not None:
+        result["generation"] = generation
+    if count_only:
+        return result
 
-def create_user(name: str, email: str) -> dict:
+    # -- Pagination --
+    items = paginate(ordered, page, size)
+
+    if projection == "ids":
+        result["ids"] = [task["id"] for task in items]
+    elif fields is not None:
+        result["tasks"] = [_project_task(task, fields, today) for task in items]
+    else:
+        # Copies : une lecture ne modifie jamais les tâches stockées (lectures concurrentes)
+        result["tasks"] = [{**task, "overdue": _is_overdue(task, today)} for task in items]
+    return result
+
+def _project_task(task: Dict, fields: List[str], today) -> Dict:
+    """Construit un dict limité aux champs demandés, sans modifier la tâche"""
+    projected = {}
+    for field in fields:
+        if field == "overdue":
+            projected["overdue"] = _is_overdue(task, today)
+        elif field in task:
+            projected[field] = task[field]
+    return projected
+
+def _validate_user(name: str, email: str):
     name = name.strip()
     email = email.strip().lower()
 
@@ -354,10 +941,18 @@ def create_user(name: str, email: str) -> dict:
         raise ValueError("Name is required")
     if len(name) > 50:
         raise ValueError("Name cannot exceed 50 characters")
-    if not re.match(EMAIL_REGEX, email):
+    if not EMAIL_REGEX.match(email):
         raise ValueError("Invalid email format")
-    if any(u["email"] == email for u in user_list):
+    return name, email
+
+@instrumented("create_user")
+def create_user(name: str, email: str) -> dict:
+    name, email = _validate_user(name, email)
+    emails = _email_index.get()
+    if email in emails:
         raise ValueError("Email already in use")
+    ids = _user_id_index.get()
+    _user_sort_index.get()
 
     user = {
         "id": str(uuid.uuid4()),
@@ -366,15 +961,86 @@ def create_user(name: str, email: str) -> dict:
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     user_list.append(user)
+    emails[email] = user
+    ids[user["id"]] = user
+    _email_index.mark_synced()
+    _user_id_index.mark_synced()
+    _index_users_sorted([user])
+    _user_sort_index.mark_synced()
     _save_users(user_list)
     return user
 
-def list_users(page: int = 1, size: int = 20) -> dict:
-    sorted_users = sorted(user_list, key=lambda u: u["name"].lower())
+@instrumented("create_users")
+def create_users(users: List[Dict]) -> List[Dict]:
+    """Crée un lot d'utilisateurs ({"name", "email"}) en une seule sauvegarde.
+
+    Tout le lot est validé avant insertion (y compris les emails en double
+    dans le lot) ; la moindre erreur lève BatchValidationError sans rien créer.
+    """
+    emails = _email_index.get()
+    validated = []
+    batch_emails = set()
+    errors = []
+    for index, data in enumerate(users):
+        try:
+            name, email = _validate_user(data.get("name") or "", data.get("email") or "")
+            if email in emails or email in batch_emails:
+                raise ValueError("Email already in use")
+        except ValueError as e:
+            errors.append((index, str(e)))
+            continue
+        batch_emails.add(email)
+        validated.append((name, email))
+
+    if errors:
+        raise BatchValidationError(errors)
+
+    ids = _user_id_index.get()
+    _user_sort_index.get()
+    created_at = datetime.now(timezone.utc).isoformat()
+    created = [
+        {"id": str(uuid.uuid4()), "name": name, "email": email, "created_at": created_at}
+        for name, email in validated
+    ]
+    user_list.extend(created)
+    for user in created:
+        emails[user["email"]] = user
+        ids[user["id"]] = user
+    _email_index.mark_synced()
+    _user_id_index.mark_synced()
+    _index_users_sorted(created)
+    _user_sort_index.mark_synced()
+    _save_users(user_list)
+    return created
+
+def _encode_user_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+def _decode_user_cursor(cursor: str):
+    try:
+        name, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (str(name), str(user_id))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+@instrumented("list_users")
+def list_users(page: int = 1, size: int = 20, cursor: Optional[str] = None) -> dict:
+    """Liste paginée des utilisateurs triés par nom.
+
+    Avec cursor (valeur next_cursor d'une page précédente), la page suivante
+    est trouvée par bisection au lieu d'un décalage.
+    """
+    validate_pagination_params(page, size)
+    index = _user_sort_index.get()
+    keys, sorted_users = index["keys"], index["users"]
     total_items = len(sorted_users)
     total_pages = (total_items + size - 1) // size
 
-    start = (page - 1) * size
+    if cursor is not None:
+        start = bisect.bisect_right(keys, _decode_user_cursor(cursor))
+        page = None
+    else:
+        start = (page - 1) * size
     end = start + size
     paginated = sorted_users[start:end]
 
@@ -383,8 +1049,22 @@ def list_users(page: int = 1, size: int = 20) -> dict:
         "total_items": total_items,
         "total_pages": total_pages,
         "current_page": page,
+        "next_cursor": _encode_user_cursor(keys[end - 1]) if end < total_items else None,
     }
 
+@instrumented("search_users")
+def search_users(prefix: str, limit: int = 10) -> List[Dict]:
+    """Utilisateurs dont le nom commence par prefix (insensible à la casse), triés par nom"""
+    prefix = prefix.strip().casefold()
+    index = _user_sort_index.get()
+    start = bisect.bisect_left(index["keys"], (prefix,))
+    matches = []
+    for key, user in zip(index["keys"][start:start + limit], index["users"][start:start + limit]):
+        if not key[0].startswith(prefix):
+            break
+        matches.append(user)
+    return matches
+
 def get_tasks() -> List[Dict]:
     """Récupère la liste des tâches"""
     return task_list
@@ -395,18 +1075,20 @@ def get_users() -> List[Dict]:
 
 def get_user_by_id(user_id: str) -> Optional[Dict]:
     """Récupère un utilisateur par son ID"""
-    users = _load_users()
-    for user in users:
-        if str(user["id"]) == str(user_id):
-            return user
-    return None
+    return _user_id_index.get().get(str(user_id))
+
+def build_indexes() -> None:
+    """Construit d'avance les index dérivés (utile pour les sessions longues)"""
+    for index in _INDEXES:
+        index.get()
 
 def user_exists(user_id: str) -> bool:
     """Vérifie si un utilisateur existe"""
     return get_user_by_id(user_id) is not None
 
-def assign_task(task_id: str, user_id: Optional[str] = None) -> Dict:
-    """Assigne une tâche à un utilisateur ou la désassigne"""
+@instrumented("assign_task")
+def assign_task(task_id: str, user_id: Optional[str] = None, expected_version: Optional[int] = None) -> Dict:
+    """Assigne une tâche à un utilisateur ou la désassigne (expected_version : voir update_task)"""
     task = None
     for t in task_list:
         if str(t["id"]) == str(task_id):
@@ -415,34 +1097,45 @@ def assign_task(task_id: str, user_id: Optional[str] = None) -> Dict:
     
     if not task:
         raise ValueError("Task not found")
+    _check_version(task, expected_version)
     
+    old_user = task.get("assigned_user")
     if user_id is not None and user_id.strip():
         if not user_exists(user_id.strip()):
             raise ValueError("User not found")
         task["assigned_user"] = str(user_id).strip()
     else:
         task["assigned_user"] = None
-    
-    _save_tasks(task_list)
+    if task["assigned_user"] != old_user:
+        _touch_task(task)
+        action = "assigned" if task["assigned_user"] else "unassigned"
+        add_history_event(task, f"user_{action}", {"user_id": task["assigned_user"], "old_user_id": old_user})
+
+    _save_tasks(task_list, changed=[task])
     return task
 
+@instrumented("get_tasks_assigned_to_user")
 def get_tasks_assigned_to_user(user_id: str) -> List[Dict]:
     """Récupère toutes les tâches assignées à un utilisateur"""
     return [task for task in task_list if task.get("assigned_user") == user_id]
 
+@instrumented("get_unassigned_tasks")
 def get_unassigned_tasks() -> List[Dict]:
     """Récupère toutes les tâches non assignées"""
     return [task for task in task_list if not task.get("assigned_user")]
 
+@instrumented("assign_user")
 def assign_user(task_id: str, user_id: str | None) -> None:
-    task = consult_task(task_id)
+    task = _find_task(task_id)
     old_user = task.get("assigned_user")
     if old_user != user_id:
         task["assigned_user"] = user_id
+        _touch_task(task)
         action = "assigned" if user_id else "unassigned"
-        add_history_event(task, f"user_{action}", {"user_id": user_id})
+        add_history_event(task, f"user_{action}", {"user_id": user_id, "old_user_id": old_user})
 
 
+@instrumented("add_task")
 def add_task(title: str, description: str = "", due_date: Optional[str] = None, priority: str = "NORMAL") -> Dict:
     """Crée une tâche avec titre, description, priorité et date d’échéance facultative."""
 
@@ -461,7 +1154,8 @@ def add_task(title: str, description: str = "", due_date: Optional[str] = None,
         "created_at": datetime.now().isoformat(),
         "priority": priority,
         "history": [],
-        "assigned_user": None  # <- si tu veux garder la compatibilité avec l’ancienne `create_task`
+        "assigned_user": None,  # <- si tu veux garder la compatibilité avec l’ancienne `create_task`
+        "version": 1
     }
 
     if due_date:
@@ -471,27 +1165,189 @@ def add_task(title: str, description: str = "", due_date: Optional[str] = None,
         except ValueError:
             raise ValueError("Invalid date format")
 
-    task["history"].append({
-        "event": "creation",
-        "timestamp": datetime.now().isoformat(),
-        "details": {
-            "title": validated_title,
-            "description": validated_description,
-            "priority": priority,
-            "due_date": task.get("due_date")
-        }
+    add_history_event(task, "creation", {
+        "title": validated_title,
+        "description": validated_description,
+        "priority": priority,
+        "due_date": task.get("due_date")
     })
 
     task_list.append(task)
-    _save_tasks(task_list)
+    _save_tasks(task_list, changed=[task], change="created")
+    return task
+
+# Import en masse (import_tasks) : taille des tranches du fichier confiées à chaque
+# processus, et nombre de processus par défaut
+IMPORT_CHUNK_BYTES = 4 * 1024 * 1024
+IMPORT_WORKERS = int(os.environ.get("TASK_MANAGER_IMPORT_WORKERS", "0")) or os.cpu_count() or 1
+
+def _normalize_import(data, now: str) -> Dict:
+    """Tâche complète à partir d'une ligne importée (mêmes règles que add_task / update_task)"""
+    if not isinstance(data, dict):
+        raise ValueError("Invalid task: expected an object")
+    try:
+        title = _validate_title(data.get("title") or "")
+        description = _validate_description(data.get("description") or "")
+        if not isinstance(data.get("tags") or [], list):
+            raise TypeError
+        tags = list(dict.fromkeys(_validate_tag(tag) for tag in data.get("tags") or []))
+        status = data.get("status") or "TODO"
+        priority = data.get("priority") or "NORMAL"
+        assigned_user = data.get("assigned_user") or None
+        # Une liste ou un objet ferait échouer les tests d'appartenance (TypeError non hachable)
+        if not all(isinstance(value, str) for value in (status, priority, assigned_user or "")):
+            raise TypeError
+    except (TypeError, AttributeError):
+        raise ValueError("Invalid field type")
+
+    if status not in {"TODO", "ONGOING", "DONE"}:
+        raise ValueError("Invalid status. Allowed values: TODO, ONGOING, DONE")
+    if priority not in ALLOWED_PRIORITIES:
+        raise ValueError(f"Invalid priority. Allowed values: {', '.join(ALLOWED_PRIORITIES)}")
+
+    task_id = data.get("id")
+    if task_id is None:
+        task_id = str(uuid.uuid4())
+    else:
+        _check_task_id(str(task_id))
+    try:
+        created_at = datetime.fromisoformat(data["created_at"]).isoformat() if data.get("created_at") else now
+        due_date = datetime.fromisoformat(data["due_date"]).isoformat() if data.get("due_date") else None
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format")
+
+    task = {
+        "id": str(task_id),
+        "title": title,
+        "description": description,
+        "status": status,
+        "created_at": created_at,
+        "priority": priority,
+        "history": [{
+            "event": "creation",
+            "timestamp": now,
+            "details": {"title": title, "description": description, "priority": priority, "due_date": due_date}
+        }],
+        "assigned_user": assigned_user,
+        "version": 1
+    }
+    if due_date:
+        task["due_date"] = due_date
+    if tags:
+        task["tags"] = tags
     return task
 
+def _parse_import_chunk(path: str, start: int, end: int, now: str):
+    """Lit et valide les octets [start, end) du fichier, coupés sur des fins de ligne.
+
+    Renvoie ([(ligne, tâche)], [(ligne, erreur)], nombre de lignes), lignes numérotées
+    à partir de 0 dans la tranche. Exécutée dans les processus d'import : ne dépend
+    que du fichier et de ses arguments.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        content = f.read(end - start)
+    tasks, errors = [], []
+    for number, line in enumerate(content.split(b"\n")):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            errors.append((number, f"Invalid JSON: {e}"))
+            continue
+        try:
+            tasks.append((number, _normalize_import(data, now)))
+        except ValueError as e:
+            errors.append((number, str(e)))
+    return tasks, errors, content.count(b"\n")
+
+def _parse_import_chunk_marshaled(path: str, start: int, end: int, now: str) -> bytes:
+    # marshal : plus rapide que pickle pour renvoyer des dicts JSON au processus principal
+    return marshal.dumps(_parse_import_chunk(path, start, end, now))
+
+def _import_chunks(path: str, chunk_bytes: int) -> List[tuple]:
+    """Tranches (début, fin) d'environ chunk_bytes octets, coupées après une fin de ligne"""
+    size = os.path.getsize(path)
+    chunks, start = [], 0
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size) if start + chunk_bytes < size else size
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+@instrumented("import_tasks")
+def import_tasks(path: str, workers: Optional[int] = None, chunk_bytes: Optional[int] = None) -> Dict:
+    """Importe les tâches d'un fichier NDJSON (un objet JSON par ligne) en une seule sauvegarde.
+
+    Le décodage et la validation des tranches du fichier sont répartis entre
+    workers processus ; les tâches sont ajoutées dans l'ordre du fichier. Les
+    lignes invalides (y compris un ID déjà utilisé ou un utilisateur inconnu)
+    sont ignorées et renvoyées dans errors avec leur numéro de ligne :
+    {"imported": nombre, "errors": [(ligne, message), ...]}.
+    """
+    workers = workers or IMPORT_WORKERS
+    now = datetime.now().isoformat()
+    chunks = _import_chunks(path, chunk_bytes or IMPORT_CHUNK_BYTES)
+    # Des centaines de milliers de dicts créés, tous conservés : les passes du GC ne
+    # feraient que ralentir la réception des tranches (voir aussi snapshot.loads)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if workers > 1 and len(chunks) > 1:
+            context = multiprocessing.get_context("fork") if parallel_scan.available() else None
+            with ProcessPoolExecutor(min(workers, len(chunks)), mp_context=context) as executor:
+                futures = [executor.submit(_parse_import_chunk_marshaled, path, start, end, now)
+                           for start, end in chunks]
+                results = [marshal.loads(future.result()) for future in futures]
+        else:
+            results = [_parse_import_chunk(path, start, end, now) for start, end in chunks]
+    finally:
+        if enabled:
+            gc.enable()
+
+    # Fusion dans l'ordre du fichier ; numéros de ligne à partir de 1
+    known_ids = {str(task["id"]) for task in task_list}
+    imported, errors = [], []
+    first_line = 1
+    for tasks, chunk_errors, line_count in results:
+        errors.extend((first_line + number, message) for number, message in chunk_errors)
+        for number, task in tasks:
+            number += first_line
+            if task["id"] in known_ids:
+                errors.append((number, "Duplicate task id"))
+            elif task["assigned_user"] and not user_exists(task["assigned_user"]):
+                errors.append((number, "User not found"))
+            else:
+                known_ids.add(task["id"])
+                imported.append(task)
+        first_line += line_count
+
+    if imported:
+        for task in imported:
+            # Événement de création fait par les workers : repris dans l'entrée du journal
+            _feed["events"][task["id"]] = [*task["history"]]
+        task_list.extend(imported)
+        _save_tasks(task_list, changed=imported, change="created")
+    return {"imported": len(imported), "errors": sorted(errors)}
+
 def is_task_overdue(task):
+    return _is_overdue(task, _today_utc())
+
+def _today_utc():
+    return datetime.now(timezone.utc).date()
+
+def _is_overdue(task, today) -> bool:
+    """Variante de is_task_overdue avec la date du jour calculée une fois par requête"""
     if task.get("due_date") and task["status"] in {"TODO", "ONGOING"}:
         due = datetime.fromisoformat(task["due_date"])
-        return due.date() < datetime.now(timezone.utc).date()
+        return due.date() < today
     return False
 
+@instrumented("get_all_tags")
 def get_all_tags() -> dict:
     """Retourne un dict {tag: count} de tous les tags utilisés dans toutes les tâches."""
     tag_counts = {}
@@ -500,6 +1356,16 @@ def get_all_tags() -> dict:
             tag_counts[tag] = tag_counts.get(tag, 0) + 1
     return tag_counts
 
+# Historique : les événements sont ajoutés dans l'ordre chronologique, l'ordre de la
+# liste fait foi (pas de tri à la lecture). Un historique ne dépasse jamais
+# HISTORY_LIMIT événements : au-delà, il est ramené à HISTORY_LIMIT - HISTORY_KEEP_RECENT
+# (voir _cap_history), ce qui laisse HISTORY_KEEP_RECENT additions avant le passage suivant.
+HISTORY_LIMIT = 500
+HISTORY_KEEP_RECENT = 100
+# Modifications de champ regroupables : même type et même jour -> un seul événement
+FOLDABLE_EVENTS = {"title_updated", "description_updated", "status_updated",
+                   "priority_updated", "due_date_updated"}
+
 def add_history_event(task: dict, event_type: str, details: dict) -> None:
     if "history" not in task:
         task["history"] = []
@@ -508,21 +1374,388 @@ def add_history_event(task: dict, event_type: str, details: dict) -> None:
         "event": event_type,
         "details": details
     }
-    task["history"].append(event)
+    history = task["history"]
+    history.append(event)
+    if len(history) > HISTORY_LIMIT:
+        _cap_history(history)
+    # Repris dans l'entrée du journal à la sauvegarde de la tâche
+    _feed["events"].setdefault(str(task.get("id")), []).append(event)
+
+def _fold(events: List[Dict]) -> Dict:
+    """Un événement pour une suite de modifications du même champ : premier "old", dernier "new" """
+    first, last = events[0], events[-1]
+    details = {key: first["details"].get(key) if key.startswith("old") else value
+               for key, value in last["details"].items()}
+    details["folded"] = sum(event["details"].get("folded", 1) for event in events)
+    details["first_timestamp"] = first["details"].get("first_timestamp", first["timestamp"])
+    return {"timestamp": last["timestamp"], "event": last["event"], "details": details}
+
+def _compact_events(history: List[Dict], keep_recent: int, width: int = 10) -> int:
+    """Compacte history en place, sauf ses keep_recent derniers événements ; renvoie le nombre retiré.
+
+    width : préfixe du timestamp qui forme la période de regroupement (10 jour,
+    7 mois, 4 année, 0 sans période).
+    """
+    old = history[:max(0, len(history) - keep_recent)]
+    groups = {}
+    for index, event in enumerate(old):
+        if event.get("event") in FOLDABLE_EVENTS:
+            groups.setdefault((event["event"], event["timestamp"][:width]), []).append(index)
+    # L'événement regroupé prend la place du dernier du groupe : l'ordre reste chronologique
+    replaced, dropped = {}, set()
+    for indexes in groups.values():
+        if len(indexes) > 1:
+            replaced[indexes[-1]] = _fold([old[index] for index in indexes])
+            dropped.update(indexes[:-1])
+    if not dropped:
+        return 0
+    history[:len(old)] = [replaced.get(index, event) for index, event in enumerate(old) if index not in dropped]
+    return len(dropped)
+
+def _cap_history(history: List[Dict]) -> None:
+    """Ramène history à HISTORY_LIMIT - HISTORY_KEEP_RECENT événements au plus.
+
+    Les anciens événements (hors HISTORY_KEEP_RECENT derniers) sont regroupés par
+    périodes de plus en plus larges ; s'il en reste trop (assignations, tags), les plus
+    anciens après le premier (la création) sont remplacés par un événement
+    "history_truncated" ({"dropped", "first_timestamp"}).
+    """
+    target = max(HISTORY_LIMIT - HISTORY_KEEP_RECENT, HISTORY_KEEP_RECENT + 2)
+    for width in (10, 7, 4, 0):
+        if len(history) <= target:
+            return
+        _compact_events(history, HISTORY_KEEP_RECENT, width)
+    # Le marqueur prend la place d'un des événements retirés
+    count = min(len(history) - target + 1, len(history) - HISTORY_KEEP_RECENT - 1)
+    if count < 2:
+        return
+    dropped = history[1:1 + count]
+    first = dropped[0]
+    marker = {
+        "timestamp": dropped[-1]["timestamp"],
+        "event": "history_truncated",
+        "details": {
+            # Un marqueur déjà présent compte les événements qu'il remplace
+            "dropped": sum(e["details"]["dropped"] if e["event"] == "history_truncated" else 1 for e in dropped),
+            "first_timestamp": first["details"].get("first_timestamp", first["timestamp"]),
+        },
+    }
+    history[1:1 + count] = [marker]
+
+@instrumented("compact_history")
+def compact_history(task_id: Optional[str] = None, keep_recent: int = HISTORY_KEEP_RECENT) -> int:
+    """Regroupe les anciennes modifications de champ (hors keep_recent derniers événements)
+    par type et par jour : un événement par groupe, avec le premier "old", le dernier "new",
+    "folded" (nombre d'événements) et "first_timestamp". Toutes les tâches si task_id est None.
+
+    Renvoie le nombre d'événements retirés.
+    """
+    if not isinstance(keep_recent, int) or keep_recent < 0:
+        raise ValueError("Invalid keep_recent")
+    tasks = task_list if task_id is None else [_find_task(task_id)]
+    changed, removed = [], 0
+    for task in tasks:
+        count = _compact_events(task.get("history", []), keep_recent)
+        if count:
+            removed += count
+            _touch_task(task)
+            changed.append(task)
+    if changed:
+        _save_tasks(task_list, changed=changed)
+    return removed
 
-def get_task_history(task_id: str, page: int = 1, size: int = 10) -> dict:
-    task = consult_task(task_id)
+def _history_bound(value: Optional[str]) -> Optional[str]:
+    """Date ISO comparable aux horodatages de l'historique (heure locale, sans fuseau)"""
+    if value is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat()
+
+def _journal_timestamp(value: str) -> str:
+    """Date ISO au format des timestamps du journal ; sans fuseau : heure locale, comme l'historique"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format")
+    # astimezone() lit une date naïve en heure locale
+    return change_feed.format_timestamp(moment.astimezone())
+
+@instrumented("get_task_history")
+def get_task_history(task_id: str, page: int = 1, size: int = 10,
+                     since: Optional[str] = None, until: Optional[str] = None) -> dict:
+    """Historique d'une tâche, du plus récent au plus ancien, par pages.
+
+    since / until : dates ISO, limite les événements à since <= horodatage < until
+    (recherche par dichotomie dans l'historique, déjà chronologique).
+    """
+    task = _read_task(task_id)
     history = task.get("history", [])
-    history_sorted = sorted(history, key=lambda e: e["timestamp"], reverse=True)
-    total_items = len(history_sorted)
+    low, high = 0, len(history)
+    if since is not None:
+        low = bisect.bisect_left(history, _history_bound(since), key=lambda e: e["timestamp"])
+    if until is not None:
+        high = bisect.bisect_left(history, _history_bound(until), lo=low, key=lambda e: e["timestamp"])
+    total_items = max(0, high - low)
     total_pages = (total_items + size - 1) // size
     start = (page - 1) * size
-    end = start + size
-    page_items = history_sorted[start:end]
+    # Page lue à rebours depuis la fin de la plage
+    end = high - start if start >= 0 else low
+    page_items = history[max(low, end - size):max(low, end)][::-1]
     return {
         "history": page_items,
         "page": page,
         "page_size": size,
         "total_items": total_items,
         "total_pages": total_pages
-    }
\ No newline at end of file
+    }
+
+def _check_sequence(since) -> None:
+    if not isinstance(since, int) or isinstance(since, bool) or since < 0:
+        raise ValueError("Invalid sequence number")
+
+@instrumented("get_changes")
+def get_changes(since: int = 0, limit: int = 1000) -> dict:
+    """Modifications enregistrées (sauvegardées) après la séquence since, dans l'ordre.
+
+    Renvoie {"changes": [...], "last_seq": séquence de la dernière entrée renvoyée
+    (since s'il n'y en a pas)} : passer last_seq à l'appel suivant pour continuer.
+    """
+    _check_sequence(since)
+    if not isinstance(limit, int) or limit < 1:
+        raise ValueError("Invalid limit")
+    changes = change_feed.read(change_feed.journal_path(DATA_FILE), since, limit)
+    return {"changes": changes, "last_seq": changes[-1]["seq"] if changes else since}
+
+def watch_changes(since: int = 0, interval: float = 1.0, once: bool = False):
+    """Générateur des modifications après since, puis des suivantes à mesure qu'elles arrivent.
+
+    Les écritures d'autres processus sont vues aussi (lecture du journal par
+    intervalle de interval secondes) ; once : s'arrête à la fin du journal.
+    """
+    _check_sequence(since)
+    return change_feed.follow(change_feed.journal_path(DATA_FILE), since, interval, once)
+
+@instrumented("export_changes")
+def export_changes(path: str, since: int = 0, since_time: Optional[str] = None) -> dict:
+    """Écrit dans path (NDJSON) les tâches créées, modifiées ou supprimées depuis un point.
+
+    Le point est une séquence du journal (since) ou une date (since_time, ISO 8601,
+    heure locale si sans fuseau). Une ligne par tâche, son dernier état seulement :
+    {"op": "upsert", "seq", "updated_at", "task"} (tâche sans history) ou, pour une tâche supprimée,
+    {"op": "delete", "seq", "updated_at", "id"}. Lit uniquement le journal, pas le
+    stockage. Le fichier est remplacé d'un coup (jamais à moitié écrit) ; last_seq,
+    renvoyé avec les compteurs, est le since de l'export suivant.
+    """
+    _check_sequence(since)
+    if since_time is not None:
+        point, field = _journal_timestamp(since_time), "timestamp"
+    else:
+        point, field = since, "seq"
+
+    journal = change_feed.journal_path(DATA_FILE)
+    # Par date sans modification depuis : l'export suivant reprend à la fin actuelle du journal
+    last_seq = since if since_time is None else change_feed.last_sequence(journal)
+    # Dernière entrée par tâche, dans l'ordre de leur dernière modification
+    latest = {}
+    for entry in change_feed.iterate(journal, point, field):
+        latest.pop(entry["task_id"], None)
+        latest[entry["task_id"]] = entry
+        last_seq = entry["seq"]
+
+    deleted = 0
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        for task_id, entry in latest.items():
+            row = {"op": "upsert", "seq": entry["seq"], "updated_at": entry["timestamp"]}
+            if entry["type"] == "deleted":
+                row["op"] = "delete"
+                row["id"] = task_id
+                deleted += 1
+            else:
+                row["task"] = entry["task"]
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(temporary, path)
+    return {"exported": len(latest) - deleted, "deleted": deleted, "last_seq": last_seq}
+
+# Annulation : les entrées du journal portent de quoi revenir en arrière (valeurs
+# "old" des événements, tâche supprimée dans "previous"). Revenir avant un ensemble
+# d'entrées, c'est donner à chaque tâche concernée l'état d'avant sa première entrée :
+# seules ces entrées sont lues, pas le stockage ni le reste du journal. L'annulation
+# est elle-même une modification (journalisée, avec ses propres événements).
+_SIMPLE_FIELDS = ("title", "description", "status", "priority")
+
+def _revert_event(state: Dict, event: Dict) -> None:
+    kind, details = event.get("event"), event.get("details") or {}
+    if kind in {f"{field}_updated" for field in _SIMPLE_FIELDS}:
+        state[kind[:-len("_updated")]] = details.get("old")
+    elif kind == "due_date_updated":
+        if details.get("old_due_date"):
+            state["due_date"] = details["old_due_date"]
+        else:
+            state.pop("due_date", None)
+    elif kind == "tag_added":
+        if details.get("tag") in state.get("tags", []):
+            state["tags"].remove(details["tag"])
+    elif kind == "tag_removed":
+        state.setdefault("tags", []).append(details.get("tag"))
+    elif kind in ("user_assigned", "user_unassigned") and "old_user_id" in details:
+        state["assigned_user"] = details["old_user_id"]
+
+def _state_before(entry: Dict) -> Optional[Dict]:
+    """État de la tâche juste avant l'entrée (None : elle n'existait pas)"""
+    if entry["type"] == "created":
+        return None
+    if entry["type"] == "deleted":
+        if "previous" not in entry:
+            raise ValueError(f"Change {entry['seq']} cannot be reverted")
+        return entry["previous"]
+    state = entry["task"]
+    for event in reversed(entry["events"]):
+        _revert_event(state, event)
+    return state
+
+def _apply_state(task: Dict, state: Dict) -> bool:
+    """Ramène les champs de task à ceux de state, avec les événements d'historique habituels"""
+    changed = False
+    for field in _SIMPLE_FIELDS:
+        if task.get(field) != state.get(field):
+            add_history_event(task, f"{field}_updated", {"old": task.get(field), "new": state.get(field)})
+            task[field] = state.get(field)
+            changed = True
+    if task.get("due_date") != state.get("due_date"):
+        add_history_event(task, "due_date_updated",
+                          {"old_due_date": task.get("due_date"), "new_due_date": state.get("due_date")})
+        if state.get("due_date"):
+            task["due_date"] = state["due_date"]
+        else:
+            task.pop("due_date", None)
+        changed = True
+    tags, wanted = task.get("tags", []), state.get("tags", [])
+    if tags != wanted:
+        for tag in [tag for tag in tags if tag not in wanted]:
+            add_history_event(task, "tag_removed", {"tag": tag})
+        for tag in [tag for tag in wanted if tag not in tags]:
+            add_history_event(task, "tag_added", {"tag": tag})
+        task["tags"] = list(wanted)
+        changed = True
+    old_user, user = task.get("assigned_user"), state.get("assigned_user")
+    if old_user != user:
+        action = "assigned" if user else "unassigned"
+        add_history_event(task, f"user_{action}", {"user_id": user, "old_user_id": old_user})
+        task["assigned_user"] = user
+        changed = True
+    return changed
+
+def _revert(entries, event_type: str, details: Dict) -> Dict:
+    """Annule les entrées (dans l'ordre du journal) ; renvoie les ids des tâches touchées"""
+    targets, versions, histories = {}, {}, {}
+    for entry in entries:
+        task_id = entry["task_id"]
+        if task_id not in targets:
+            targets[task_id] = _state_before(entry)
+        if "previous" in entry:
+            # "task" n'a pas d'historique : une tâche recréée reprend celui de sa suppression
+            histories[task_id] = entry["previous"].get("history", [])
+        for state in (entry.get("task"), entry.get("previous")):
+            if state:
+                versions[task_id] = max(versions.get(task_id, 0), state.get("version", 0))
+    # Tous les états calculés avant la première modification : une erreur n'applique rien
+    current = {str(task["id"]): task for task in task_list if str(task["id"]) in targets}
+    result = {"updated": [], "created": [], "deleted": []}
+    with deferred_saves():
+        for task_id, state in targets.items():
+            task = current.get(task_id)
+            if state is None:
+                if task is not None:
+                    add_history_event(task, event_type, details)
+                    result["deleted"].append(task_id)
+            elif task is None:
+                # Supprimée depuis : recréée, avec une version au-delà de toutes celles vues
+                task = {**state, "history": [*histories.get(task_id, state.get("history", []))],
+                        "version": versions.get(task_id, 0)}
+                # Toute l'histoire est nouvelle pour le journal : son entrée la porte
+                _feed["events"][task_id] = [*task["history"]]
+                add_history_event(task, event_type, details)
+                _touch_task(task)
+                task_list.append(task)
+                result["created"].append(task_id)
+                _save_tasks(task_list, changed=[task], change="created")
+            elif _apply_state(task, state):
+                add_history_event(task, event_type, details)
+                _touch_task(task)
+                result["updated"].append(task_id)
+                _save_tasks(task_list, changed=[task])
+        if result["deleted"]:
+            deleted = set(result["deleted"])
+            removed = [current[task_id] for task_id in result["deleted"]]
+            task_list[:] = [task for task in task_list if str(task["id"]) not in deleted]
+            _save_tasks(task_list, changed=removed, change="deleted")
+    return result
+
+def _undone_boundary(entry: Dict) -> Optional[int]:
+    for event in entry["events"]:
+        if event.get("event") == "undone":
+            return event["details"]["to_seq"]
+    return None
+
+@instrumented("undo_changes")
+def undo_changes(count: int = 1) -> dict:
+    """Annule les count dernières opérations du journal (une opération : une sauvegarde,
+    par exemple une commande, un lot ou un import).
+
+    Les opérations déjà annulées sont sautées : undo_changes() répété remonte le
+    journal. Renvoie {"updated", "created", "deleted"} (ids des tâches remises dans
+    leur état d'avant, recréées, supprimées) et "to_seq" (séquence où l'on est revenu).
+    """
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+        raise ValueError("Invalid count")
+    journal = change_feed.journal_path(DATA_FILE)
+    operations, boundary, skip_to = [], 0, None
+    for entry in change_feed.iterate_backwards(journal):
+        if skip_to is not None and entry["seq"] > skip_to:
+            continue
+        skip_to = _undone_boundary(entry)
+        if skip_to is not None:
+            continue
+        # Entrées sans événement (compactage de l'historique...) : rien à annuler de visible
+        if not entry["events"] and entry["type"] == "updated":
+            continue
+        # Les entrées d'une même sauvegarde partagent leur timestamp
+        if not operations or operations[-1] != entry["timestamp"]:
+            if len(operations) == count:
+                boundary = entry["seq"]
+                break
+            operations.append(entry["timestamp"])
+    if not operations:
+        raise ValueError("Nothing to undo")
+    result = _revert(change_feed.iterate(journal, boundary), "undone", {"to_seq": boundary})
+    return {**result, "to_seq": boundary}
+
+@instrumented("restore_at")
+def restore_at(timestamp: str) -> dict:
+    """Ramène les tâches à leur état à la date timestamp (ISO 8601, heure locale si sans fuseau).
+
+    Seules les entrées du journal postérieures sont lues et annulées ; le retour est
+    lui-même une opération, que undo_changes() peut annuler. Renvoie les ids des
+    tâches touchées, comme undo_changes.
+    """
+    point = _journal_timestamp(timestamp)
+    entries = change_feed.iterate(change_feed.journal_path(DATA_FILE), point, "timestamp")
+    return _revert(entries, "restored", {"at": point})
+
+def _index_gauges(value):
+    return lambda: [({"index": index.name}, value(index)) for index in _INDEXES]
+
+metrics.register_gauge("task_manager_store_items", "Nombre d'éléments en mémoire",
+                       # list.__len__ : ne force pas le chargement d'un stockage indexé (0 tant qu'il n'est pas chargé)
+                       lambda: [({"store": "tasks"}, list.__len__(task_list)), ({"store": "users"}, len(user_list))])
+metrics.register_gauge("task_manager_index_entries", "Taille des index dérivés (0 si non construit)",
+                       _index_gauges(lambda index: index.size(index.data) if index.data is not None else 0))
+metrics.register_gauge("task_manager_index_hit_ratio", "Part des accès à un index servis sans reconstruction",
+                       _index_gauges(lambda index: index.hits / (index.hits + index.rebuilds)
+                                     if index.hits + index.rebuilds else 0))
@@ -0,0 +1,380 @@
+# task_store.py - Accès multi-threads à task_manager (serveur WSGI à threads par exemple)
+#
+# TaskStore protège l'état partagé de task_manager par un verrou lecteurs-rédacteur :
+# les lectures s'exécutent en parallèle, une modification a l'accès exclusif. Les
+# lectures ne modifient pas les tâches stockées (overdue est calculé dans la réponse)
+# et les résultats sont des copies, utilisables hors du verrou.
+#
+# Persistance groupée : une modification ne garde le verrou exclusif que le temps de
+# changer la mémoire. La sauvegarde copie ensuite l'état sous le verrou partagé (les
+# lectures continuent) et écrit les fichiers hors de tout verrou, une écriture à la
+# fois ; les modifications faites entre-temps par d'autres threads partent ensemble
+# dans l'écriture suivante. Comme avec task_manager, un appel ne rend la main qu'une
+# fois sa modification sur disque.
+#
+# Versions (MVCC) : chaque modification validée publie un Snapshot, version figée
+# des tâches et des utilisateurs. Un Snapshot partage avec le précédent toutes les
+# tâches non modifiées (seules les tâches changées sont copiées) et n'est plus
+# jamais modifié : un lecteur peut le garder le temps d'un parcours paginé ou d'un
+# export, sans verrou et sans bloquer les modifications. consult_task et
+# search_filter_sort_tasks lisent la dernière version publiée.
+#
+# Lire-modifier-écrire sans verrou autour : lire la tâche (dans un Snapshot), puis
+# passer sa version en expected_version à update_task / assign_task. Le contrôle se
+# fait sous le verrou exclusif : si un autre thread a modifié cette tâche entre-temps,
+# VersionConflictError est levée et rien n'est écrit ; il suffit de relire et de
+# recommencer. Les modifications d'autres tâches ne provoquent pas de conflit.
+#
+# Tous les accès doivent passer par le même TaskStore :
+#
+#   store = TaskStore()
+#   task = store.add_task("Titre")
+#   with store.batch():                  # plusieurs modifications, une seule sauvegarde
+#       store.update_task(task["id"], status="DONE")
+#       store.assign_task(task["id"], "user-1")
+#
+#   snapshot = store.snapshot()          # pages cohérentes entre elles
+#   for page in range(1, 4):
+#       snapshot.search_filter_sort_tasks(sort_by="title", page=page)
+
+import marshal
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterator, Optional
+
+from src import task_manager
+
+# Taille minimale du delta d'un Snapshot avant sa fusion dans la base (voir Snapshot)
+MIN_DELTA = 256
+
+
+class RWLock:
+    """Verrou lecteurs-rédacteur, priorité aux rédacteurs (pas de famine des modifications).
+
+    Le rédacteur peut reprendre le verrou exclusif (blocs imbriqués) ; un lecteur
+    ne doit pas reprendre le verrou partagé qu'il détient déjà.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._depth += 1
+                return
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._depth = 1
+
+    def release_write(self):
+        with self._condition:
+            self._depth -= 1
+            if not self._depth:
+                self._writer = None
+                self._condition.notify_all()
+
+    def is_writer(self) -> bool:
+        """Vrai si le thread courant détient le verrou exclusif"""
+        return self._writer == threading.get_ident()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def _detached(value):
+    """Copie profonde d'un résultat (dicts, listes, scalaires), indépendante de l'état partagé"""
+    return marshal.loads(marshal.dumps(value))
+
+def _copy(records) -> list:
+    # Élément par élément : le GIL est rendu entre deux copies, les autres threads avancent
+    return [marshal.loads(marshal.dumps(record)) for record in records]
+
+
+class Snapshot:
+    """Version figée des tâches et des utilisateurs, à ne pas modifier.
+
+    Les tâches sont rangées par id dans une base partagée entre versions et un
+    delta propre à la version (tâches modifiées, ajoutées, ou None si supprimées).
+    Publier une version ne copie que le delta ; quand il dépasse MIN_DELTA et un
+    huitième de la base, il est fusionné dans une nouvelle base.
+    """
+
+    def __init__(self, version: int, base: Dict, delta: Dict, count: int, users: tuple):
+        self.version = version
+        self.users = users
+        self._base = base
+        self._delta = delta
+        self._count = count
+        self._user_ids = None
+
+    @classmethod
+    def build(cls, version: int, tasks, users) -> "Snapshot":
+        base = {str(task["id"]): _detached(task) for task in tasks}
+        return cls(version, base, {}, len(base), tuple(users))
+
+    def derive(self, updates: Dict, users: tuple) -> "Snapshot":
+        """Version suivante : updates associe un id à sa nouvelle tâche (None : supprimée)"""
+        count = self._count
+        for key, task in updates.items():
+            count += (task is not None) - (self.get_task(key) is not None)
+        base, delta = self._base, {**self._delta, **updates}
+        if len(delta) > max(MIN_DELTA, len(base) // 8):
+            merged = Snapshot(self.version, base, delta, count, users)
+            base, delta = {str(task["id"]): task for task in merged}, {}
+        return Snapshot(self.version + 1, base, delta, count, users)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Dict]:
+        # Ordre de task_list : les ajouts arrivent en fin de base ou de delta
+        base, delta = self._base, self._delta
+        for key, task in base.items():
+            if key in delta:
+                task = delta[key]
+                if task is None:
+                    continue
+            yield task
+        for key, task in delta.items():
+            if task is not None and key not in base:
+                yield task
+
+    def get_task(self, task_id) -> Optional[Dict]:
+        key = str(task_id)
+        if key in self._delta:
+            return self._delta[key]
+        return self._base.get(key)
+
+    def consult_task(self, task_id: str) -> Dict:
+        task_manager._check_task_id(task_id)
+        task = self.get_task(task_id)
+        if task is None:
+            raise ValueError("Task not found")
+        return {**task, "overdue": task_manager.is_task_overdue(task)}
+
+    def consult_task_if_changed(self, task_id: str, version: int) -> Optional[Dict]:
+        task_manager._check_task_id(task_id)
+        task = self.get_task(task_id)
+        if task is None:
+            raise ValueError("Task not found")
+        if task.get("version", 0) == version:
+            return None
+        return {**task, "overdue": task_manager.is_task_overdue(task)}
+
+    def search_filter_sort_tasks(self, *args, if_generation: Optional[str] = None, **kwargs) -> Dict:
+        """Comme task_manager.search_filter_sort_tasks ; la génération suit la version du Snapshot"""
+        generation = task_manager._generation(f"v{self.version}")
+        if if_generation is not None and if_generation == generation:
+            return {"not_modified": True, "generation": generation}
+        if self._user_ids is None:
+            # Calculé une fois par version (les ids ne changent pas dans un Snapshot)
+            self._user_ids = {str(user["id"]) for user in self.users}
+        result = task_manager.search_filter_sort_tasks(*args, tasks=list(self), user_ids=self._user_ids, **kwargs)
+        result["generation"] = generation
+        return result
+
+
+def _reader(function):
+    @wraps(function)
+    def method(self, *args, **kwargs):
+        self._ensure_loaded()
+        if self._lock.is_writer():
+            # Lecture dans un bloc batch() : le thread a déjà l'accès exclusif
+            return _detached(function(*args, **kwargs))
+        with self._lock.read():
+            return _detached(function(*args, **kwargs))
+    return method
+
+def _snapshot_reader(name):
+    function = getattr(task_manager, name)
+
+    @wraps(function)
+    def method(self, *args, **kwargs):
+        if self._lock.is_writer():
+            return _detached(function(*args, **kwargs))
+        # Sans verrou : la dernière version publiée
+        return _detached(getattr(self.snapshot(), name)(*args, **kwargs))
+    return method
+
+def _writer(function):
+    @wraps(function)
+    def method(self, *args, **kwargs):
+        with self.batch():
+            return _detached(function(*args, **kwargs))
+    return method
+
+
+class TaskStore:
+    """Façade thread-safe de task_manager (voir l'en-tête du module)"""
+
+    def __init__(self):
+        self._lock = RWLock()
+        self._save_lock = threading.Lock()
+        self._pending = {"tasks": False, "users": False, "changed": [], "entries": []}
+        self.saves = 0
+        # Modifications pas encore publiées dans un Snapshot (changed None : toutes)
+        self._unpublished = {"changed": [], "users": False, "deleted": set()}
+        self._current = None
+
+    def _ensure_loaded(self):
+        # Stockage indexé ou partitionné : un seul thread fait le chargement complet
+        if type(task_manager.task_list) is task_manager._LazyTrackedList:
+            with self._lock.write():
+                if type(task_manager.task_list) is task_manager._LazyTrackedList:
+                    task_manager.task_list.load()
+
+    def _merge(self, tasks: bool, users: bool, changed, entries=()) -> None:
+        unpublished = self._unpublished
+        unpublished["users"] |= users
+        if changed is None or unpublished["changed"] is None:
+            unpublished["changed"] = None
+        elif tasks:
+            unpublished["changed"].extend(changed)
+
+        pending = self._pending
+        pending["tasks"] |= tasks
+        pending["users"] |= users
+        pending["entries"].extend(entries)
+        if changed is None or pending["changed"] is None:
+            pending["changed"] = None
+        elif tasks:
+            pending["changed"].extend(changed)
+
+    def snapshot(self) -> Snapshot:
+        """Dernière version publiée ; elle reste valide et figée tant qu'on la garde"""
+        if self._current is None:
+            self._ensure_loaded()
+            with self._lock.write():
+                if self._current is None:
+                    self._current = Snapshot.build(0, task_manager.task_list, task_manager.user_list)
+        return self._current
+
+    def _publish(self) -> None:
+        # Sous le verrou exclusif, en fin de bloc : la nouvelle version remplace l'ancienne d'un coup
+        unpublished = self._unpublished
+        self._unpublished = {"changed": [], "users": False, "deleted": set()}
+        current = self._current
+        if current is None or unpublished["changed"] is None:
+            version = current.version + 1 if current else 0
+            self._current = Snapshot.build(version, task_manager.task_list, task_manager.user_list)
+            return
+        if not (unpublished["changed"] or unpublished["users"]):
+            return
+        deleted = unpublished["deleted"]
+        updates = {}
+        for task in unpublished["changed"]:
+            key = str(task["id"])
+            updates[key] = None if key in deleted else _detached(task)
+        users = tuple(task_manager.user_list) if unpublished["users"] else current.users
+        self._current = current.derive(updates, users)
+
+    def _persist(self) -> None:
+        # Une écriture à la fois ; elle emporte aussi les modifications des threads en attente
+        with self._save_lock:
+            with self._lock.read():
+                pending = self._pending
+                if not (pending["tasks"] or pending["users"]):
+                    return
+                self._pending = {"tasks": False, "users": False, "changed": [], "entries": []}
+                tasks = _copy(task_manager.task_list) if pending["tasks"] else None
+                users = _copy(task_manager.user_list) if pending["users"] else None
+            if tasks is not None:
+                # Seulement les entrées des modifications que cette copie contient
+                task_manager._write_store(task_manager.DATA_FILE, tasks, pending["changed"], pending["entries"])
+            if users is not None:
+                task_manager._write_store(task_manager.USER_FILE, users)
+            self.saves += 1
+
+    @contextmanager
+    def batch(self):
+        """Modifications exclusives : les autres threads attendent, une seule sauvegarde à la sortie"""
+        self._ensure_loaded()
+        nested = self._lock.is_writer()
+        try:
+            with self._lock.write():
+                try:
+                    with task_manager.deferred_saves():
+                        try:
+                            yield self
+                        finally:
+                            # Récupérées avant la sortie du bloc : deferred_saves n'écrit donc rien
+                            self._merge(*task_manager.take_pending_saves(), task_manager.take_pending_changes())
+                finally:
+                    if not nested:
+                        self._publish()
+        finally:
+            if not nested:
+                self._persist()
+
+    def delete_task(self, task_id: str) -> None:
+        with self.batch():
+            task_manager.delete_task(task_id)
+            self._unpublished["deleted"].add(str(task_id))
+
+    def undo_changes(self, count: int = 1) -> Dict:
+        with self.batch():
+            result = task_manager.undo_changes(count)
+            self._unpublished["deleted"].update(result["deleted"])
+            return result
+
+    def restore_at(self, timestamp: str) -> Dict:
+        with self.batch():
+            result = task_manager.restore_at(timestamp)
+            self._unpublished["deleted"].update(result["deleted"])
+            return result
+
+    add_task = _writer(task_manager.add_task)
+    update_task = _writer(task_manager.update_task)
+    assign_task = _writer(task_manager.assign_task)
+    compact_history = _writer(task_manager.compact_history)
+    create_user = _writer(task_manager.create_user)
+    create_users = _writer(task_manager.create_users)
+
+    consult_task = _snapshot_reader("consult_task")
+    consult_task_if_changed = _snapshot_reader("consult_task_if_changed")
+    search_filter_sort_tasks = _snapshot_reader("search_filter_sort_tasks")
+    get_task_history = _reader(task_manager.get_task_history)
+    get_all_tags = _reader(task_manager.get_all_tags)
+    get_tasks_assigned_to_user = _reader(task_manager.get_tasks_assigned_to_user)
+    get_unassigned_tasks = _reader(task_manager.get_unassigned_tasks)
+    list_users = _reader(task_manager.list_users)
+    search_users = _reader(task_manager.search_users)
+    get_user_by_id = _reader(task_manager.get_user_by_id)
+    user_exists = _reader(task_manager.user_exists)
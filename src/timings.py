@@ -0,0 +1,59 @@
+# timings.py - Mesures de durée légères (spans) pour l'option --timings
+
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict
+
+# nom du span -> [nombre d'appels, durée cumulée en secondes]
+_spans: Dict[str, list] = {}
+
+def record(name: str, seconds: float) -> None:
+    """Ajoute une durée au span name"""
+    entry = _spans.get(name)
+    if entry is None:
+        _spans[name] = [1, seconds]
+    else:
+        entry[0] += 1
+        entry[1] += seconds
+
+@contextmanager
+def span(name: str):
+    """Mesure la durée du bloc sous le nom name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+def timed(name: str):
+    """Décorateur : chaque appel de la fonction est compté dans le span name"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def get_timings() -> Dict[str, Dict]:
+    """Retourne {nom: {"count": n, "seconds": durée cumulée}}"""
+    return {name: {"count": count, "seconds": seconds} for name, (count, seconds) in _spans.items()}
+
+def reset_timings() -> None:
+    _spans.clear()
+
+def format_timings() -> str:
+    """Résumé sur une ligne, dans l'ordre chargement / requête / rendu / sauvegarde"""
+    order = ["load", "query", "render", "save"]
+    names = [name for name in order if name in _spans] + sorted(set(_spans) - set(order))
+    if not names:
+        return "Temps : aucune mesure"
+    parts = []
+    for name in names:
+        count, seconds = _spans[name]
+        parts.append(f"{name} {seconds * 1000:.1f} ms" + (f" ({count}x)" if count > 1 else ""))
+    return "Temps : " + ", ".join(parts)
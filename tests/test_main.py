@@ -8,7 +8,7 @@ from click.testing import CliRunner
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.main import cli
+from src.main import cli, shell_complete, parse_batch_line, BATCH_OPERATIONS
 from src.task_manager import *
 
 class TestMainCLI:
@@ -252,6 +252,19 @@ class TestUpdateCommand:
         assert result.exit_code == 0
         mock_update_task.assert_called_once_with(task_id, title=None, description=None)
 
+    @patch('src.main.update_task')
+    def test_update_command_with_tag_options(self, mock_update_task):
+        """Test que --add-tag / --remove-tag évitent les questions interactives"""
+        task_id = str(uuid.uuid4())
+        mock_update_task.return_value = {"id": task_id, "title": "Titre"}
+
+        result = self.runner.invoke(cli, ['update', task_id, '--add-tag', 'urgent', '--add-tag', 'bug',
+                                          '--remove-tag', 'vieux'])
+
+        assert result.exit_code == 0
+        mock_update_task.assert_called_once_with(task_id, title=None, description=None,
+                                                 add_tags=["urgent", "bug"], remove_tags=["vieux"])
+
 class TestDeleteCommand:
     
     def setup_method(self):
@@ -388,6 +401,39 @@ class TestUsersCommand:
         assert result.exit_code == 0
         assert "Aucun utilisateur trouvé" in result.output
 
+    @patch('src.main.search_users')
+    def test_users_command_with_prefix(self, mock_search_users):
+        """Test la commande users --prefix"""
+        mock_search_users.return_value = [{"id": "user-1", "name": "Alice Martin", "email": "alice@example.com"}]
+
+        result = self.runner.invoke(cli, ['users', '--prefix', 'ali'])
+
+        assert result.exit_code == 0
+        assert "Alice Martin" in result.output
+        mock_search_users.assert_called_once_with('ali', limit=20)
+
+    @patch('src.main.list_users')
+    def test_users_command_paged_shows_next_cursor(self, mock_list_users):
+        """Test la commande users paginée affiche le curseur suivant"""
+        mock_list_users.return_value = {
+            "users": [{"id": "user-1", "name": "Alice Martin", "email": "alice@example.com"}],
+            "total_items": 3, "total_pages": 3, "current_page": 1, "next_cursor": "abc123"
+        }
+
+        result = self.runner.invoke(cli, ['users', '--size', '1'])
+
+        assert result.exit_code == 0
+        assert "--cursor abc123" in result.output
+        mock_list_users.assert_called_once_with(page=1, size=1, cursor=None)
+
+    @patch('src.main.list_users')
+    def test_users_command_rejects_invalid_paging(self, mock_list_users):
+        """Test la commande users refuse une page ou une taille inférieure à 1"""
+        for args in (['--page', '-1'], ['--page', '0'], ['--size', '0']):
+            result = self.runner.invoke(cli, ['users', *args])
+            assert result.exit_code == 2
+        mock_list_users.assert_not_called()
+
 class TestUserTasksCommand:
     
     def setup_method(self):
@@ -587,6 +633,48 @@ class TestFilterCommand:
         assert result.exit_code == 0
         assert "user-deleted" in result.output
 
+    @patch('src.main.search_filter_sort_tasks')
+    def test_filter_command_count_only(self, mock_filter):
+        """Test filter --count affiche uniquement le total"""
+        mock_filter.return_value = {"page": 1, "page_size": 20, "total_items": 42, "total_pages": 3}
+
+        result = self.runner.invoke(cli, ['filter', '--status', 'TODO', '--count'])
+
+        assert result.exit_code == 0
+        assert result.output.strip() == "42"
+        assert mock_filter.call_args.kwargs["projection"] == "count"
+
+    @patch('src.main.search_filter_sort_tasks')
+    def test_filter_command_ids_only(self, mock_filter):
+        """Test filter --ids-only affiche un ID par ligne"""
+        mock_filter.return_value = {"ids": ["task-1", "task-2"], "page": 1, "page_size": 20,
+                                    "total_items": 2, "total_pages": 1}
+
+        result = self.runner.invoke(cli, ['filter', '--ids-only'])
+
+        assert result.exit_code == 0
+        assert result.output.splitlines() == ["task-1", "task-2"]
+        assert mock_filter.call_args.kwargs["projection"] == "ids"
+
+    @patch('src.main.search_filter_sort_tasks')
+    def test_filter_created_range_is_passed(self, mock_filter):
+        mock_filter.return_value = {"page": 1, "page_size": 20, "total_items": 2, "total_pages": 1}
+
+        result = self.runner.invoke(cli, ['filter', '--count', '--created-from', '2024-01-01', '--created-to', '2024-01-31'])
+
+        assert result.exit_code == 0
+        assert mock_filter.call_args.kwargs["created_from"] == "2024-01-01"
+        assert mock_filter.call_args.kwargs["created_to"] == "2024-01-31"
+
+    @patch('src.main.search_filter_sort_tasks')
+    def test_filter_tags_are_passed(self, mock_filter):
+        mock_filter.return_value = {"page": 1, "page_size": 20, "total_items": 1, "total_pages": 1}
+
+        result = self.runner.invoke(cli, ['filter', '--count', '--tag', 'urgent', '--tag', 'bug'])
+
+        assert result.exit_code == 0
+        assert mock_filter.call_args.kwargs["tags"] == ["urgent", "bug"]
+
 class TestUserFilterCommand:
     
     def setup_method(self):
@@ -683,6 +771,335 @@ class TestUserFilterCommand:
         assert "Page 2/3" in result.output
         assert "user-1" in result.output
 
+class TestShellCommand:
+
+    def setup_method(self):
+        self.runner = CliRunner()
+
+    @patch('src.main._setup_readline', return_value=None)
+    @patch('src.main.search_filter_sort_tasks')
+    def test_shell_runs_commands_until_exit(self, mock_filter, mock_readline):
+        """Test que le shell exécute plusieurs commandes dans le même processus"""
+        mock_filter.return_value = {"page": 1, "page_size": 20, "total_items": 7, "total_pages": 1}
+
+        result = self.runner.invoke(cli, ['shell'], input='filter --count\nfilter --count --status DONE\nexit\nfilter --count\n')
+
+        assert result.exit_code == 0
+        assert mock_filter.call_count == 2
+        assert result.output.count("7") == 2
+
+    @patch('src.main._setup_readline', return_value=None)
+    def test_shell_reports_unknown_command_and_usage_errors(self, mock_readline):
+        """Test que les erreurs d'une ligne ne ferment pas le shell"""
+        result = self.runner.invoke(cli, ['shell'], input='bogus\nfilter --status INVALID\n"oops\nhelp\n')
+
+        assert result.exit_code == 0
+        assert "Commande inconnue : bogus" in result.output
+        assert "Invalid value" in result.output
+        assert "No closing quotation" in result.output
+        assert "Commandes disponibles" in result.output
+
+    @patch('src.main._setup_readline', return_value=None)
+    @patch('src.main.search_filter_sort_tasks', side_effect=[KeyError("page"),
+                                                             {"page": 1, "page_size": 20, "total_items": 7, "total_pages": 1}])
+    def test_shell_survives_unexpected_errors(self, mock_filter, mock_readline):
+        """Test qu'une erreur inattendue d'une commande ne ferme pas le shell"""
+        result = self.runner.invoke(cli, ['shell'], input='filter --count\nfilter --count\n')
+
+        assert result.exit_code == 0
+        assert "Erreur : KeyError: 'page'" in result.output
+        assert mock_filter.call_count == 2
+        assert "7" in result.output
+
+    @patch('src.main.get_all_tags', return_value={"urgent": 2, "bug": 1})
+    @patch('src.main.get_users', return_value=[{"id": "user-1"}, {"id": "user-2"}])
+    @patch('src.main.get_tasks', return_value=[{"id": "task-1"}, {"id": "task-2"}])
+    def test_shell_completion(self, mock_tasks, mock_users, mock_tags):
+        """Test la complétion des commandes, IDs de tâches/utilisateurs et tags"""
+        assert shell_complete("us", "us") == ["user-filter", "user-tasks", "users"]
+        assert shell_complete("consult task-", "task-") == ["task-1", "task-2"]
+        assert shell_complete("assign task-1 ", "") == ["user-1", "user-2", "unassigned"]
+        assert shell_complete("filter --user user-2", "user-2") == ["user-2"]
+        assert shell_complete("filter --st", "--st") == ["--status"]
+        assert shell_complete("update task-1 --add-tag u", "u") == ["urgent"]
+        assert shell_complete("filter --tag ", "") == ["bug", "urgent"]
+        assert shell_complete("update task-1 --re", "--re") == ["--remove-tag"]
+        assert shell_complete("unknown ", "") == []
+
+    def test_completed_tag_options_exist(self):
+        """Chaque option complétée par SHELL_OPTION_KINDS existe sur au moins une commande"""
+        from src.main import SHELL_OPTION_KINDS
+        options = {opt for command in cli.commands.values() for param in command.params for opt in param.opts}
+        assert set(SHELL_OPTION_KINDS) <= options
+
+class TestBatchCommand:
+
+    @pytest.fixture(autouse=True)
+    def isolated_store(self, tmp_path, monkeypatch):
+        """Travaille sur des fichiers temporaires et restaure les listes en mémoire"""
+        import src.task_manager as tm
+        monkeypatch.setattr(tm, "DATA_FILE", str(tmp_path / "tasks.json"))
+        monkeypatch.setattr(tm, "USER_FILE", str(tmp_path / "users.json"))
+        saved_tasks, saved_users = [*task_list], [*user_list]
+        task_list.clear()
+        user_list.clear()
+        user_list.append({"id": "user-1", "name": "Alice Martin", "email": "alice@example.com"})
+        yield tmp_path
+        task_list[:] = saved_tasks
+        user_list[:] = saved_users
+
+    def setup_method(self):
+        self.runner = CliRunner(mix_stderr=False)
+
+    def test_batch_runs_lines_and_saves_once(self):
+        """Test que batch exécute chaque ligne et n'écrit qu'une fois par fichier"""
+        script = (
+            "# commentaire\n"
+            "create \"Tâche A\" \"Desc\" --priority HIGH\n"
+            '{"op": "create", "title": "Tâche B"}\n'
+            "create-user Bob bob@example.com\n"
+        )
+        with patch('src.task_manager._write_store') as mock_write:
+            result = self.runner.invoke(cli, ['batch'], input=script)
+
+        assert result.exit_code == 0
+        lines = result.stdout.splitlines()
+        assert [line.split("\t")[:2] for line in lines] == [["2", "ok"], ["3", "ok"], ["4", "ok"]]
+        assert [t["title"] for t in task_list] == ["Tâche A", "Tâche B"]
+        assert task_list[0]["priority"] == "HIGH"
+        assert mock_write.call_count == 2
+        assert "3 opération(s) réussie(s), 0 erreur(s)" in result.stderr
+
+    def test_batch_reports_errors_per_line(self):
+        """Test que les erreurs sont rapportées ligne par ligne avec un code de sortie 1"""
+        script = "create \"OK\"\nassign 42 user-1\nfrobnicate\nupdate 1 --bogus x\ncreate \"Encore\"\n"
+        result = self.runner.invoke(cli, ['batch'], input=script)
+
+        assert result.exit_code == 1
+        lines = result.stdout.splitlines()
+        assert lines[1] == "2\terror\tTask not found"
+        assert lines[2] == "3\terror\tUnknown operation: frobnicate"
+        assert lines[3] == "4\terror\tUnknown argument: bogus"
+        assert lines[4].startswith("5\tok")
+        assert len(task_list) == 2
+
+    def test_batch_stop_on_error(self):
+        result = self.runner.invoke(cli, ['batch', '--stop-on-error'], input="delete 1\ncreate \"Jamais\"\n")
+
+        assert result.exit_code == 1
+        assert len(task_list) == 0
+
+    def test_batch_checkpoint_flushes_periodically(self):
+        script = "".join(f'create "Tâche {i}"\n' for i in range(5))
+        with patch('src.task_manager._write_store') as mock_write:
+            result = self.runner.invoke(cli, ['batch', '--checkpoint', '2'], input=script)
+
+        assert result.exit_code == 0
+        # deux points de contrôle + la sauvegarde finale
+        assert mock_write.call_count == 3
+
+    def test_batch_reads_script_file(self, isolated_store):
+        script = isolated_store / "ops.txt"
+        script.write_text('create "Depuis un fichier"\n', encoding="utf-8")
+
+        result = self.runner.invoke(cli, ['batch', str(script)])
+
+        assert result.exit_code == 0
+        assert task_list[0]["title"] == "Depuis un fichier"
+
+    def test_parse_batch_line_repeated_options(self):
+        function, kwargs = parse_batch_line("update t-1 --add-tag a --add-tag b --status DONE")
+        assert function is update_task
+        assert kwargs == {"task_id": "t-1", "add_tags": ["a", "b"], "status": "DONE"}
+
+    def test_parse_batch_line_list_options(self):
+        assert parse_batch_line("update t-1 --add-tags urgent")[1]["add_tags"] == ["urgent"]
+        assert parse_batch_line('{"op": "update", "task_id": "t-1", "add_tags": "urgent"}')[1]["add_tags"] == ["urgent"]
+        assert parse_batch_line('{"op": "update", "task_id": "t-1", "remove_tags": ["a", "b"]}')[1]["remove_tags"] == ["a", "b"]
+        with pytest.raises(ValueError, match="list of strings expected"):
+            parse_batch_line('{"op": "update", "task_id": "t-1", "add_tags": [1]}')
+        with pytest.raises(ValueError, match="Invalid value for title: string expected"):
+            parse_batch_line('{"op": "create", "title": 5}')
+
+    def test_batch_unexpected_error_stays_on_its_line(self):
+        script = 'create "Avant"\ncreate "Panne"\ncreate "Après"\n'
+        real_add = BATCH_OPERATIONS["create"]
+        def add(title, description="", **kwargs):
+            if title == "Panne":
+                raise AttributeError("boom")
+            return real_add[0](title, description, **kwargs)
+        with patch.dict(BATCH_OPERATIONS, {"create": (add, *real_add[1:])}):
+            result = self.runner.invoke(cli, ['batch'], input=script)
+
+        assert result.exit_code == 1
+        assert result.stdout.splitlines()[1] == "2\terror\tAttributeError: boom"
+        assert [t["title"] for t in task_list] == ["Avant", "Après"]
+
+    def test_parse_batch_line_missing_argument(self):
+        with pytest.raises(ValueError, match="Missing argument: title"):
+            parse_batch_line('{"op": "create"}')
+
+class TestProfilingOptions:
+
+    def setup_method(self):
+        self.runner = CliRunner(mix_stderr=False)
+
+    @patch('src.main.search_filter_sort_tasks')
+    def test_timings_option_reports_spans(self, mock_filter):
+        """Test --timings affiche les durées sur stderr sans polluer stdout"""
+        mock_filter.return_value = {"page": 1, "page_size": 20, "total_items": 3, "total_pages": 1}
+
+        result = self.runner.invoke(cli, ['--timings', 'filter', '--count'])
+
+        assert result.exit_code == 0
+        assert result.stdout.strip() == "3"
+        assert result.stderr.startswith("Temps : load")
+
+    @patch('src.main.get_tasks')
+    def test_timings_option_includes_render(self, mock_get_tasks):
+        mock_get_tasks.return_value = [{"id": "task-1", "title": "T", "description": "", "status": "TODO"}]
+
+        result = self.runner.invoke(cli, ['--timings', 'list'])
+
+        assert result.exit_code == 0
+        assert "render" in result.stderr
+
+    @patch('src.main.get_tasks', return_value=[])
+    def test_profile_output_writes_pstats_file(self, mock_get_tasks, tmp_path):
+        """Test --profile-output enregistre un fichier lisible par pstats"""
+        import pstats
+        output = tmp_path / "profile.out"
+
+        result = self.runner.invoke(cli, ['--profile-output', str(output), 'list'])
+
+        assert result.exit_code == 0
+        assert output.exists()
+        assert pstats.Stats(str(output)).total_calls > 0
+
+    @patch('src.main.get_tasks', return_value=[])
+    def test_profile_prints_stats(self, mock_get_tasks):
+        result = self.runner.invoke(cli, ['--profile', 'list'])
+
+        assert result.exit_code == 0
+        assert "Ordered by: cumulative time" in result.stderr
+
+class TestExportCommand:
+
+    def setup_method(self):
+        self.runner = CliRunner()
+
+    @patch('src.main.export_store', return_value=3)
+    def test_export_defaults_to_json(self, mock_export):
+        result = self.runner.invoke(cli, ['export', 'out.json'])
+
+        assert result.exit_code == 0
+        mock_export.assert_called_once_with('out.json', 'json', users=False)
+        assert "3 élément(s) exporté(s)" in result.output
+
+    @patch('src.main.export_store', return_value=2)
+    def test_export_users_as_snapshot(self, mock_export):
+        result = self.runner.invoke(cli, ['export', 'users.snap', '--format', 'snapshot', '--users'])
+
+        assert result.exit_code == 0
+        mock_export.assert_called_once_with('users.snap', 'snapshot', users=True)
+
+    @patch('src.main.export_store', side_effect=OSError("disque plein"))
+    def test_export_error(self, mock_export):
+        result = self.runner.invoke(cli, ['export', 'out.json'])
+
+        assert "Erreur lors de l'export : disque plein" in result.output
+
+class TestImportCommand:
+
+    def setup_method(self):
+        self.runner = CliRunner()
+
+    @patch('src.main.import_tasks', return_value={"imported": 2, "errors": [(3, "Title is required")]})
+    def test_import_prints_summary_and_errors(self, mock_import, tmp_path):
+        source = tmp_path / "tasks.ndjson"
+        source.write_text("{}\n", encoding="utf-8")
+        result = self.runner.invoke(cli, ['import', str(source), '--workers', '2'])
+
+        assert result.exit_code == 0
+        mock_import.assert_called_once_with(str(source), workers=2)
+        assert "2 tâche(s) importée(s), 1 ligne(s) rejetée(s)" in result.output
+        assert "Title is required" in result.output
+
+    @patch('src.main.import_tasks', return_value={"imported": 0, "errors": [(1, "Invalid JSON: x"), (4, "User not found")]})
+    def test_import_writes_error_report(self, mock_import, tmp_path):
+        import json
+        source = tmp_path / "tasks.ndjson"
+        source.write_text("{}\n", encoding="utf-8")
+        report = tmp_path / "errors.ndjson"
+        result = self.runner.invoke(cli, ['import', str(source), '--report', str(report)])
+
+        assert result.exit_code == 0
+        lines = [json.loads(line) for line in report.read_text(encoding="utf-8").splitlines()]
+        assert lines == [{"line": 1, "error": "Invalid JSON: x"}, {"line": 4, "error": "User not found"}]
+
+class TestWatchCommand:
+
+    CHANGES = [
+        {"seq": 4, "timestamp": "2024-05-01T10:00:00+00:00", "type": "updated", "task_id": "abc",
+         "events": [{"event": "status_updated"}], "task": {"id": "abc", "title": "Rapport"}},
+        {"seq": 5, "timestamp": "2024-05-01T10:01:00+00:00", "type": "deleted", "task_id": "abc", "events": []},
+    ]
+
+    def setup_method(self):
+        self.runner = CliRunner()
+
+    @patch('src.main.watch_changes', return_value=iter(CHANGES))
+    def test_watch_prints_changes(self, mock_watch):
+        result = self.runner.invoke(cli, ['watch', '--since', '3', '--once'])
+
+        assert result.exit_code == 0
+        mock_watch.assert_called_once_with(3, interval=1.0, once=True)
+        assert "#4" in result.output and "Rapport (status_updated)" in result.output
+        assert "#5" in result.output and "deleted" in result.output
+
+    @patch('src.main.watch_changes', return_value=iter(CHANGES))
+    def test_watch_json_output(self, mock_watch):
+        import json
+        result = self.runner.invoke(cli, ['watch', '--json'])
+
+        assert [json.loads(line)["seq"] for line in result.output.splitlines()] == [4, 5]
+
+class TestMetricsCommand:
+
+    def setup_method(self):
+        self.runner = CliRunner(mix_stderr=False)
+
+    def teardown_method(self):
+        from src import metrics
+        metrics.disable()
+        metrics.reset()
+
+    @patch('src.main.search_filter_sort_tasks')
+    def test_metrics_file_written_at_close(self, mock_filter, tmp_path):
+        """Test --metrics-file écrit l'exposition Prometheus en fin de commande"""
+        mock_filter.return_value = {"page": 1, "page_size": 20, "total_items": 0, "total_pages": 0}
+        output = tmp_path / "task_manager.prom"
+
+        result = self.runner.invoke(cli, ['--metrics-file', str(output), 'filter', '--count'])
+
+        assert result.exit_code == 0
+        content = output.read_text(encoding="utf-8")
+        assert "# TYPE task_manager_store_items gauge" in content
+        assert not (tmp_path / "task_manager.prom.tmp").exists()
+
+    def test_metrics_command_prints_exposition(self):
+        result = self.runner.invoke(cli, ['--metrics', 'metrics'])
+
+        assert result.exit_code == 0
+        assert "# TYPE task_manager_index_hit_ratio gauge" in result.stdout
+        assert result.stderr == ""
+
+    def test_metrics_command_warns_when_disabled(self):
+        result = self.runner.invoke(cli, ['metrics'])
+
+        assert result.exit_code == 0
+        assert "Collecte désactivée" in result.stderr
+
 class TestMainCoverage:
     """Tests pour améliorer la couverture sur les lignes manquantes"""
     
@@ -728,4 +1145,76 @@ class TestMainCoverage:
         # On peut les tester indirectement en important le module
         import src.main
         assert hasattr(src.main, 'cli')
-        assert hasattr(src.main, 'console')
\ No newline at end of file
+        assert hasattr(src.main, 'console')
+
+
+class TestExportChangesCommand:
+
+    def setup_method(self):
+        self.runner = CliRunner()
+
+    @patch('src.main.export_changes', return_value={"exported": 3, "deleted": 1, "last_seq": 42})
+    def test_state_file_resumes_from_last_sequence(self, mock_export, tmp_path):
+        import json
+        state = tmp_path / "sync.state"
+        output = str(tmp_path / "delta.ndjson")
+        result = self.runner.invoke(cli, ['export-changes', output, '--state', str(state)])
+
+        assert result.exit_code == 0
+        assert "3 tâche(s) modifiée(s), 1 supprimée(s)" in result.output
+        assert json.loads(state.read_text()) == {"last_seq": 42}
+        mock_export.assert_called_with(output, since=0, since_time=None)
+
+        self.runner.invoke(cli, ['export-changes', output, '--state', str(state)])
+        mock_export.assert_called_with(output, since=42, since_time=None)
+
+    @patch('src.main.export_changes', side_effect=ValueError("Invalid date format"))
+    def test_invalid_date_is_reported(self, mock_export, tmp_path):
+        result = self.runner.invoke(cli, ['export-changes', str(tmp_path / "d.ndjson"), '--since-time', 'hier'])
+        assert "Erreur lors de l'export : Invalid date format" in result.output
+
+
+class TestCompactHistoryCommand:
+
+    def setup_method(self):
+        self.runner = CliRunner()
+
+    @patch('src.main.compact_history', return_value=12)
+    def test_reports_folded_events(self, mock_compact):
+        result = self.runner.invoke(cli, ['compact-history', '--keep', '50'])
+        assert result.exit_code == 0
+        assert "12 événement(s) d'historique regroupé(s)" in result.output
+        mock_compact.assert_called_once_with(None, keep_recent=50)
+
+    @patch('src.main.compact_history', side_effect=ValueError("Task not found"))
+    def test_unknown_task(self, mock_compact):
+        result = self.runner.invoke(cli, ['compact-history', '--task', 'inconnue'])
+        assert "Erreur : Task not found" in result.output
+
+
+class TestUndoRestoreCommands:
+
+    def setup_method(self):
+        self.runner = CliRunner()
+
+    @patch('src.main.undo_changes', return_value={"updated": ["a", "b"], "created": [], "deleted": ["c"], "to_seq": 7})
+    def test_undo(self, mock_undo):
+        result = self.runner.invoke(cli, ['undo', '3'])
+        assert result.exit_code == 0
+        # Ligne repliée par rich à 80 colonnes
+        assert "Annulé jusqu'à la séquence 7 : 2 tâche(s) rétablie(s), 0 recréée(s), 1 supprimée(s)" in \
+            " ".join(result.output.split())
+        mock_undo.assert_called_once_with(3)
+
+    @patch('src.main.undo_changes', side_effect=ValueError("Nothing to undo"))
+    def test_nothing_to_undo(self, mock_undo):
+        result = self.runner.invoke(cli, ['undo'])
+        assert "Erreur : Nothing to undo" in result.output
+        mock_undo.assert_called_once_with(1)
+
+    @patch('src.main.restore_at', return_value={"updated": ["a"], "created": ["b"], "deleted": []})
+    def test_restore(self, mock_restore):
+        result = self.runner.invoke(cli, ['restore', '--at', '2024-05-01T12:00:00'])
+        assert "1 tâche(s) rétablie(s), 1 recréée(s), 0 supprimée(s)" in " ".join(result.output.split())
+        mock_restore.assert_called_once_with('2024-05-01T12:00:00')
+        assert self.runner.invoke(cli, ['restore']).exit_code != 0
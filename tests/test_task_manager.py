@@ -2,8 +2,11 @@
 import sys
 import os
 import re
+import json
+import asyncio
+import threading
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import pytest
 from unittest.mock import patch
 
@@ -11,6 +14,7 @@ from unittest.mock import patch
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.task_manager import *
+from src.task_manager import _save_tasks as _REAL_SAVE_TASKS, _save_users as _REAL_SAVE_USERS
 
 @pytest.fixture(autouse=True)
 def mock_save_tasks():
@@ -22,6 +26,22 @@ def mock_save_users():
     with patch('src.task_manager._save_users') as mock_save:
         yield mock_save
 
+@pytest.fixture
+def real_saves(tmp_path, monkeypatch):
+    """Sauvegardes réelles dans un dossier temporaire (les fixtures globales les remplacent par des mocks)"""
+    from src import task_manager
+    monkeypatch.setattr(task_manager, "DATA_FILE", str(tmp_path / "tasks.json"))
+    monkeypatch.setattr(task_manager, "USER_FILE", str(tmp_path / "users.json"))
+    monkeypatch.setattr(task_manager, "_save_tasks", _REAL_SAVE_TASKS)
+    monkeypatch.setattr(task_manager, "_save_users", _REAL_SAVE_USERS)
+    # Entrées laissées par des tests aux sauvegardes simulées
+    task_manager._feed["events"].clear()
+    task_manager._feed["pending"].clear()
+    saved = [*task_list]
+    task_list.clear()
+    yield task_manager
+    task_list[:] = saved
+
 def test_update_task_invalid_id_raises():
         random_id = str(uuid.uuid4())
         with pytest.raises(ValueError, match="Task not found"):
@@ -544,6 +564,54 @@ class TestCreateUser:
             create_user(long_name, "david@example.com")
 
 
+class TestCreateUsersBatch:
+
+    def setup_method(self):
+        user_list.clear()
+
+    def test_create_users_creates_all_with_single_save(self, mock_save_users):
+        created = create_users([
+            {"name": "Alice", "email": "alice@example.com"},
+            {"name": "Bob", "email": "BOB@example.com "},
+        ])
+        assert [u["email"] for u in created] == ["alice@example.com", "bob@example.com"]
+        assert len(user_list) == 2
+        mock_save_users.assert_called_once()
+
+    def test_create_users_rejects_whole_batch(self):
+        create_user("Alice", "alice@example.com")
+        with pytest.raises(BatchValidationError) as exc_info:
+            create_users([
+                {"name": "Bob", "email": "bob@example.com"},
+                {"name": "Alice bis", "email": "alice@example.com"},
+                {"name": "Bob bis", "email": "bob@example.com"},
+                {"name": "", "email": "empty@example.com"},
+            ])
+        assert exc_info.value.errors == [
+            (1, "Email already in use"),
+            (2, "Email already in use"),
+            (3, "Name is required"),
+        ]
+        assert len(user_list) == 1
+
+    def test_email_index_sees_direct_list_changes(self):
+        create_user("Alice", "alice@example.com")
+        user_list.clear()
+        user_list.append({"id": "user-9", "name": "Zed", "email": "zed@example.com"})
+        create_user("Alice", "alice@example.com")
+        with pytest.raises(ValueError, match="Email already in use"):
+            create_user("Zed bis", "zed@example.com")
+
+    def test_id_index_updated_without_rebuild(self):
+        import src.task_manager as task_manager
+        get_user_by_id("user-1")
+        rebuilds = task_manager._user_id_index.rebuilds
+        user = create_user("Alice", "alice@example.com")
+        created = create_users([{"name": "Bob", "email": "bob@example.com"}])
+        assert get_user_by_id(user["id"]) is user
+        assert get_user_by_id(created[0]["id"]) is created[0]
+        assert task_manager._user_id_index.rebuilds == rebuilds
+
 class TestListUsers:
 
     def setup_method(self):
@@ -572,11 +640,55 @@ class TestListUsers:
         assert page1["total_items"] == 30
         assert page1["total_pages"] == 3
 
+    def test_list_users_rejects_invalid_pagination(self):
+        with pytest.raises(ValueError, match="Invalid page number"):
+            list_users(page=-1)
+        with pytest.raises(ValueError, match="Invalid page size"):
+            list_users(size=0)
+
     def test_list_users_returns_empty_list_when_none_exist(self):
         user_list.clear()
         result = list_users()
         assert result["users"] == []
 
+class TestUserSortIndex:
+
+    def setup_method(self):
+        user_list.clear()
+        create_users([
+            {"name": "bob", "email": "bob@example.com"},
+            {"name": "Alice", "email": "alice@example.com"},
+            {"name": "Albert", "email": "albert@example.com"},
+            {"name": "Zoe", "email": "zoe@example.com"},
+        ])
+        create_user("Alain", "alain@example.com")
+
+    def test_list_users_sorted_case_insensitively(self):
+        names = [u["name"] for u in list_users()["users"]]
+        assert names == ["Alain", "Albert", "Alice", "bob", "Zoe"]
+
+    def test_cursor_paging_walks_all_users(self):
+        names = []
+        result = list_users(size=2)
+        names += [u["name"] for u in result["users"]]
+        while result["next_cursor"]:
+            result = list_users(size=2, cursor=result["next_cursor"])
+            names += [u["name"] for u in result["users"]]
+        assert names == ["Alain", "Albert", "Alice", "bob", "Zoe"]
+
+    def test_invalid_cursor_raises(self):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            list_users(cursor="not-a-cursor")
+
+    def test_search_users_by_prefix(self):
+        assert [u["name"] for u in search_users("al")] == ["Alain", "Albert", "Alice"]
+        assert [u["name"] for u in search_users("AL", limit=2)] == ["Alain", "Albert"]
+        assert search_users("x") == []
+
+    def test_index_rebuilt_after_direct_list_change(self):
+        user_list.append({"id": "user-9", "name": "Aaron", "email": "aaron@example.com"})
+        assert list_users()["users"][0]["name"] == "Aaron"
+
 class TestUserManager:
     
     def setup_method(self):
@@ -1233,3 +1345,1540 @@ class TestTaskHistory:
         assert task["history"][0]["event"] == "test_event"
         assert task["history"][0]["details"] == {"foo": "bar"}
 
+    def _dated_history(self, events):
+        # (horodatage, type, détails) dans l'ordre chronologique
+        self.task["history"] = [{"timestamp": ts, "event": event, "details": details}
+                                for ts, event, details in events]
+
+    def test_history_is_newest_first_in_append_order(self):
+        self._dated_history([(f"2024-05-{day:02d}T10:00:00", "status_updated", {"old": "TODO", "new": str(day)})
+                             for day in range(1, 8)])
+        pages = [get_task_history(self.task["id"], page=page, size=3)["history"] for page in (1, 2, 3, 4)]
+        assert [[e["details"]["new"] for e in page] for page in pages] == [["7", "6", "5"], ["4", "3", "2"], ["1"], []]
+        assert get_task_history(self.task["id"], page=0, size=3)["history"] == []
+
+    def test_history_time_range(self):
+        self._dated_history([(f"2024-05-{day:02d}T10:00:00", "status_updated", {"old": "TODO", "new": str(day)})
+                             for day in range(1, 8)])
+        result = get_task_history(self.task["id"], since="2024-05-03", until="2024-05-06T10:00:00", size=2)
+        assert result["total_items"] == 3 and result["total_pages"] == 2
+        assert [e["details"]["new"] for e in result["history"]] == ["5", "4"]
+        result = get_task_history(self.task["id"], since="2024-05-03", until="2024-05-06T10:00:00", page=2, size=2)
+        assert [e["details"]["new"] for e in result["history"]] == ["3"]
+        assert get_task_history(self.task["id"], since="2024-05-06T10:00:00")["total_items"] == 2
+        assert get_task_history(self.task["id"], since="2024-06-01", until="2024-05-01")["total_items"] == 0
+        with pytest.raises(ValueError, match="Invalid date format"):
+            get_task_history(self.task["id"], since="hier")
+
+    def test_compact_history_folds_old_field_edits_by_day(self):
+        self._dated_history(
+            [("2024-05-01T09:00:00", "creation", {"title": "Titre initial"})]
+            + [(f"2024-05-01T1{i}:00:00", "description_updated", {"old": f"v{i}", "new": f"v{i + 1}"}) for i in range(4)]
+            + [("2024-05-01T15:00:00", "tag_added", {"tag": "a"}),
+               ("2024-05-02T10:00:00", "description_updated", {"old": "v4", "new": "v5"}),
+               ("2024-05-02T11:00:00", "description_updated", {"old": "v5", "new": "v6"})])
+
+        assert compact_history(self.task["id"], keep_recent=1) == 3
+        history = self.task["history"]
+        assert [e["event"] for e in history] == ["creation", "description_updated", "tag_added",
+                                                 "description_updated", "description_updated"]
+        assert history[1] == {"timestamp": "2024-05-01T13:00:00", "event": "description_updated",
+                              "details": {"old": "v0", "new": "v4", "folded": 4, "first_timestamp": "2024-05-01T10:00:00"}}
+        assert self.task["version"] == 2
+        # Déjà compacté : un nouveau passage ne change rien
+        assert compact_history(self.task["id"], keep_recent=1) == 0
+
+    def test_long_history_is_compacted_automatically(self, monkeypatch):
+        import src.task_manager as task_manager
+        monkeypatch.setattr(task_manager, "HISTORY_LIMIT", 20)
+        monkeypatch.setattr(task_manager, "HISTORY_KEEP_RECENT", 5)
+        for i in range(40):
+            update_task(self.task["id"], description=f"Desc {i}")
+        history = self.task["history"]
+        assert len(history) < 20
+        assert history[-1]["details"]["new"] == "Desc 39"
+        folded = [e for e in history if "folded" in e["details"]]
+        assert folded[0]["details"]["old"] == "Desc initiale"
+        assert sum(e["details"].get("folded", 1) for e in history if e["event"] == "description_updated") == 40
+
+    def test_history_folds_by_month_when_days_differ(self, monkeypatch):
+        import src.task_manager as task_manager
+        monkeypatch.setattr(task_manager, "HISTORY_LIMIT", 20)
+        monkeypatch.setattr(task_manager, "HISTORY_KEEP_RECENT", 5)
+        self._dated_history([("2024-04-30T10:00:00", "creation", {})] +
+                            [(f"2024-05-{day:02d}T10:00:00", "status_updated", {"old": f"s{day - 1}", "new": f"s{day}"})
+                             for day in range(1, 21)])
+        add_history_event(self.task, "status_updated", {"old": "s20", "new": "s21"})
+        history = self.task["history"]
+        assert len(history) == 7
+        assert history[1]["details"] == {"old": "s0", "new": "s16", "folded": 16,
+                                         "first_timestamp": "2024-05-01T10:00:00"}
+        assert all(e["event"] != "history_truncated" for e in history)
+
+    def test_history_never_exceeds_limit(self, monkeypatch):
+        import src.task_manager as task_manager
+        monkeypatch.setattr(task_manager, "HISTORY_LIMIT", 20)
+        monkeypatch.setattr(task_manager, "HISTORY_KEEP_RECENT", 5)
+        for i in range(60):
+            update_task(self.task["id"], add_tags=[f"tag{i}"])
+            assert len(self.task["history"]) <= 20
+        history = self.task["history"]
+        assert history[0]["event"] == "creation"
+        markers = [e for e in history if e["event"] == "history_truncated"]
+        assert len(markers) == 1 and history[1] is markers[0]
+        kept = sum(1 for e in history if e["event"] == "tag_added")
+        assert kept + markers[0]["details"]["dropped"] == 60
+        assert history[-1]["details"] == {"tag": "tag59"}
+
+class TestSearchProjections:
+    def setup_method(self):
+        task_list.clear()
+        now = datetime.now()
+        for i in range(15):
+            task_list.append({
+                "id": str(uuid.uuid4()),
+                "title": f"Tâche {i:02d}",
+                "description": "",
+                "status": "TODO" if i % 3 else "DONE",
+                "created_at": (now - timedelta(minutes=i)).isoformat()
+            })
+
+    def test_count_projection_returns_totals_only(self):
+        result = search_filter_sort_tasks(status="TODO", size=4, projection="count")
+        assert result["total_items"] == 10
+        assert result["total_pages"] == 3
+        assert "tasks" not in result
+        assert "ids" not in result
+
+    def test_ids_projection_returns_ordered_ids(self):
+        result = search_filter_sort_tasks(sort_by="title", page=2, size=5, projection="ids")
+        full = search_filter_sort_tasks(sort_by="title", page=2, size=5)
+        assert result["ids"] == [t["id"] for t in full["tasks"]]
+        assert result["total_items"] == 15
+
+    def test_ids_projection_does_not_mutate_tasks(self):
+        search_filter_sort_tasks(projection="ids")
+        assert all("overdue" not in t for t in task_list)
+
+    def test_fields_projection_returns_subset(self):
+        result = search_filter_sort_tasks(sort_by="title", size=3, fields=["id", "title", "overdue"])
+        assert [set(t) for t in result["tasks"]] == [{"id", "title", "overdue"}] * 3
+        assert [t["title"] for t in result["tasks"]] == ["Tâche 00", "Tâche 01", "Tâche 02"]
+        assert all("overdue" not in t for t in task_list)
+
+    def test_partial_sort_matches_full_sort(self):
+        desc = search_filter_sort_tasks(sort_by="status", ascending=False, size=4, projection="ids")
+        expected = sorted(task_list, key=lambda t: {"TODO": 0, "DONE": 2}[t["status"]], reverse=True)
+        assert desc["ids"] == [t["id"] for t in expected[:4]]
+
+    def test_invalid_projection_raises(self):
+        with pytest.raises(ValueError, match="Invalid projection"):
+            search_filter_sort_tasks(projection="invalid")
+
+class TestMetrics:
+
+    def setup_method(self):
+        from src import metrics, task_manager
+        self.metrics = metrics
+        self.task_manager = task_manager
+        metrics.reset()
+        metrics.enable()
+        task_list.clear()
+
+    def teardown_method(self):
+        self.metrics.disable()
+        self.metrics.reset()
+
+    def test_operations_are_counted_by_outcome(self):
+        task = add_task("Titre", "Description")
+        consult_task(task["id"])
+        with pytest.raises(ValueError):
+            consult_task(str(uuid.uuid4()))
+
+        text = self.metrics.render_prometheus()
+        assert 'task_manager_operations_total{operation="add_task",outcome="ok"} 1' in text
+        assert 'task_manager_operations_total{operation="consult_task",outcome="error"} 1' in text
+        assert 'task_manager_operation_duration_seconds_count{operation="consult_task"} 2' in text
+
+    def test_internal_lookups_are_not_counted_as_consult(self):
+        task = add_task("Titre", "Description")
+        update_task(task["id"], title="Autre")
+        text = self.metrics.render_prometheus()
+        assert 'operation="update_task",outcome="ok"' in text
+        assert 'operation="consult_task"' not in text
+
+    def test_disabled_collection_records_nothing(self):
+        self.metrics.disable()
+        add_task("Titre", "Description")
+        assert "task_manager_operations_total" not in self.metrics.render_prometheus()
+
+    def test_gauges_report_store_and_index_state(self):
+        add_task("Titre", "Description")
+        build_indexes()
+        get_user_by_id("inconnu")
+        text = self.metrics.render_prometheus()
+        assert 'task_manager_store_items{store="tasks"} 1' in text
+        users = len(self.task_manager.user_list)
+        assert f'task_manager_store_items{{store="users"}} {users}' in text
+        assert f'task_manager_index_entries{{index="user_name_sorted"}} {users}' in text
+        ratio = re.search(r'task_manager_index_hit_ratio\{index="user_id"\} ([\d.]+)', text)
+        assert ratio and 0 < float(ratio.group(1)) <= 1
+
+    def test_file_io_is_measured(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("src.task_manager.DATA_FILE", str(tmp_path / "tasks.json"))
+        task_manager = self.task_manager
+        task_manager._write_store(task_manager.DATA_FILE, [{"id": "1"}])
+        task_manager._load_tasks()
+        text = self.metrics.render_prometheus()
+        size = os.path.getsize(tmp_path / "tasks.json")
+        assert f'task_manager_file_io_bytes_total{{file="tasks.json",operation="save"}} {size}' in text
+        assert f'task_manager_file_io_bytes_total{{file="tasks.json",operation="load"}} {size}' in text
+
+class TestSnapshotFormat:
+
+    def setup_method(self):
+        from src import snapshot
+        self.snapshot = snapshot
+        self.tasks = [
+            {
+                "id": str(uuid.uuid4()),
+                "title": "Réparer le vélo",
+                "description": "",
+                "status": "TODO",
+                "created_at": "2024-03-01T08:15:00.123456",
+                "due_date": "2024-03-10T00:00:00",
+                "priority": "HIGH",
+                "tags": ["maison", "urgent"],
+                "assigned_user": None,
+                "history": [{"event": "creation", "timestamp": "2024-03-01T08:15:00.123456",
+                             "details": {"title": "Réparer le vélo", "due_date": None}}],
+            },
+            {"id": 2, "title": "Ancienne tâche", "description": "x", "status": "DONE",
+             "created_at": "2024-03-01T08:15:00+00:00", "tags": [], "ratio": 0.5, "overdue": False,
+             "mixed": ["a", 1, None, {"k": "2024-13-01T00:00:00"}]},
+            {"id": "3", "title": "2024-03-01T08:15:00.100000", "created_at": "2024-03-01T08:15:00.1"},
+        ]
+
+    def test_round_trip_is_lossless(self):
+        loaded = self.snapshot.loads(self.snapshot.dumps(self.tasks))
+        assert loaded == self.tasks
+        assert [list(t) for t in loaded] == [list(t) for t in self.tasks]
+        assert type(loaded[1]["id"]) is int
+
+    def test_repeated_strings_are_shared(self):
+        loaded = self.snapshot.loads(self.snapshot.dumps(self.tasks * 2))
+        assert loaded[0]["status"] is loaded[3]["status"]
+
+    def test_checksum_mismatch_raises(self):
+        data = bytearray(self.snapshot.dumps(self.tasks))
+        data[-1] ^= 0xFF
+        with pytest.raises(self.snapshot.SnapshotError, match="checksum"):
+            self.snapshot.loads(bytes(data))
+
+    def test_unknown_version_raises(self):
+        data = bytearray(self.snapshot.dumps(self.tasks))
+        data[6] = 99
+        with pytest.raises(self.snapshot.SnapshotError, match="Unsupported snapshot version"):
+            self.snapshot.loads(bytes(data))
+
+    def test_invalid_header_raises(self):
+        with pytest.raises(self.snapshot.SnapshotError, match="Invalid snapshot header"):
+            self.snapshot.loads(b"[]")
+
+    def test_store_reads_both_formats(self, tmp_path, monkeypatch):
+        from src import task_manager
+        path = str(tmp_path / "tasks.json")
+        monkeypatch.setattr(task_manager, "STORE_FORMAT", "snapshot")
+        task_manager._write_store(path, self.tasks)
+        assert self.snapshot.is_snapshot(path)
+        assert task_manager._read_store(path) == self.tasks
+
+        export_store(path, "json")
+        assert not self.snapshot.is_snapshot(path)
+        assert task_manager._read_store(path) == list(task_list)
+
+    def test_export_invalid_format_raises(self, tmp_path):
+        with pytest.raises(ValueError, match="Invalid store format"):
+            export_store(str(tmp_path / "out"), "xml")
+
+class TestIndexedStore:
+
+    def setup_method(self):
+        from src import record_store, task_manager
+        self.record_store = record_store
+        self.task_manager = task_manager
+        self.tasks = [{"id": str(uuid.uuid4()), "title": f"Tâche {i}", "description": "", "status": "TODO",
+                       "history": [{"event": "creation", "timestamp": "2024-01-01T00:00:00"}]}
+                      for i in range(50)]
+
+    def test_lookup_reads_single_record(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.record_store.write(path, self.tasks)
+        assert self.record_store.is_record_file(path)
+        assert self.record_store.lookup(path, self.tasks[37]["id"]) == self.tasks[37]
+        assert self.record_store.lookup(path, str(uuid.uuid4())) is None
+
+    def test_full_read_keeps_order(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.record_store.write(path, self.tasks)
+        assert self.task_manager._read_store(path) == self.tasks
+
+    def test_stale_index_raises(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.record_store.write(path, self.tasks)
+        stale_index = open(self.record_store.index_path(path), 'rb').read()
+        self.record_store.write(path, self.tasks[:10])
+        with open(self.record_store.index_path(path), 'wb') as f:
+            f.write(stale_index)
+        with pytest.raises(self.record_store.RecordStoreError, match="Stale index"):
+            self.record_store.lookup(path, self.tasks[0]["id"])
+
+    def test_corrupted_record_raises(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.record_store.write(path, self.tasks)
+        data = bytearray(open(path, 'rb').read())
+        data[-2] ^= 0xFF
+        open(path, 'wb').write(bytes(data))
+        with pytest.raises(self.record_store.RecordStoreError, match="checksum"):
+            self.record_store.lookup(path, self.tasks[-1]["id"])
+
+    def test_consult_does_not_load_lazy_store(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "tasks.json")
+        self.record_store.write(path, self.tasks)
+        lazy = self.task_manager._LazyTrackedList(lambda: self.record_store.loads(open(path, 'rb').read()))
+        monkeypatch.setattr(self.task_manager, "DATA_FILE", path)
+        monkeypatch.setattr(self.task_manager, "task_list", lazy)
+
+        task = self.task_manager.consult_task(self.tasks[5]["id"])
+        assert task["title"] == "Tâche 5"
+        assert self.task_manager.get_task_history(self.tasks[5]["id"])["total_items"] == 1
+        assert type(lazy) is self.task_manager._LazyTrackedList
+        with pytest.raises(ValueError, match="Task not found"):
+            self.task_manager.consult_task(str(uuid.uuid4()))
+
+        # Une modification charge tout le stockage
+        self.task_manager.update_task(self.tasks[5]["id"], title="Modifiée")
+        assert type(lazy) is self.task_manager._TrackedList
+        assert len(lazy) == 50
+        assert lazy[5]["title"] == "Modifiée"
+
+    def test_consult_falls_back_to_full_load_without_index(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "tasks.json")
+        self.record_store.write(path, self.tasks)
+        os.remove(self.record_store.index_path(path))
+        lazy = self.task_manager._LazyTrackedList(lambda: self.record_store.loads(open(path, 'rb').read()))
+        monkeypatch.setattr(self.task_manager, "DATA_FILE", path)
+        monkeypatch.setattr(self.task_manager, "task_list", lazy)
+
+        assert self.task_manager.consult_task(self.tasks[1]["id"])["title"] == "Tâche 1"
+        assert type(lazy) is self.task_manager._TrackedList
+
+    def test_lazy_list_behaves_like_a_list(self):
+        lazy = self.task_manager._LazyTrackedList(lambda: [1, 2, 3])
+        assert lazy == [1, 2, 3]
+        lazy.append(4)
+        assert [*lazy] == [1, 2, 3, 4]
+        assert lazy.generation == 1
+
+class TestShardedStore:
+
+    def setup_method(self):
+        from src import shard_store, task_manager
+        self.shard_store = shard_store
+        self.task_manager = task_manager
+        self.tasks = [{"id": str(uuid.uuid4()), "title": f"Tâche {i}", "description": "", "status": "TODO",
+                       "created_at": f"2024-0{1 + i % 3}-15T10:00:00", "assigned_user": ["user-1", "user-2", None][i % 3]}
+                      for i in range(9)]
+
+    def _files(self, path):
+        return sorted(os.listdir(self.shard_store.shard_directory(path)))
+
+    def test_round_trip_groups_by_user(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.shard_store.write(path, self.tasks, "assigned_user")
+        manifest = self.shard_store.read_manifest(path)
+        assert sorted(manifest["shards"]) == ["unassigned", "user-1", "user-2"]
+        assert {shard["count"] for shard in manifest["shards"].values()} == {3}
+        loaded = self.task_manager._read_store(path)
+        assert sorted(t["id"] for t in loaded) == sorted(t["id"] for t in self.tasks)
+
+    def test_only_touched_shard_is_rewritten(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.shard_store.write(path, self.tasks, "assigned_user")
+        before = self._files(path)
+        self.tasks[0]["title"] = "Modifiée"
+        written = self.shard_store.write(path, self.tasks, "assigned_user", changed=[self.tasks[0]])
+        after = self._files(path)
+        assert written == 1
+        assert len(set(before) - set(after)) == 1
+        assert len(set(after) - set(before)) == 1
+
+    def test_reassignment_moves_task_between_shards(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.shard_store.write(path, self.tasks, "assigned_user")
+        self.tasks[0]["assigned_user"] = "user-2"
+        assert self.shard_store.write(path, self.tasks, "assigned_user", changed=[self.tasks[0]]) == 2
+        shards = self.shard_store.read_manifest(path)["shards"]
+        assert shards["user-1"]["count"] == 2
+        assert shards["user-2"]["count"] == 4
+        assert len(self._files(path)) == 3
+        moved = self.shard_store.load(path, ["user-2"])
+        assert self.tasks[0]["id"] in {t["id"] for t in moved}
+
+    def test_emptied_shard_is_dropped(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.shard_store.write(path, self.tasks, "assigned_user")
+        removed = [t for t in self.tasks if t["assigned_user"] is None]
+        remaining = [t for t in self.tasks if t["assigned_user"] is not None]
+        self.shard_store.write(path, remaining, "assigned_user", changed=removed)
+        assert "unassigned" not in self.shard_store.read_manifest(path)["shards"]
+        assert len(self._files(path)) == 2
+
+    def test_select_shards_by_month(self, tmp_path):
+        path = str(tmp_path / "tasks.json")
+        self.shard_store.write(path, self.tasks, "created_month")
+        assert self.shard_store.select_shards(path, created_from="2024-02-01") == ["2024-02", "2024-03"]
+        assert self.shard_store.select_shards(path, user_id="user-1") is None
+
+    def test_filtered_search_opens_only_relevant_shard(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "tasks.json")
+        self.shard_store.write(path, self.tasks, "assigned_user")
+        monkeypatch.setattr(self.task_manager, "DATA_FILE", path)
+        monkeypatch.setattr(self.task_manager, "task_list",
+                            self.task_manager._LazyTrackedList(lambda: self.shard_store.load(path)))
+        opened = []
+        read_shard = self.shard_store._read_shard
+        monkeypatch.setattr(self.shard_store, "_read_shard",
+                            lambda directory, entry: opened.append(entry["file"]) or read_shard(directory, entry))
+
+        result = self.task_manager.search_filter_sort_tasks(user_id="user-1")
+        assert result["total_items"] == 3
+        assert len(opened) == 1
+        assert type(self.task_manager.task_list) is self.task_manager._LazyTrackedList
+
+    def test_month_shards_accept_any_iso_date(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "tasks.json")
+        self.shard_store.write(path, self.tasks, "created_month")
+        monkeypatch.setattr(self.task_manager, "DATA_FILE", path)
+        monkeypatch.setattr(self.task_manager, "task_list",
+                            self.task_manager._LazyTrackedList(lambda: self.shard_store.load(path)))
+        # Forme ISO compacte : acceptée par le filtre, donc aussi par la sélection des shards
+        assert self.task_manager.search_filter_sort_tasks(created_from="20240201")["total_items"] == 6
+        assert self.task_manager.search_filter_sort_tasks(created_to="20240131T235959")["total_items"] == 3
+
+    def test_save_tasks_passes_changed_tasks(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "tasks.json")
+        monkeypatch.setattr(self.task_manager, "STORE_FORMAT", "sharded")
+        monkeypatch.setattr(self.task_manager, "DATA_FILE", path)
+        self.task_manager._write_store(path, self.tasks)
+        self.tasks[1]["assigned_user"] = None
+        self.task_manager._write_store(path, self.tasks, changed=[self.tasks[1]])
+        shards = self.shard_store.read_manifest(path)["shards"]
+        assert shards["unassigned"]["count"] == 4
+
+    def test_invalid_shard_key_raises(self, tmp_path):
+        with pytest.raises(ValueError, match="Invalid shard key"):
+            self.shard_store.write(str(tmp_path / "tasks.json"), self.tasks, "status")
+
+class TestCreatedDateFilter:
+
+    def setup_method(self):
+        task_list.clear()
+        for day in ("2024-01-10", "2024-02-10", "2024-03-10"):
+            task_list.append({"id": str(uuid.uuid4()), "title": day, "description": "", "status": "TODO",
+                              "created_at": f"{day}T09:00:00"})
+        task_list.append({"id": str(uuid.uuid4()), "title": "sans date", "description": "", "status": "TODO"})
+
+    def test_range_is_inclusive(self):
+        result = search_filter_sort_tasks(created_from="2024-02-10", created_to="2024-03-10")
+        assert [t["title"] for t in result["tasks"]] == ["2024-02-10", "2024-03-10"]
+
+    def test_open_ended_range(self):
+        assert search_filter_sort_tasks(created_to="2024-01-31", projection="count")["total_items"] == 1
+
+    def test_invalid_date_raises(self):
+        with pytest.raises(ValueError, match="Invalid date format"):
+            search_filter_sort_tasks(created_from="hier")
+
+class TestAsyncFacade:
+
+    @pytest.fixture(autouse=True)
+    def facade(self, real_saves):
+        from src import async_task_manager
+        self.atm = async_task_manager
+        self.tm = real_saves
+        async_task_manager.reset_stats()
+
+    def _stored(self):
+        with open(self.tm.DATA_FILE, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_concurrent_mutations_are_coalesced(self):
+        async def scenario():
+            created = await asyncio.gather(*(self.atm.add_task(f"Tâche {i}") for i in range(50)))
+            await self.atm.flush()
+            return created
+
+        created = asyncio.run(scenario())
+        assert self.atm.stats() == {"mutations": 50, "saves": 1}
+        assert [t["id"] for t in self._stored()] == [t["id"] for t in created]
+
+    def test_mutations_during_a_save_go_to_the_next_write(self, monkeypatch):
+        import threading
+        release = threading.Event()
+        write_store = self.tm._write_store
+
+        def slow_write(path, data, changed=None, entries=None):
+            release.wait(5)
+            write_store(path, data, changed, entries)
+
+        monkeypatch.setattr(self.tm, "_write_store", slow_write)
+
+        async def scenario():
+            first = await self.atm.add_task("Première")
+            await asyncio.sleep(0.01)  # l'écriture de "Première" est en cours
+            others = [await self.atm.add_task(f"Suivante {i}") for i in range(5)]
+            # Les lectures ne sont pas bloquées par l'écriture et voient tout l'état en mémoire
+            page = await self.atm.search_filter_sort_tasks(size=100)
+            assert page["total_items"] == 6
+            release.set()
+            await self.atm.flush()
+            return [first, *others]
+
+        created = asyncio.run(scenario())
+        assert self.atm.stats()["saves"] == 2
+        assert len(self._stored()) == len(created)
+
+    def test_errors_propagate_without_saving(self):
+        async def scenario():
+            with pytest.raises(ValueError, match="Task not found"):
+                await self.atm.update_task(str(uuid.uuid4()), title="x")
+            await self.atm.flush()
+
+        asyncio.run(scenario())
+        assert self.atm.stats() == {"mutations": 1, "saves": 0}
+        assert not os.path.exists(self.tm.DATA_FILE)
+
+
+class TestTaskStore:
+
+    @pytest.fixture(autouse=True)
+    def store(self, real_saves):
+        from src.task_store import TaskStore
+        self.tm = real_saves
+        self.store = TaskStore()
+
+    def _stored(self):
+        with open(self.tm.DATA_FILE, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_reads_do_not_modify_stored_tasks(self):
+        task = self.store.add_task("Échue", due_date="2000-01-01")
+        assert self.store.consult_task(task["id"])["overdue"] is True
+        assert self.store.search_filter_sort_tasks()["tasks"][0]["overdue"] is True
+        assert "overdue" not in task_list[0]
+        # Les résultats sont des copies : les modifier ne touche pas le stockage
+        self.store.consult_task(task["id"])["title"] = "Autre"
+        assert task_list[0]["title"] == "Échue"
+
+    def test_readers_run_in_parallel_and_writers_are_exclusive(self):
+        import threading
+        from src.task_store import RWLock
+        lock = RWLock()
+        both_inside = threading.Barrier(2, timeout=5)
+
+        def reader():
+            with lock.read():
+                both_inside.wait()
+
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        assert not both_inside.broken
+
+        events = []
+        with lock.write():
+            thread = threading.Thread(target=lambda: lock.acquire_read() or events.append("read"))
+            thread.start()
+            thread.join(0.1)
+            assert events == []
+            events.append("write done")
+        thread.join(5)
+        lock.release_read()
+        assert events == ["write done", "read"]
+
+    def test_batch_saves_once(self, monkeypatch):
+        writes = []
+        write_store = self.tm._write_store
+        monkeypatch.setattr(self.tm, "_write_store", lambda *args: writes.append(args[0]) or write_store(*args))
+        with self.store.batch():
+            task = self.store.add_task("Lot")
+            self.store.update_task(task["id"], status="DONE")
+            assert self.store.consult_task(task["id"])["status"] == "DONE"
+            assert writes == []
+        assert writes == [self.tm.DATA_FILE]
+        assert self.store.saves == 1
+        assert self._stored()[0]["status"] == "DONE"
+
+    def test_writes_during_a_save_are_grouped(self, monkeypatch):
+        import threading
+        import time
+        write_store = self.tm._write_store
+
+        def slow_write(path, data, changed=None, entries=None):
+            time.sleep(0.05)
+            write_store(path, data, changed, entries)
+
+        monkeypatch.setattr(self.tm, "_write_store", slow_write)
+        threads = [threading.Thread(target=self.store.add_task, args=(f"Tâche {i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(self._stored()) == 8
+        assert self.store.saves < 8
+
+    def test_journal_never_gets_ahead_of_the_data_file(self, monkeypatch):
+        import threading
+        import time
+        from src import change_feed
+        self.tm._feed["events"].clear()
+        self.tm._feed["pending"].clear()
+        dump, append = self.tm._dump, change_feed.append
+        ahead = []
+
+        def slow_dump(path, data, *args):
+            time.sleep(0.02)
+            dump(path, data, *args)
+
+        def checked_append(path, entries):
+            # Au moment de l'ajout au journal, le fichier de données contient déjà ces tâches
+            stored = {task["id"] for task in self._stored()}
+            ahead.extend(entry["task_id"] for entry in entries if entry["task_id"] not in stored)
+            return append(path, entries)
+
+        monkeypatch.setattr(self.tm, "_dump", slow_dump)
+        monkeypatch.setattr(change_feed, "append", checked_append)
+        threads = [threading.Thread(target=self.store.add_task, args=(f"Tâche {i}",)) for i in range(8)]
+        for thread in threads:
+            # Départs échelonnés : des ajouts arrivent pendant l'écriture d'un autre thread
+            thread.start()
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+        assert ahead == []
+        assert {change["task_id"] for change in get_changes()["changes"]} == {task["id"] for task in self._stored()}
+
+    def test_stress_mixed_readers_and_writers(self):
+        import random
+        import threading
+        seeds = [self.store.add_task(f"Initiale {i}", description=f"Initiale {i}") for i in range(20)]
+        ids = [task["id"] for task in seeds]
+        errors = []
+        added = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                for step in range(40):
+                    roll = rng.random()
+                    if roll < 0.2:
+                        added.append(self.store.add_task(f"Ajout {seed}-{step}")["id"])
+                    elif roll < 0.45:
+                        # Titre et description changent ensemble : une lecture ne doit jamais voir un mélange
+                        label = f"{seed}-{step}"
+                        self.store.update_task(rng.choice(ids), title=f"T {label}", description=f"D {label}")
+                    elif roll < 0.75:
+                        task = self.store.consult_task(rng.choice(ids))
+                        assert task["title"][1:] == task["description"][1:], task
+                    else:
+                        page = self.store.search_filter_sort_tasks(size=500)
+                        assert page["total_items"] == len(page["tasks"])
+                        assert not any("overdue" in task for task in task_list[:20])
+            except Exception as e:  # remonté au thread principal
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(task_list) == len(ids) + len(added)
+        assert len(set(added)) == len(added)
+        # Le fichier correspond à l'état final en mémoire
+        assert self._stored() == list(task_list)
+
+    def test_snapshot_is_frozen_and_shares_unchanged_tasks(self):
+        first, second = self.store.add_task("Première"), self.store.add_task("Seconde")
+        before = self.store.snapshot()
+        self.store.update_task(first["id"], title="Modifiée")
+        self.store.delete_task(second["id"])
+        third = self.store.add_task("Troisième")
+        after = self.store.snapshot()
+
+        assert after.version == before.version + 3
+        assert [t["title"] for t in before] == ["Première", "Seconde"]
+        assert [t["title"] for t in after] == ["Modifiée", "Troisième"]
+        assert len(before) == 2 and len(after) == 2
+        unchanged = self.store.snapshot()
+        self.store.update_task(first["id"], status="DONE")
+        # Partage structurel : la tâche non modifiée est le même objet d'une version à l'autre
+        assert self.store.snapshot().get_task(third["id"]) is unchanged.get_task(third["id"])
+
+    def test_pinned_snapshot_gives_consistent_pages(self):
+        for i in range(10):
+            self.store.add_task(f"Tâche {i:02d}")
+        snapshot = self.store.snapshot()
+        page_1 = snapshot.search_filter_sort_tasks(sort_by="title", page=1, size=5)
+        for i in range(5):
+            self.store.add_task(f"Avant {i}")  # triées en tête, hors de la version figée
+        page_2 = snapshot.search_filter_sort_tasks(sort_by="title", page=2, size=5)
+        titles = [t["title"] for t in page_1["tasks"] + page_2["tasks"]]
+        assert titles == [f"Tâche {i:02d}" for i in range(10)]
+        assert self.store.search_filter_sort_tasks(size=100)["total_items"] == 15
+
+    def test_snapshot_readers_do_not_wait_for_writers(self):
+        import threading
+        task = self.store.add_task("Visible")
+        inside, release = threading.Event(), threading.Event()
+
+        def long_batch():
+            with self.store.batch():
+                self.store.update_task(task["id"], title="Pas encore publiée")
+                inside.set()
+                release.wait(5)
+
+        writer = threading.Thread(target=long_batch)
+        writer.start()
+        assert inside.wait(5)
+        # Le verrou exclusif est pris : la lecture sert la dernière version publiée
+        assert self.store.consult_task(task["id"])["title"] == "Visible"
+        release.set()
+        writer.join()
+        assert self.store.consult_task(task["id"])["title"] == "Pas encore publiée"
+
+    def test_snapshot_compaction_keeps_order(self, monkeypatch):
+        from src import task_store
+        monkeypatch.setattr(task_store, "MIN_DELTA", 4)
+        created = [self.store.add_task(f"Tâche {i}") for i in range(20)]
+        for task in created[::3]:
+            self.store.update_task(task["id"], status="ONGOING")
+        self.store.delete_task(created[5]["id"])
+        snapshot = self.store.snapshot()
+        assert len(snapshot._delta) <= 4
+        assert [t["id"] for t in snapshot] == [t["id"] for t in task_list]
+        assert [t["status"] for t in snapshot] == [t["status"] for t in task_list]
+
+    def test_snapshot_validates_user_against_its_own_users(self, monkeypatch):
+        from src.task_store import Snapshot
+        self.store.add_task("Assignée ailleurs")
+        task_list[0]["assigned_user"] = "u-snapshot"
+        snapshot = Snapshot.build(3, task_list, ({"id": "u-snapshot", "name": "Zoé", "email": "z@example.com"},))
+        # Les utilisateurs partagés ne sont pas lus (ni leur index, sans verrou)
+        monkeypatch.setattr(self.tm, "user_exists", lambda user_id: pytest.fail("shared users read"))
+        assert snapshot.search_filter_sort_tasks(user_id="u-snapshot")["total_items"] == 1
+        with pytest.raises(ValueError, match="User not found"):
+            snapshot.search_filter_sort_tasks(user_id="user-1")
+
+
+class TestParallelScan:
+
+    @pytest.fixture(autouse=True)
+    def parallel(self, monkeypatch):
+        from src import parallel_scan, task_manager
+        if not parallel_scan.available():
+            pytest.skip("fork indisponible")
+        self.tm = task_manager
+        saved = [*task_list]
+        statuses, priorities = ["TODO", "ONGOING", "DONE"], ["LOW", "NORMAL", "HIGH", "CRITICAL"]
+        task_list[:] = [
+            {"id": str(uuid.uuid4()), "title": f"Tâche {i % 37:02d} {'réparer' if i % 5 == 0 else 'lire'}",
+             "description": "", "status": statuses[i % 3], "priority": priorities[i % 4],
+             "created_at": f"2024-0{1 + i % 9}-1{i % 10}T08:00:00", "tags": ["urgent"] if i % 7 == 0 else [],
+             "due_date": "2000-01-01T00:00:00" if i % 4 == 0 else None}
+            for i in range(300)
+        ]
+        monkeypatch.setattr(task_manager, "PARALLEL_WORKERS", 3)
+        monkeypatch.setattr(task_manager, "PARALLEL_THRESHOLD", 100)
+        yield
+        parallel_scan.shutdown()
+        task_list[:] = saved
+
+    def _both(self, **criteria):
+        parallel = search_filter_sort_tasks(**criteria)
+        with patch.object(self.tm, "PARALLEL_WORKERS", 0):
+            sequential = search_filter_sort_tasks(**criteria)
+        return parallel, sequential
+
+    @pytest.mark.parametrize("criteria", [
+        {},
+        {"query": "réparer", "sort_by": "title"},
+        {"status": "TODO", "sort_by": "priority", "ascending": False, "page": 2, "size": 7},
+        {"tags": ["urgent"], "overdue": True, "sort_by": "created_at"},
+        {"sort_by": "status", "size": 500},
+        {"query": "lire", "projection": "count"},
+        {"priority": "HIGH", "projection": "ids", "page": 3, "size": 5},
+    ])
+    def test_same_results_as_sequential_scan(self, criteria):
+        parallel, sequential = self._both(**criteria)
+        assert parallel == sequential
+
+    def test_workers_are_reused_then_refreshed_after_a_change(self, monkeypatch):
+        from src import parallel_scan
+        monkeypatch.setattr(self.tm, "_save_tasks", _REAL_SAVE_TASKS)
+        monkeypatch.setattr(self.tm, "_write_store", lambda *args: None)
+        search_filter_sort_tasks(query="réparer")
+        executor = parallel_scan._pool["executor"]
+        search_filter_sort_tasks(status="DONE")
+        assert parallel_scan._pool["executor"] is executor
+
+        update_task(task_list[1]["id"], title="Réparer la fuite")
+        result = search_filter_sort_tasks(query="fuite")
+        assert parallel_scan._pool["executor"] is not executor
+        assert [t["title"] for t in result["tasks"]] == ["Réparer la fuite"]
+
+    def test_unsaved_in_place_change_refreshes_workers(self):
+        user_id = self.tm.user_list[0]["id"]
+        assert search_filter_sort_tasks(user_id=user_id, projection="count")["total_items"] == 0
+        assign_user(task_list[3]["id"], user_id)  # en mémoire seulement, sans _save_tasks
+        parallel, sequential = self._both(user_id=user_id, projection="count")
+        assert parallel == sequential and parallel["total_items"] == 1
+
+    def test_below_threshold_stays_sequential(self, monkeypatch):
+        from src import parallel_scan
+        monkeypatch.setattr(self.tm, "PARALLEL_THRESHOLD", 1000)
+        search_filter_sort_tasks(query="réparer")
+        assert parallel_scan._pool["executor"] is None
+
+    def test_duplicate_ids_across_partitions_fall_back(self):
+        task_list[250]["id"] = task_list[10]["id"]
+        task_list[250]["title"] = task_list[10]["title"]
+        parallel, sequential = self._both(query=task_list[10]["title"])
+        assert parallel == sequential
+
+
+class TestImportTasks:
+
+    def setup_method(self):
+        task_list.clear()
+        self.existing = str(uuid.uuid4())
+        task_list.append({"id": self.existing, "title": "Existante", "description": "", "status": "TODO"})
+
+    def _write(self, tmp_path, rows):
+        path = tmp_path / "import.ndjson"
+        path.write_text("\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n",
+                        encoding="utf-8")
+        return str(path)
+
+    def _rows(self):
+        return [
+            {"title": "Première", "priority": "HIGH", "tags": ["a", "a", "b"], "due_date": "2030-01-02"},
+            {"title": ""},
+            "{pas du json",
+            "",
+            {"title": "Doublon", "id": self.existing},
+            {"title": "Inconnu", "assigned_user": "personne"},
+            {"title": "Assignée", "assigned_user": "user-import", "status": "DONE"},
+            {"title": "Date", "due_date": "demain"},
+            {"title": "Dernière", "created_at": "2024-05-01T10:00:00"},
+        ]
+
+    def test_valid_rows_are_imported_in_order_with_one_save(self, tmp_path, mock_save_tasks):
+        path = self._write(tmp_path, self._rows())
+        task_manager = sys.modules["src.task_manager"]
+        task_manager.user_list.append({"id": "user-import", "name": "Alice", "email": "alice@import.test"})
+        try:
+            result = import_tasks(path, workers=1)
+        finally:
+            task_manager.user_list.pop()
+
+        assert result["imported"] == 3
+        assert [t["title"] for t in task_list[1:]] == ["Première", "Assignée", "Dernière"]
+        first = task_list[1]
+        assert first["tags"] == ["a", "b"] and first["due_date"] == "2030-01-02T00:00:00"
+        assert first["history"][0]["event"] == "creation"
+        assert task_list[3]["created_at"] == "2024-05-01T10:00:00"
+        mock_save_tasks.assert_called_once_with(task_list, changed=task_list[1:], change="created")
+
+    def test_errors_are_reported_with_line_numbers(self, tmp_path):
+        result = import_tasks(self._write(tmp_path, self._rows()), workers=1)
+        assert [(line, message.split(":")[0]) for line, message in result["errors"]] == [
+            (2, "Title is required"),
+            (3, "Invalid JSON"),
+            (5, "Duplicate task id"),
+            (6, "User not found"),
+            (7, "User not found"),
+            (8, "Invalid date format"),
+        ]
+
+    def test_wrong_field_types_are_invalid_lines(self, tmp_path):
+        rows = [{"title": "Liste", "status": ["TODO"]}, {"title": "Objet", "priority": {"niveau": "HIGH"}},
+                {"title": "Assignée", "assigned_user": ["user-1"]}, {"title": "Valide"}]
+        result = import_tasks(self._write(tmp_path, rows), workers=1)
+        assert result == {"imported": 1, "errors": [(1, "Invalid field type"), (2, "Invalid field type"),
+                                                    (3, "Invalid field type")]}
+
+    def test_parallel_chunks_give_the_same_result(self, tmp_path):
+        rows = [{"title": f"Tâche {i}", "id": str(uuid.UUID(int=i + 1))} if i % 9 else {"title": ""}
+                for i in range(300)]
+        path = self._write(tmp_path, rows)
+        parallel = import_tasks(path, workers=3, chunk_bytes=1000)
+        imported = [t["id"] for t in task_list[1:]]
+        task_list[1:] = []
+        sequential = import_tasks(path, workers=1)
+        assert parallel == sequential
+        assert imported == [t["id"] for t in task_list[1:]] == [str(uuid.UUID(int=i + 1)) for i in range(300) if i % 9]
+        assert [line for line, _ in parallel["errors"]] == list(range(1, 301, 9))
+
+class TestChangeFeed:
+
+    @pytest.fixture(autouse=True)
+    def journal(self, real_saves):
+        self.tm = real_saves
+
+    def test_mutations_are_recorded_in_order(self):
+        task = add_task("Écrire le rapport")
+        update_task(task["id"], status="ONGOING", add_tags=["urgent"])
+        assign_task(task["id"], "user-1")
+        delete_task(task["id"])
+
+        changes = get_changes()["changes"]
+        assert [(c["seq"], c["type"]) for c in changes] == [
+            (1, "created"), (2, "updated"), (3, "updated"), (4, "deleted")]
+        assert all(c["task_id"] == task["id"] for c in changes)
+        assert changes[0]["task"]["title"] == "Écrire le rapport"
+        assert [e["event"] for e in changes[1]["events"]] == ["status_updated", "tag_added"]
+        assert changes[1]["task"]["status"] == "ONGOING"
+        assert changes[2]["task"]["assigned_user"] == "user-1"
+        assert "task" not in changes[3]
+        # L'historique n'est pas répété dans chaque entrée, sauf dans la tâche supprimée
+        assert all("history" not in c["task"] for c in changes[:3])
+        assert [e["event"] for e in changes[3]["previous"]["history"]] == [
+            "creation", "status_updated", "tag_added", "user_assigned"]
+
+    def test_read_since_a_sequence_with_a_limit(self):
+        for i in range(50):
+            add_task(f"Tâche {i}")
+        page = get_changes(since=10, limit=5)
+        assert [c["seq"] for c in page["changes"]] == [11, 12, 13, 14, 15]
+        assert page["last_seq"] == 15
+        assert [c["task"]["title"] for c in get_changes(since=47)["changes"]] == ["Tâche 47", "Tâche 48", "Tâche 49"]
+        assert get_changes(since=50) == {"changes": [], "last_seq": 50}
+
+    def test_deferred_saves_write_the_journal_with_the_tasks(self):
+        with deferred_saves():
+            task = add_task("Groupée")
+            update_task(task["id"], title="Renommée")
+            assert get_changes()["changes"] == []
+        changes = get_changes()["changes"]
+        assert [c["type"] for c in changes] == ["created", "updated"]
+        assert changes[1]["events"][0]["details"] == {"old": "Groupée", "new": "Renommée"}
+
+    def test_sequence_continues_across_appends_and_skips_partial_line(self):
+        from src import change_feed
+        add_task("Avant")
+        # Ligne coupée par un arrêt brutal pendant l'écriture
+        with open(change_feed.journal_path(self.tm.DATA_FILE), "ab") as f:
+            f.write(b'{"seq": 2, "typ')
+        assert [c["seq"] for c in get_changes()["changes"]] == [1]
+
+    def test_watch_follows_new_changes(self):
+        add_task("Première")
+        watcher = watch_changes(interval=0.01)
+        assert next(watcher)["task"]["title"] == "Première"
+        add_task("Seconde")
+        assert next(watcher)["seq"] == 2
+        watcher.close()
+        assert [c["seq"] for c in watch_changes(since=1, once=True)] == [2]
+
+    @pytest.mark.parametrize("since", [-1, "3", None])
+    def test_invalid_sequence_raises(self, since):
+        with pytest.raises(ValueError, match="Invalid sequence number"):
+            get_changes(since=since)
+
+    def _export(self, tmp_path, **point):
+        output = tmp_path / "delta.ndjson"
+        result = export_changes(str(output), **point)
+        return result, [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+    def test_export_changes_keeps_last_state_and_tombstones(self, tmp_path):
+        kept = add_task("Gardée")
+        removed = add_task("Supprimée")
+        update_task(kept["id"], status="DONE")
+        delete_task(removed["id"])
+
+        result, rows = self._export(tmp_path)
+        assert result == {"exported": 1, "deleted": 1, "last_seq": 4}
+        assert [(row["op"], row["seq"]) for row in rows] == [("upsert", 3), ("delete", 4)]
+        assert rows[0]["task"]["status"] == "DONE"
+        assert rows[1]["id"] == removed["id"]
+
+        # Reprise : seulement ce qui a changé depuis last_seq
+        update_task(kept["id"], title="Renommée")
+        result, rows = self._export(tmp_path, since=result["last_seq"])
+        assert result["last_seq"] == 5
+        assert [row["task"]["title"] for row in rows] == ["Renommée"]
+
+    def test_export_changes_since_a_date(self, tmp_path):
+        add_task("Ancienne")
+        middle = datetime.now(timezone.utc)
+        add_task("Récente")
+        result, rows = self._export(tmp_path, since_time=middle.isoformat())
+        assert [row["task"]["title"] for row in rows] == ["Récente"]
+        assert result["last_seq"] == 2
+
+        result, rows = self._export(tmp_path, since_time=datetime.now(timezone.utc).isoformat())
+        assert rows == [] and result["last_seq"] == 2
+        with pytest.raises(ValueError, match="Invalid date format"):
+            export_changes(str(tmp_path / "x.ndjson"), since_time="hier")
+
+    def test_iterate_backwards_skips_partial_line(self, monkeypatch):
+        from src import change_feed
+        monkeypatch.setattr(change_feed, "_TAIL_BLOCK", 16)  # lignes à cheval sur plusieurs blocs
+        tasks = [add_task(f"Tâche {i}", "x" * i) for i in range(5)]
+        delete_task(tasks[0]["id"])
+        journal = change_feed.journal_path(self.tm.DATA_FILE)
+        with open(journal, "ab") as f:
+            f.write(b'{"seq": 7, "timest')
+        entries = list(change_feed.iterate_backwards(journal))
+        assert [e["seq"] for e in entries] == [6, 5, 4, 3, 2, 1]
+        assert entries[0]["type"] == "deleted" and entries[0]["previous"]["title"] == "Tâche 0"
+
+class TestReplica:
+
+    @pytest.fixture(autouse=True)
+    def primary(self, real_saves):
+        from src import replica
+        self.replica_module = replica
+        self.tm = real_saves
+        _REAL_SAVE_USERS(real_saves.user_list)
+        self.existing = add_task("Avant la réplique")
+        self.started = []
+        yield
+        for replica in self.started:
+            replica.stop()
+
+    def _start(self, source):
+        replica = self.replica_module.Replica(source, interval=0.01).start()
+        self.started.append(replica)
+        return replica
+
+    def _last_seq(self):
+        return get_changes(since=0, limit=10**6)["last_seq"]
+
+    def test_searches_use_the_primary_users(self, tmp_path, monkeypatch):
+        primary_user = {"id": "u-primary", "name": "Primaire", "email": "p@example.com"}
+        _REAL_SAVE_USERS([primary_user])
+        update_task(self.existing["id"], status="ONGOING")
+        self.existing["assigned_user"] = "u-primary"
+        update_task(self.existing["id"], status="DONE")
+        # Le processus de la réplique a d'autres utilisateurs dans son dossier courant
+        (tmp_path / "ailleurs").mkdir()
+        monkeypatch.setattr(self.tm, "USER_FILE", str(tmp_path / "ailleurs" / "users.json"))
+        monkeypatch.setattr(self.tm, "user_exists", lambda user_id: False)
+
+        replica = self._start(self.tm.change_feed.journal_path(self.tm.DATA_FILE))
+        assert replica.search_filter_sort_tasks(user_id="u-primary", projection="ids")["ids"] == [self.existing["id"]]
+        with pytest.raises(ValueError, match="User not found"):
+            replica.search_filter_sort_tasks(user_id="user-1")
+
+    def _check_follows_primary(self, replica):
+        assert replica.consult_task(self.existing["id"])["title"] == "Avant la réplique"
+        added = add_task("Nouvelle")
+        update_task(self.existing["id"], status="DONE")
+        delete_task(added["id"])
+        kept = add_task("Gardée")
+        assert replica.wait_for(self._last_seq(), timeout=5)
+
+        assert replica.get_task(added["id"]) is None
+        assert replica.consult_task(self.existing["id"])["status"] == "DONE"
+        assert replica.consult_task(self.existing["id"])["history"] == self.existing["history"]
+        page = replica.search_filter_sort_tasks(sort_by="title")
+        assert [t["title"] for t in page["tasks"]] == ["Avant la réplique", "Gardée"]
+        assert replica.search_filter_sort_tasks(status="DONE", projection="ids")["ids"] == [self.existing["id"]]
+        assert replica.lag()["entries"] == 0
+        assert kept["id"] in {t["id"] for t in replica.snapshot()}
+
+    def test_data_newer_than_the_start_sequence_is_not_applied_twice(self, monkeypatch):
+        from src import change_feed
+        update_task(self.existing["id"], status="ONGOING")
+        last_sequence, calls = change_feed.last_sequence, []
+
+        def late_head(path):
+            # Première lecture : la séquence d'avant la mise à jour, déjà dans le fichier de données
+            calls.append(path)
+            return last_sequence(path) - 1 if len(calls) == 1 else last_sequence(path)
+
+        monkeypatch.setattr(change_feed, "last_sequence", late_head)
+        replica = self._start(change_feed.journal_path(self.tm.DATA_FILE))
+        update_task(self.existing["id"], status="DONE")
+        assert replica.wait_for(last_sequence(change_feed.journal_path(self.tm.DATA_FILE)), timeout=5)
+        assert replica.consult_task(self.existing["id"])["history"] == self.existing["history"]
+
+    def test_replica_history_matches_the_primary(self, tmp_path):
+        from src import change_feed
+        replica = self._start(change_feed.journal_path(self.tm.DATA_FILE))
+        task = add_task("Suivie")
+        update_task(task["id"], status="ONGOING", add_tags=["urgent"])
+        assign_task(task["id"], "user-1")
+        removed = add_task("Supprimée puis rétablie")
+        delete_task(removed["id"])
+        undo_changes()
+        path = tmp_path / "import.ndjson"
+        path.write_text(json.dumps({"title": "Importée"}) + "\n", encoding="utf-8")
+        import_tasks(str(path), workers=1)
+        assert replica.wait_for(self._last_seq(), timeout=5)
+
+        for primary in task_list:
+            assert replica.consult_task(primary["id"])["history"] == primary["history"]
+        assert replica.consult_task(task["id"])["history"][0]["event"] == "creation"
+
+    def test_replica_follows_the_journal_file(self):
+        from src import change_feed
+        replica = self._start(change_feed.journal_path(self.tm.DATA_FILE))
+        self._check_follows_primary(replica)
+
+    def test_replica_follows_a_feed_server_on_localhost(self):
+        server = self.replica_module.FeedServer(interval=0.01)
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        try:
+            replica = self._start(f"127.0.0.1:{server.server_address[1]}")
+            assert replica.snapshot().users  # utilisateurs reçus avec l'état initial
+            self._check_follows_primary(replica)
+        finally:
+            for replica in self.started:
+                replica.stop()
+            self.started.clear()
+            server.shutdown()
+            server.server_close()
+
+    def test_lag_metric(self):
+        from src import change_feed, metrics
+        replica = self._start(change_feed.journal_path(self.tm.DATA_FILE))
+        assert "task_manager_replica_lag_entries{source=" in metrics.render_prometheus()
+        assert replica.lag() == {"entries": 0, "seconds": 0.0}
+
+        replica.stop()  # plus rien n'est appliqué
+        add_task("Pas encore appliquée")
+        replica._set_head(self._last_seq())
+        assert replica.lag()["entries"] == 1 and replica.lag()["seconds"] >= 0
+
+    def test_invalid_source(self):
+        with pytest.raises(ValueError, match="Invalid replica source"):
+            self.replica_module.Replica("tasks.json")
+
+class TestHTTPAPI:
+
+    @pytest.fixture(autouse=True)
+    def server(self, real_saves):
+        from src import http_api
+        self.http_api = http_api
+        self.server = http_api.TaskHTTPServer(("127.0.0.1", 0))
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        import http.client
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        yield
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _request(self, method, path, body=None, headers=None):
+        # Même connexion pour tout le test : keep-alive
+        data = json.dumps(body).encode() if body is not None else None
+        self.connection.request(method, path, body=data, headers=headers or {})
+        response = self.connection.getresponse()
+        raw = response.read()
+        if response.getheader("Content-Encoding") == "gzip":
+            import gzip
+            raw = gzip.decompress(raw)
+        return response, json.loads(raw) if raw else None
+
+    def test_crud_over_one_connection(self):
+        response, task = self._request("POST", "/tasks", {"title": "Via HTTP", "priority": "HIGH"})
+        assert response.status == 201 and task["priority"] == "HIGH"
+        response, updated = self._request("PATCH", f"/tasks/{task['id']}", {"status": "DONE", "add_tags": ["api"]})
+        assert updated["status"] == "DONE" and updated["tags"] == ["api"]
+        response, assigned = self._request("PUT", f"/tasks/{task['id']}/assignee", {"user_id": "user-1"})
+        assert assigned["assigned_user"] == "user-1"
+        response, page = self._request("GET", "/tasks?status=DONE&tags=api&sort_by=title")
+        assert [t["id"] for t in page["tasks"]] == [task["id"]]
+        response, history = self._request("GET", f"/tasks/{task['id']}/history")
+        assert history["total_items"] == 4
+        assert history["history"][0]["event"] == "user_assigned"
+        response, _ = self._request("DELETE", f"/tasks/{task['id']}")
+        assert response.status == 204
+        response, error = self._request("GET", f"/tasks/{task['id']}")
+        assert response.status == 404 and error == {"error": "Task not found"}
+
+    def test_errors(self):
+        assert self._request("POST", "/tasks", {"title": ""})[0].status == 400
+        assert self._request("GET", "/tasks?page=deux")[1] == {"error": "Invalid parameter: page"}
+        assert self._request("GET", "/tasks?couleur=bleu")[0].status == 400
+        assert self._request("DELETE", "/users")[0].status == 405
+        assert self._request("GET", "/inconnu")[0].status == 404
+        assert self._request("GET", "/users/personne")[0].status == 404
+        assert self._request("GET", "/users?page=-1")[1] == {"error": "Invalid page number"}
+
+    def test_etag_skips_unchanged_results(self):
+        self._request("POST", "/tasks", {"title": "Première"})
+        response, _ = self._request("GET", "/tasks")
+        etag = response.getheader("ETag")
+        response, body = self._request("GET", "/tasks", headers={"If-None-Match": etag})
+        assert response.status == 304 and body is None
+
+        self._request("POST", "/tasks", {"title": "Seconde"})
+        response, page = self._request("GET", "/tasks", headers={"If-None-Match": etag})
+        assert response.status == 200 and page["total_items"] == 2
+        assert response.getheader("ETag") != etag
+
+    def test_invalid_content_length(self):
+        for length in ("douze", "-1"):
+            # En-têtes bruts : http.client recalculerait Content-Length
+            self.connection.putrequest("POST", "/tasks")
+            self.connection.putheader("Content-Length", length)
+            self.connection.endheaders()
+            response = self.connection.getresponse()
+            assert response.status == 400
+            assert json.loads(response.read()) == {"error": "Invalid Content-Length"}
+
+    def test_etag_changes_at_midnight(self, monkeypatch):
+        from src import task_manager
+        self._request("POST", "/tasks", {"title": "Échue demain", "due_date": datetime.now(timezone.utc).date().isoformat()})
+        response, page = self._request("GET", "/tasks?overdue=true")
+        etag = response.getheader("ETag")
+        assert page["total_items"] == 0
+        tomorrow = datetime.now(timezone.utc).date() + timedelta(days=2)
+        monkeypatch.setattr(task_manager, "_today_utc", lambda: tomorrow)
+        response, page = self._request("GET", "/tasks?overdue=true", headers={"If-None-Match": etag})
+        assert response.status == 200 and page["total_items"] == 1
+
+    def test_task_etag_ignores_changes_to_other_tasks(self):
+        _, task = self._request("POST", "/tasks", {"title": "Stable"})
+        _, other = self._request("POST", "/tasks", {"title": "Autre"})
+        response, _ = self._request("GET", f"/tasks/{task['id']}")
+        etag = response.getheader("ETag")
+        self._request("PATCH", f"/tasks/{other['id']}", {"status": "DONE"})
+        assert self._request("GET", f"/tasks/{task['id']}", headers={"If-None-Match": etag})[0].status == 304
+        self._request("PATCH", f"/tasks/{task['id']}", {"status": "DONE"})
+        response, body = self._request("GET", f"/tasks/{task['id']}", headers={"If-None-Match": etag})
+        assert response.status == 200 and body["version"] == 2
+
+    def test_large_pages_are_gzipped(self):
+        self._request("POST", "/batch", {"requests": [
+            {"method": "POST", "path": "/tasks", "body": {"title": f"Tâche {i}", "description": "x" * 100}}
+            for i in range(30)]})
+        response, page = self._request("GET", "/tasks?size=30", headers={"Accept-Encoding": "gzip"})
+        assert response.getheader("Content-Encoding") == "gzip" and len(page["tasks"]) == 30
+        response, _ = self._request("GET", "/tasks?size=30")
+        assert response.getheader("Content-Encoding") is None
+
+    def test_batch_runs_in_order_with_one_save(self):
+        store = self.server.store
+        saves = store.saves
+        response, result = self._request("POST", "/batch", {"requests": [
+            {"method": "POST", "path": "/tasks", "body": {"title": "Lot"}},
+            {"method": "GET", "path": "/tasks?query=Lot"},
+            {"method": "PATCH", "path": f"/tasks/{uuid.uuid4()}", "body": {"title": "x"}},
+            {"method": "POST", "path": "/users", "body": {"name": "Zoé", "email": "zoe@example.com"}},
+        ]})
+        statuses = [r["status"] for r in result["responses"]]
+        assert statuses == [201, 200, 404, 201]
+        assert result["responses"][1]["body"]["total_items"] == 1  # voit la création du même lot
+        assert store.saves == saves + 1
+        assert self._request("POST", "/batch", {"requests": "non"})[0].status == 400
+
+    def test_wrong_value_types_are_rejected(self):
+        response, error = self._request("POST", "/tasks", {"title": 5})
+        assert response.status == 400 and error == {"error": "Invalid field: title"}
+        _, task = self._request("POST", "/tasks", {"title": "Typée"})
+        response, error = self._request("PATCH", f"/tasks/{task['id']}", {"add_tags": "urgent"})
+        assert response.status == 400 and error == {"error": "Invalid field: add_tags"}
+        assert self._request("PATCH", f"/tasks/{task['id']}", {"expected_version": "1"})[0].status == 400
+        assert self._request("PUT", f"/tasks/{task['id']}/assignee", {"user_id": 3})[0].status == 400
+        assert "tags" not in self._request("GET", f"/tasks/{task['id']}")[1]
+
+    def test_bad_batch_item_does_not_stop_the_batch(self):
+        _, result = self._request("POST", "/batch", {"requests": [
+            {"method": "POST", "path": "/tasks", "body": {"title": "Avant"}},
+            {"method": "POST", "path": "/tasks", "body": {"title": 5}},
+            {"method": "POST", "path": "/tasks", "body": {"title": "Après"}},
+        ]})
+        assert [r["status"] for r in result["responses"]] == [201, 400, 201]
+
+    def test_unexpected_error_returns_500(self, monkeypatch):
+        def broken(*args, **kwargs):
+            raise AttributeError("boom")
+        monkeypatch.setattr(self.server.store, "add_task", broken)
+        response, error = self._request("POST", "/tasks", {"title": "Panne"})
+        assert response.status == 500 and error == {"error": "Internal error: AttributeError"}
+        # La connexion reste utilisable
+        assert self._request("GET", "/tasks")[0].status == 200
+
+    def test_stale_version_returns_conflict(self):
+        _, task = self._request("POST", "/tasks", {"title": "Disputée"})
+        path = f"/tasks/{task['id']}"
+        assert self._request("PATCH", path, {"status": "DONE", "expected_version": 1})[0].status == 200
+        response, error = self._request("PATCH", path, {"priority": "HIGH", "expected_version": 1})
+        assert response.status == 409 and error["current_version"] == 2
+        response, _ = self._request("PUT", path + "/assignee", {"user_id": None, "expected_version": 1})
+        assert response.status == 409
+        assert self._request("GET", path)[1]["priority"] == "NORMAL"
+
+class TestConditionalReads:
+
+    def setup_method(self):
+        self.saved = [*task_list]
+
+    def teardown_method(self):
+        task_list[:] = self.saved
+
+    def test_versions_follow_changes(self):
+        task = add_task("Versionnée")
+        assert task["version"] == 1
+        update_task(task["id"], title="Versionnée")  # aucun changement
+        assert task["version"] == 1
+        update_task(task["id"], status="ONGOING")
+        assign_task(task["id"], "user-1")
+        assign_task(task["id"], "user-1")
+        assert task["version"] == 3
+
+    def test_consult_task_if_changed(self):
+        task = add_task("Suivie")
+        assert consult_task_if_changed(task["id"], 1) is None
+        update_task(task["id"], priority="HIGH")
+        fresh = consult_task_if_changed(task["id"], 1)
+        assert fresh["version"] == 2 and fresh["priority"] == "HIGH" and "overdue" in fresh
+        assert consult_task_if_changed(task["id"], 2) is None
+        with pytest.raises(ValueError, match="Task not found"):
+            consult_task_if_changed(str(uuid.uuid4()), 1)
+
+    def test_search_if_generation(self):
+        task = add_task("Recherchée")
+        first = search_filter_sort_tasks(query="Recherchée")
+        assert search_filter_sort_tasks(query="Recherchée", if_generation=first["generation"]) == {
+            "not_modified": True, "generation": first["generation"]}
+
+        update_task(task["id"], description="modifiée en place")
+        again = search_filter_sort_tasks(query="Recherchée", if_generation=first["generation"])
+        assert again["generation"] != first["generation"] and again["tasks"][0]["description"] == "modifiée en place"
+        delete_task(task["id"])
+        assert search_filter_sort_tasks(projection="count", if_generation=again["generation"])["generation"] not in (
+            first["generation"], again["generation"])
+
+    def test_generation_differs_across_processes_and_days(self):
+        import src.task_manager as task_manager
+        generation = store_generation()
+        with patch.object(task_manager, "_LOAD_TOKEN", "autre"):
+            assert store_generation() != generation
+        tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+        with patch.object(task_manager, "_today_utc", return_value=tomorrow):
+            assert store_generation() != generation
+            assert not search_filter_sort_tasks(if_generation=generation).get("not_modified")
+
+    def test_snapshot_conditional_reads(self):
+        from src.task_store import Snapshot
+        task = add_task("Figée")
+        snapshot = Snapshot.build(7, task_list, ())
+        generation = snapshot.search_filter_sort_tasks(query="Figée")["generation"]
+        assert snapshot.search_filter_sort_tasks(if_generation=generation) == {"not_modified": True, "generation": generation}
+        assert Snapshot.build(8, task_list, ()).search_filter_sort_tasks()["generation"] != generation
+        assert snapshot.consult_task_if_changed(task["id"], 1) is None
+        assert snapshot.consult_task_if_changed(task["id"], 0)["title"] == "Figée"
+
+class TestOptimisticConcurrency:
+
+    def setup_method(self):
+        self.saved = [*task_list]
+
+    def teardown_method(self):
+        task_list[:] = self.saved
+
+    def test_update_with_expected_version(self):
+        task = add_task("Partagée")
+        update_task(task["id"], status="ONGOING", expected_version=1)
+        with pytest.raises(VersionConflictError, match="expected 1, current 2") as error:
+            update_task(task["id"], title="Écrasée", priority="HIGH", expected_version=1)
+        assert error.value.current == 2
+        assert task["title"] == "Partagée" and task["priority"] == "NORMAL" and task["version"] == 2
+        assert isinstance(error.value, ValueError)
+
+    def test_invalid_argument_changes_nothing(self):
+        from src import task_manager
+        task = add_task("Intacte")
+        for arguments in ({"status": "BAD"}, {"priority": "URGENT"}, {"due_date": "demain"}, {"add_tags": ["x" * 50]}):
+            with pytest.raises(ValueError):
+                update_task(task["id"], expected_version=1, **{"title": "Écrasée", "add_tags": ["partiel"], **arguments})
+        assert task["title"] == "Intacte" and "partiel" not in task.get("tags", []) and task["version"] == 1
+        # Sauvegardes simulées : seul l'événement de création attend le journal
+        assert [e["event"] for e in task_manager._feed["events"][str(task["id"])]] == ["creation"]
+        # La version lue reste donc valable
+        update_task(task["id"], title="Modifiée", expected_version=1)
+        with pytest.raises(VersionConflictError):
+            update_task(task["id"], title="Seconde", expected_version=1)
+
+    def test_assign_with_expected_version(self):
+        task = add_task("Assignée")
+        with pytest.raises(VersionConflictError):
+            assign_task(task["id"], "user-1", expected_version=3)
+        assert task["assigned_user"] is None
+        assert assign_task(task["id"], "user-1", expected_version=1)["version"] == 2
+
+    def test_task_without_version_is_version_zero(self):
+        task = add_task("Ancienne")
+        del task["version"]
+        update_task(task["id"], status="DONE", expected_version=0)
+        assert task["version"] == 1
+        with pytest.raises(ValueError, match="Invalid version"):
+            update_task(task["id"], status="TODO", expected_version="1")
+
+    def test_concurrent_writers_on_store(self):
+        from src.task_store import TaskStore
+        store = TaskStore()
+        first, second = store.add_task("Une"), store.add_task("Deux")
+        read = store.snapshot().get_task(first["id"])
+        # Une autre tâche modifiée entre-temps : pas de conflit
+        store.update_task(second["id"], status="DONE", expected_version=second["version"])
+        store.update_task(first["id"], status="DONE", expected_version=read["version"])
+        with pytest.raises(VersionConflictError):
+            store.update_task(first["id"], priority="LOW", expected_version=read["version"])
+
+class TestUndoRestore:
+
+    @pytest.fixture(autouse=True)
+    def journal(self, real_saves):
+        self.tm = real_saves
+
+    def _ids(self):
+        return {task["id"] for task in task_list}
+
+    def test_undo_reverts_last_update(self):
+        task = add_task("Rapport", "Brouillon")
+        update_task(task["id"], description="Version finale", priority="HIGH", add_tags=["relu"],
+                    due_date="2024-06-01T00:00:00")
+        assign_task(task["id"], "user-1")
+
+        result = undo_changes()
+        assert result["updated"] == [task["id"]] and result["to_seq"] == 2
+        assert task["assigned_user"] is None and task["version"] == 4
+        result = undo_changes()
+        assert result["to_seq"] == 1
+        assert (task["description"], task["priority"], task["tags"]) == ("Brouillon", "NORMAL", [])
+        assert "due_date" not in task
+        assert task["history"][-1] == {**task["history"][-1], "event": "undone", "details": {"to_seq": 1}}
+
+    def test_undo_walks_back_through_operations(self):
+        task = add_task("Étapes")
+        update_task(task["id"], status="ONGOING")
+        update_task(task["id"], status="DONE")
+        undo_changes()
+        assert task["status"] == "ONGOING"
+        undo_changes()
+        assert task["status"] == "TODO"
+        # Puis la création elle-même
+        assert undo_changes()["deleted"] == [task["id"]]
+        assert self._ids() == set()
+        with pytest.raises(ValueError, match="Nothing to undo"):
+            undo_changes()
+
+    def test_undo_delete_recreates_task(self):
+        task = add_task("Supprimée par erreur")
+        update_task(task["id"], status="DONE")
+        delete_task(task["id"])
+
+        assert undo_changes()["created"] == [task["id"]]
+        restored = consult_task(task["id"])
+        assert restored["status"] == "DONE" and restored["version"] == 3
+        assert [e["event"] for e in restored["history"]] == ["creation", "status_updated", "undone"]
+
+    def test_restore_recreates_task_with_its_history(self):
+        task = add_task("Recréée")
+        moment = datetime.now().isoformat()
+        update_task(task["id"], status="DONE")
+        delete_task(task["id"])
+
+        assert restore_at(moment)["created"] == [task["id"]]
+        restored = consult_task(task["id"])
+        assert restored["status"] == "TODO"
+        assert [e["event"] for e in restored["history"]] == ["creation", "status_updated", "restored"]
+
+    def test_one_operation_covers_a_whole_batch(self):
+        tasks = [add_task(f"Lot {i}") for i in range(3)]
+        with deferred_saves():
+            for task in tasks:
+                update_task(task["id"], priority="CRITICAL")
+            delete_task(tasks[0]["id"])
+
+        result = undo_changes(1)
+        assert sorted(result["updated"]) == sorted(t["id"] for t in tasks[1:])
+        assert result["created"] == [tasks[0]["id"]]
+        assert all(consult_task(t["id"])["priority"] == "NORMAL" for t in tasks)
+
+    def test_restore_at_timestamp(self):
+        kept = add_task("Gardée")
+        update_task(kept["id"], title="Gardée v2")
+        moment = datetime.now(timezone.utc).isoformat()
+        update_task(kept["id"], title="Gardée v3", remove_tags=["absent"], add_tags=["après"])
+        delete_task(kept["id"])
+        later = add_task("Créée après")
+
+        result = restore_at(moment)
+        assert result == {"updated": [], "created": [kept["id"]], "deleted": [later["id"]]}
+        restored = consult_task(kept["id"])
+        assert restored["title"] == "Gardée v2" and restored["tags"] == []
+        # Le retour est une opération comme une autre
+        undo_changes()
+        assert self._ids() == {later["id"]}
+
+    def test_restore_at_naive_time_is_local(self, monkeypatch):
+        import time
+        monkeypatch.setenv("TZ", "America/New_York")
+        time.tzset()
+        try:
+            task = add_task("Locale")
+            moment = datetime.now().isoformat()
+            update_task(task["id"], title="Locale v2")
+            assert restore_at(moment)["updated"] == [task["id"]]
+            assert task["title"] == "Locale"
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+
+    def test_restore_marks_changes_in_journal(self):
+        task = add_task("Journalisée")
+        moment = datetime.now(timezone.utc).isoformat()
+        update_task(task["id"], description="après")
+        restore_at(moment)
+        entry = get_changes()["changes"][-1]
+        assert [e["event"] for e in entry["events"]] == ["description_updated", "restored"]
+        assert entry["events"][0]["details"] == {"old": "après", "new": ""}
+
+    def test_errors(self):
+        with pytest.raises(ValueError, match="Invalid count"):
+            undo_changes(0)
+        with pytest.raises(ValueError, match="Invalid date format"):
+            restore_at("hier")
+        task = add_task("Ancienne suppression")
+        delete_task(task["id"])
+        # Entrée écrite avant que les suppressions gardent la tâche
+        journal = self.tm.change_feed.journal_path(self.tm.DATA_FILE)
+        lines = open(journal).read().splitlines()
+        last = json.loads(lines[-1])
+        del last["previous"]
+        with open(journal, "w") as f:
+            f.write("\n".join(lines[:-1] + [json.dumps(last)]) + "\n")
+        with pytest.raises(ValueError, match="cannot be reverted"):
+            undo_changes()
+
+    def test_store_publishes_reverted_deletion(self):
+        from src.task_store import TaskStore
+        store = TaskStore()
+        task = store.add_task("Via le store")
+        assert store.snapshot().get_task(task["id"]) is not None
+        assert store.undo_changes()["deleted"] == [task["id"]]
+        assert store.snapshot().get_task(task["id"]) is None